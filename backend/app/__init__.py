@@ -4,12 +4,17 @@ from flask_cors import CORS
 from extensions import db,jwt
 from app.routes.user import auth_bp
 from app.routes.dashboard import dashboard_bp
-# from app.routes.prediction import prediction_bp
+from app.routes.predictions import prediction_bp
 from app.config import DevConfig
+from app.utils import climatology, metrics, cache_warming
+from app.commands import register_commands
+from app.utils.response_formats import compress_response
+from app.utils.logging_config import configure_logging
 
 
 
 def create_app():
+    configure_logging()
     app = Flask(__name__)
     app.config.from_object(DevConfig)
     CORS(
@@ -36,11 +41,26 @@ def create_app():
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(dashboard_bp, url_prefix="/dashboard")
-    # app.register_blueprint(prediction_bp, url_prefix="/prediction")
+    app.register_blueprint(prediction_bp, url_prefix="/prediction")
+
+    # gzip/brotli for clients that accept it (mobile users on slow links)
+    app.after_request(compress_response)
+
+    # Request/stage/upstream timings at GET /metrics (METRICS_ENABLED=0 to turn off)
+    metrics.init_app(app)
 
     with app.app_context():
         db.create_all()
 
+    register_commands(app)
+
+    if os.getenv("CLIMATOLOGY_AUTOBUILD", "0").lower() in ("1", "true", "yes"):
+        climatology.start_background_build()
+
+    # Daily off-peak warm of the most queried cells (WARM_AT); or run `flask warm-cache` from cron
+    if os.getenv("CACHE_WARM_SCHEDULE", "0").lower() in ("1", "true", "yes"):
+        cache_warming.start_scheduler()
+
     return app
 
 
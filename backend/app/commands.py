@@ -0,0 +1,78 @@
+import os
+import datetime
+import click
+from app.utils import climatology, async_power, cache_warming
+from app.utils.power_archive import write_archive
+from app.utils.power_cache import cells_in_bbox
+
+
+def register_commands(app):
+    """Attach the maintenance commands to `flask <command>`."""
+
+    @app.cli.command("build-climatology")
+    @click.option("--force", is_flag=True, help="Rebuild cells that are already up to date.")
+    @click.option("--years", type=int, default=None, help="Years of history per cell.")
+    def build_climatology(force, years):
+        """Precompute day-of-year climatology for CLIMATOLOGY_CELLS."""
+        built = climatology.build_configured(years=years, force=force)
+        click.echo(f"Built climatology for {len(built)} cell(s): {built}")
+
+    @app.cli.command("build-archive")
+    @click.option("--bbox", required=True, help="lat_min,lon_min,lat_max,lon_max")
+    @click.option("--start", required=True, help="First day, YYYYMMDD.")
+    @click.option("--end", required=True, help="Last day, YYYYMMDD.")
+    @click.option("--parameters", default="T2M,PRECTOTCORR,WS2M,RH2M", show_default=True)
+    @click.option("--out", default=None, help="Archive path (defaults to POWER_ARCHIVE_PATH).")
+    @click.option("--concurrency", type=int, default=8, show_default=True)
+    @click.option("--regional/--no-regional", default=True, show_default=True,
+                  help="Download through POWER regional requests, falling back to point requests.")
+    def build_archive(bbox, start, end, parameters, out, concurrency, regional):
+        """Bulk-download daily POWER series for a bounding box into an offline archive."""
+        lat_min, lon_min, lat_max, lon_max = (float(v) for v in bbox.split(","))
+        out = out or os.getenv("POWER_ARCHIVE_PATH")
+        if not out:
+            raise click.UsageError("Pass --out or set POWER_ARCHIVE_PATH")
+
+        params = parameters.split(",")
+        cells = cells_in_bbox(lat_min, lon_min, lat_max, lon_max)
+        click.echo(f"Downloading {len(cells)} grid cell(s), {start} → {end}")
+
+        def fetch(cells):
+            if regional:
+                summary = async_power.run(async_power.fetch_region_async(
+                    "daily", cells, params, start, end, timeout=300, limit=concurrency,
+                ))
+                for failure in summary["failed"]:
+                    click.echo(f"Regional request failed for {failure['bbox']}: {failure['error']}", err=True)
+            results = async_power.run(async_power.gather_power(
+                [dict(temporal="daily", lat=c[0], lon=c[1], parameters=params,
+                      start=start, end=end, timeout=120) for c in cells],
+                limit=concurrency,
+            ))
+            return zip(cells, results)
+
+        summary = write_archive(out, cells, params, start, end, fetch)
+        click.echo(
+            f"Wrote {out}: {summary['cells']} cells, {summary['bytes'] / 1e6:.1f} MB, "
+            f"{len(summary['failed'])} failed"
+        )
+
+    @app.cli.command("warm-cache")
+    @click.option("--top", type=int, default=None, help="Most queried cells to warm (WARM_TOP_CELLS).")
+    @click.option("--date", "target", default=None, help="Day to warm for, YYYY-MM-DD (default: the coming morning).")
+    @click.option("--concurrency", type=int, default=None, help="Jobs at once (WARM_CONCURRENCY).")
+    @click.option("--rate", type=float, default=None, help="Upstream budget, jobs per second (WARM_RATE).")
+    @click.option("--dry-run", is_flag=True, help="List the jobs without running them.")
+    def warm_cache(top, target, concurrency, rate, dry_run):
+        """Pre-fetch data, forecasts and graphing series for the most queried grid cells."""
+        target = datetime.date.fromisoformat(target) if target else None
+        summary = cache_warming.warm(target, top=top, concurrency=concurrency, rate=rate, dry_run=dry_run)
+        if dry_run:
+            for job in summary["plan"]:
+                click.echo(f"{job['kind']:<9} {job['cell']} {job['variant']}")
+            click.echo(f"{summary['jobs']} job(s) for {summary['target']}")
+            return
+        click.echo(
+            f"Warmed {summary['warmed']}/{summary['jobs']} job(s) for {summary['target']} "
+            f"in {summary['seconds']}s, {len(summary['failed'])} failed"
+        )
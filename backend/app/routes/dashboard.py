@@ -1,20 +1,72 @@
-from flask import Blueprint, request, jsonify
+import re
+import json
+import logging
+import datetime
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from app.utils.nasa_power_fetcher import fetch_nasa_power_5yr
 from app.utils.weekly_forecast import get_forecast
 from app.utils.analysis import fetch_and_analyze_nasa_data
 from app.utils.graphing import fetch_weather_trends
-from app.utils.json_analysis import analyze_weather_json
+from app.utils.batch_analysis import analyze_locations, BATCH_MAX_LOCATIONS
+from app.utils.geocoding import geocode_many, autocomplete, GEOCODE_MAX_PLACES, AUTOCOMPLETE_MAX_LIMIT
+from app.utils.services import get_season_likelihood
+from app.utils.regional import regional_probability_map
+from app.utils.response_formats import MSGPACK_MIMETYPE, msgpack_available, pack_msgpack
+from app.utils.http_cache import cacheable, range_policy
+from app.utils import result_cache, cache_warming
 
+logger = logging.getLogger(__name__)
 
 dashboard_bp = Blueprint("dashboard_bp", __name__)
 
-@dashboard_bp.route("/data", methods=["POST"])
+# /nasa-graphing "format" → fetch_weather_trends layout
+GRAPHING_FORMATS = {"json": "nested", "columnar": "columnar", "msgpack": "binary"}
+
+
+# -------------------------
+# HTTP cache policies for the GET variants: (max_age, immutable, etag salt)
+# -------------------------
+def _five_year_policy(args):
+    today = datetime.date.today()
+    month, day = int(args["month"]), int(args["day"])
+    last = datetime.date(today.year - 1, month, min(day, 28) if month == 2 else day)
+    max_age, _ = range_policy(last)
+    # The five-year window moves forward on January 1st
+    new_year = datetime.datetime(today.year + 1, 1, 1) - datetime.datetime.now()
+    return min(max_age, int(new_year.total_seconds())), False, str(today.year)
+
+
+def _date_range_policy(args):
+    end = re.sub(r"\D", "", args["end_date"])
+    return (*range_policy(datetime.date(int(end[:4]), int(end[4:6]), int(end[6:8]))), "")
+
+
+def _graphing_policy(args):
+    # JSON and MessagePack answers to the same query string need distinct ETags
+    return (*range_policy(datetime.date(int(str(args["end_date"])[:4]), 12, 31)), _graphing_format(args))
+
+
+def _graphing_format(data):
+    """/nasa-graphing "format" field, overridden by Accept: application/msgpack."""
+    if MSGPACK_MIMETYPE in request.headers.get("Accept", ""):
+        return "msgpack"
+    return str(data.get("format") or request.args.get("format") or "json").lower()
+
+
+def _query_body():
+    """GET query arguments as a body dict; repeated keys become lists."""
+    return {k: v[0] if len(v) == 1 else v for k, v in request.args.to_dict(flat=False).items()}
+
+
+@dashboard_bp.route("/data", methods=["GET", "POST"])
+@cacheable(_five_year_policy)
 def get_nasa_data():
     """
     Route for fetching NASA POWER climate data averages.
     Expects JSON input with: month, day, year, latitude, longitude
+    (or the same fields as GET query parameters, which are HTTP-cacheable)
     """
-    data = request.get_json()
+    data = _query_body() if request.method == "GET" else request.get_json()
 
     # Validate required fields
     required_fields = ["month", "day", "year", "latitude", "longitude"]
@@ -28,6 +80,8 @@ def get_nasa_data():
         day = int(data["day"])
         year = int(data["year"])  # ignored by function, but accepted
 
+        cache_warming.record_query("data", lat, lon)
+
         # Fetch the NASA data
         result_json = fetch_nasa_power_5yr(lat=lat, lon=lon, month=month, day=day, year=year)
 
@@ -62,6 +116,7 @@ def seasonal_forecast():
     lat = float(data["latitude"])
     lon = float(data["longitude"])
     days = int(data.get("days", 7))  # default to 7-day forecast
+    cache_warming.record_query("forecast", lat, lon, days)
 
     try:
         result = get_forecast(lat, lon, days)
@@ -76,18 +131,23 @@ def seasonal_forecast():
 
 
 
-@dashboard_bp.route("/analysis-results", methods=["POST", "OPTIONS"])
+@dashboard_bp.route("/analysis-results", methods=["GET", "POST", "OPTIONS"])
+@cacheable(_date_range_policy)
 def get_analysis_results():
+    """
+    Threshold probabilities for one location. POST a JSON body, or GET with
+    the same fields as query parameters (e.g. ?latitude=..&temperature=30:above),
+    which is HTTP-cacheable.
+    """
     if request.method == "OPTIONS":
         # Handle preflight CORS request
         response = jsonify({"status": "ok"})
         response.headers.add("Access-Control-Allow-Origin", "*")
-        response.headers.add("Access-Control-Allow-Methods", "POST, OPTIONS")
+        response.headers.add("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
         response.headers.add("Access-Control-Allow-Headers", "Content-Type, Authorization")
         return response, 200
 
-    # Handle POST request
-    data = request.get_json()
+    data = _query_body() if request.method == "GET" else request.get_json()
     if not data:
         return jsonify({"error": "Missing JSON body"}), 400
 
@@ -95,6 +155,8 @@ def get_analysis_results():
     lon = data.pop("longitude", None)
     start_date = data.pop("start_date", None)
     end_date = data.pop("end_date", None)
+    detailed = data.pop("detailed", False)  # exact fractions + confidence intervals
+    detailed = detailed.lower() in ("1", "true", "yes") if isinstance(detailed, str) else bool(detailed)
 
     if not lat or not lon or not start_date or not end_date:
         return jsonify({
@@ -105,12 +167,11 @@ def get_analysis_results():
         return jsonify({"error": "No thresholds provided in the body"}), 400
 
     try:
-        print("[INFO] Fetching and analyzing NASA data...")
-        result = fetch_and_analyze_nasa_data(data, lat, lon, start_date, end_date)
+        result = fetch_and_analyze_nasa_data(data, lat, lon, start_date, end_date, detailed=detailed)
 
         # If NASA API returned an error message, expose it clearly
         if isinstance(result, dict) and "error" in result:
-            print("[ERROR] NASA API returned:", result)
+            logger.error("NASA API returned: %s", result)
             response = jsonify({
                 "error": result["error"],
                 "details": result.get("details", "See server logs for more info.")
@@ -123,24 +184,90 @@ def get_analysis_results():
         return response, 200
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print("[EXCEPTION] /analysis-results failed:", str(e))
+        logger.exception("/analysis-results failed")
         response = jsonify({"error": str(e)})
         response.headers.add("Access-Control-Allow-Origin", "*")
         return response, 500
     
-@dashboard_bp.route("/nasa-graphing", methods=["POST", "OPTIONS"])
+@dashboard_bp.route("/analysis-results/batch", methods=["POST", "OPTIONS"])
+def get_batch_analysis_results():
+    """
+    Threshold analysis for many locations in one call, streamed back as NDJSON.
+    Expects JSON:
+    {
+        "locations": [{"id": "farm-1", "latitude": -1.28, "longitude": 36.81}, ...],
+        "start_date": "20220101",
+        "end_date": "20221231",
+        "thresholds": {"temperature": "30:above", "humidity": "50:below"},
+        "detailed": false
+    }
+    Each output line is one location's result, in completion order.
+    """
+    if request.method == "OPTIONS":
+        response = jsonify({"status": "ok"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Methods", "POST, OPTIONS")
+        response.headers.add("Access-Control-Allow-Headers", "Content-Type, Authorization")
+        return response, 200
+
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Missing JSON body"}), 400
+
+    locations = data.get("locations")
+    thresholds = data.get("thresholds")
+    start_date = data.get("start_date")
+    end_date = data.get("end_date")
+    detailed = bool(data.get("detailed", False))
+
+    if not locations or not isinstance(locations, list) or not start_date or not end_date:
+        return jsonify({
+            "error": "Missing required fields: locations, start_date, end_date"
+        }), 400
+
+    if not thresholds or not isinstance(thresholds, dict):
+        return jsonify({"error": "No thresholds provided in the body"}), 400
+
+    if len(locations) > BATCH_MAX_LOCATIONS:
+        return jsonify({"error": f"Too many locations (max {BATCH_MAX_LOCATIONS})"}), 400
+
+    try:
+        for loc in locations:
+            loc["latitude"] = float(loc["latitude"])
+            loc["longitude"] = float(loc["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Every location needs numeric latitude and longitude"}), 400
+
+    def generate():
+        for item in analyze_locations(locations, thresholds, start_date, end_date, detailed=detailed):
+            yield json.dumps(item) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response
+
+
+@dashboard_bp.route("/nasa-graphing", methods=["GET", "POST", "OPTIONS"])
+@cacheable(_graphing_policy, vary=("Accept",))
 def get_weather_trends():
-    """Fetch and summarize NASA POWER monthly weather data."""
+    """
+    Fetch and summarize NASA POWER monthly weather data.
+
+    Optional "format" (JSON body or ?format=):
+      json      per-year nested summary + statistics (default)
+      columnar  shared time axis with one value array per parameter
+      msgpack   columnar, MessagePack-encoded with float32 arrays
+
+    GET with the same fields as query parameters is HTTP-cacheable.
+    """
     if request.method == "OPTIONS":
         response = jsonify({"message": "CORS preflight OK"})
         response.headers.add("Access-Control-Allow-Origin", "*")
-        response.headers.add("Access-Control-Allow-Methods", "POST, OPTIONS")
+        response.headers.add("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
         response.headers.add("Access-Control-Allow-Headers", "Content-Type")
         return response, 200
 
-    data = request.get_json(silent=True)
+    data = _query_body() if request.method == "GET" else request.get_json(silent=True)
     if not data:
         return jsonify({"error": "Missing JSON body"}), 400
 
@@ -154,29 +281,179 @@ def get_weather_trends():
             "error": "Missing required fields: latitude, longitude, start_date, end_date"
         }), 400
 
+    fmt = _graphing_format(data)
+    if fmt not in GRAPHING_FORMATS:
+        return jsonify({"error": f"Unknown format '{fmt}' (use one of {', '.join(GRAPHING_FORMATS)})"}), 400
+    if fmt == "msgpack" and not msgpack_available():
+        return jsonify({"error": "MessagePack responses are not available on this server"}), 406
+
+    cache_warming.record_query("trends", lat, lon, f"{start_date}-{end_date}:{GRAPHING_FORMATS[fmt]}")
+
     try:
         # ✅ NASA Monthly API expects YYYY format for annual/monthly data
-        nasa_raw = fetch_weather_trends(lat, lon, start_date, end_date)
+        nasa_raw = fetch_weather_trends(lat, lon, start_date, end_date, layout=GRAPHING_FORMATS[fmt])
 
         # Handle NASA API errors
-        if "header" in nasa_raw and "messages" in nasa_raw:
+        if "error" in nasa_raw:
             return jsonify({
                 "error": "NASA POWER API returned an error.",
-                "details": nasa_raw.get("messages", [])
+                "details": nasa_raw.get("details") or nasa_raw["error"]
             }), 502
 
-        # Analyze JSON
-        analyzed = analyze_weather_json(nasa_raw)
-
-        response = jsonify({
+        payload = {
             "message": "Weather trends successfully fetched and analyzed.",
             "coordinates": {"latitude": lat, "longitude": lon},
-            "data": analyzed
-        })
+        }
+        if fmt == "json":
+            payload["data"] = nasa_raw["yearly"]
+            payload["statistics"] = nasa_raw["statistics"]
+        else:
+            payload["format"] = "columnar"
+            payload["data"] = nasa_raw["columns"]
+
+        if fmt == "msgpack":
+            response = Response(pack_msgpack(payload), mimetype=MSGPACK_MIMETYPE)
+        else:
+            response = jsonify(payload)
+        response.vary.add("Accept")  # Accept: application/msgpack picks the binary variant
         response.headers.add("Access-Control-Allow-Origin", "*")
         return response, 200
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("/nasa-graphing failed")
         return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+@dashboard_bp.route("/season-likelihood", methods=["GET", "POST"])
+@cacheable(_date_range_policy)
+def season_likelihood():
+    """
+    Day-by-day weather likelihoods and farming advice for a whole season or year.
+    Expects JSON (or the same fields as GET query parameters):
+    {
+        "latitude": -1.286389,
+        "longitude": 36.817223,
+        "start_date": "20240301",       (or "year": 2024 for the whole year)
+        "end_date": "20240531",
+        "include_days": true            (false: only the season summary)
+    }
+    """
+    data = _query_body() if request.method == "GET" else request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Missing JSON body"}), 400
+
+    try:
+        lat = float(data["latitude"])
+        lon = float(data["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Missing or invalid latitude/longitude"}), 400
+
+    start_date, end_date = data.get("start_date"), data.get("end_date")
+    if data.get("year") and not (start_date or end_date):
+        start_date, end_date = f"{data['year']}0101", f"{data['year']}1231"
+    if not start_date or not end_date:
+        return jsonify({"error": "Missing required fields: start_date, end_date (or year)"}), 400
+
+    include_days = data.get("include_days", True)
+    if isinstance(include_days, str):
+        include_days = include_days.lower() in ("1", "true", "yes")
+
+    result = get_season_likelihood(
+        lat, lon, re.sub(r"\D", "", str(start_date)), re.sub(r"\D", "", str(end_date)), include_days=bool(include_days)
+    )
+    if "error" in result:
+        return jsonify(result), 502 if "details" in result else 400
+    return jsonify(result), 200
+
+
+@dashboard_bp.route("/regional-map", methods=["GET", "POST"])
+@cacheable(_date_range_policy)
+def regional_map():
+    """
+    Threshold probabilities for every NASA POWER grid cell in a bounding box,
+    one heatmap layer per threshold.
+    Expects JSON (or the same fields as GET query parameters):
+    {
+        "bbox": "-2.0,36.0,0.0,38.0",   (lat_min,lon_min,lat_max,lon_max)
+        "resolution": 1.0,              (optional, degrees; default every 0.5° × 0.625° cell)
+        "start_date": "20150101",
+        "end_date": "20241231",
+        "format": "geojson",            (or "grid")
+        "temperature": "30:above",      (same thresholds as /analysis-results)
+        "precipitation": "10:above"
+    }
+    """
+    data = _query_body() if request.method == "GET" else request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Missing JSON body"}), 400
+
+    bbox = data.pop("bbox", None)
+    start_date = data.pop("start_date", None)
+    end_date = data.pop("end_date", None)
+    fmt = data.pop("format", "geojson")
+    resolution = data.pop("resolution", None)
+    if not bbox or not start_date or not end_date:
+        return jsonify({"error": "Missing required fields: bbox, start_date, end_date"}), 400
+
+    try:
+        bbox = [float(v) for v in (bbox.split(",") if isinstance(bbox, str) else bbox)]
+        resolution = float(resolution) if resolution else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "bbox must be four numbers and resolution a number"}), 400
+    if len(bbox) != 4:
+        return jsonify({"error": "bbox must be lat_min,lon_min,lat_max,lon_max"}), 400
+    if not data:
+        return jsonify({"error": "No thresholds provided in the body"}), 400
+
+    result = regional_probability_map(
+        bbox, data, re.sub(r"\D", "", str(start_date)), re.sub(r"\D", "", str(end_date)),
+        resolution=resolution, fmt=fmt,
+    )
+    if "error" in result:
+        return jsonify(result), 400
+    return jsonify(result), 200
+
+
+@dashboard_bp.route("/geocode", methods=["POST"])
+def geocode_places():
+    """
+    Resolve place names to coordinates (deduplicated, cached, rate limited).
+    Expects JSON: {"places": ["Nairobi", "Eldoret, Kenya"]}
+    """
+    data = request.get_json(silent=True)
+    places = data.get("places") if data else None
+    if not places or not isinstance(places, list):
+        return jsonify({"error": "Missing required field: places"}), 400
+    if len(places) > GEOCODE_MAX_PLACES:
+        return jsonify({"error": f"Too many places (max {GEOCODE_MAX_PLACES})"}), 400
+
+    try:
+        resolved = geocode_many([str(p) for p in places])
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({
+        "results": [
+            {"place": name, "latitude": coords[0], "longitude": coords[1]} if coords
+            else {"place": name, "error": "Location not found."}
+            for name, coords in resolved.items()
+        ]
+    }), 200
+
+
+@dashboard_bp.route("/places/autocomplete", methods=["GET"])
+def autocomplete_places():
+    """Instant place-name suggestions from the offline gazetteer: ?q=nai&limit=10"""
+    prefix = request.args.get("q", "")
+    try:
+        limit = int(request.args.get("limit", 10))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = min(max(limit, 1), AUTOCOMPLETE_MAX_LIMIT)
+    return jsonify({"results": autocomplete(prefix, limit)}), 200
+
+
+@dashboard_bp.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss/eviction counters of the computed-results cache."""
+    return jsonify({"results": result_cache.stats()}), 200
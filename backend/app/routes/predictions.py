@@ -1,6 +1,6 @@
+import re
 from flask import Blueprint, request, jsonify
-import random
-from datetime import datetime
+from app.utils.prediction import predict, PREDICTION_MAX_WINDOW_DAYS
 
 prediction_bp = Blueprint("prediction", __name__)
 
@@ -8,53 +8,70 @@ prediction_bp = Blueprint("prediction", __name__)
 @prediction_bp.route("/analyze", methods=["POST"])
 def analyze_weather():
     """
-    Endpoint that simulates weather probability analysis
-    based on selected variables and thresholds from frontend.
+    Historical probability of each selected variable crossing its threshold
+    around a calendar day, from the same window of days in past years.
+    Expects JSON:
+    {
+        "latitude": -1.286389,
+        "longitude": 36.817223,
+        "selectedDate": "06-15",            (or "2025-06-15", or "month"/"day" fields)
+        "selectedVariables": ["temperature", "precipitation"],
+        "thresholds": [{"variable": "temperature", "value": 30, "operator": "above"}],
+        "years": 10,                        (optional, PREDICTION_YEARS)
+        "windowDays": 7                     (optional, ± days, PREDICTION_WINDOW_DAYS)
+    }
     """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Missing JSON body"}), 400
+
+    try:
+        lat = float(data["latitude"])
+        lon = float(data["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Missing or invalid latitude/longitude"}), 400
+
+    month_day = _month_day(data)
+    if month_day is None:
+        return jsonify({"error": "Missing or invalid selectedDate (MM-DD or YYYY-MM-DD)"}), 400
 
-    data = request.get_json()
     selected_variables = data.get("selectedVariables", [])
-    thresholds = data.get("thresholds", [])
-    selected_date = data.get("selectedDate")
-
-    # Simulated variables data
-    weather_variables = {
-        "temperature": {"unit": "°C", "base": 25},
-        "precipitation": {"unit": "mm", "base": 50},
-        "humidity": {"unit": "%", "base": 65},
-        "wind": {"unit": "m/s", "base": 4}
-    }
+    if not isinstance(selected_variables, list):
+        return jsonify({"error": "selectedVariables must be a list"}), 400
+
+    try:
+        years = int(data["years"]) if data.get("years") else None
+        window = int(data["windowDays"]) if data.get("windowDays") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "years and windowDays must be integers"}), 400
+    if (years is not None and years < 1) or (window is not None and window < 0):
+        return jsonify({"error": "years must be positive and windowDays non-negative"}), 400
+    if window is not None and window > PREDICTION_MAX_WINDOW_DAYS:
+        return jsonify({"error": f"windowDays must be at most {PREDICTION_MAX_WINDOW_DAYS}"}), 400
+
+    result = predict(
+        lat, lon, *month_day, selected_variables, data.get("thresholds", []), years=years, window=window
+    )
+    if "error" in result:
+        status = 502 if "details" in result else 400
+        return jsonify(result), status
+
+    return jsonify(dict(result, status="success")), 200
+
 
-    results = []
-    for variable in selected_variables:
-        var_info = weather_variables.get(variable)
-        threshold = next((t for t in thresholds if t["variable"] == variable), None)
-
-        probability = random.randint(20, 95)
-        mean = round(random.uniform(var_info["base"] - 5, var_info["base"] + 5), 1)
-
-        # 10-year sample historical data
-        historical_data = []
-        for i in range(10):
-            year = datetime.now().year - i
-            historical_data.append({
-                "year": year,
-                "value": round(random.uniform(var_info["base"] - 7, var_info["base"] + 7), 1),
-                "date": f"{year}-{selected_date}"
-            })
-
-        results.append({
-            "variable": variable,
-            "probability": probability,
-            "mean": mean,
-            "threshold": threshold.get("value") if threshold else 30,
-            "operator": threshold.get("operator") if threshold else "above",
-            "historicalData": historical_data,
-            "unit": var_info["unit"]
-        })
-
-    return jsonify({
-        "date": selected_date,
-        "results": results,
-        "status": "success"
-    })
+def _month_day(data):
+    """(month, day) from selectedDate ("MM-DD", "YYYY-MM-DD", ISO timestamp) or month/day fields."""
+    selected = data.get("selectedDate")
+    if selected:
+        match = re.match(r"^(?:\d{4}-)?(\d{1,2})-(\d{1,2})(?:$|T)", str(selected))
+        if not match:
+            return None
+        month, day = int(match.group(1)), int(match.group(2))
+    else:
+        try:
+            month, day = int(data["month"]), int(data["day"])
+        except (KeyError, TypeError, ValueError):
+            return None
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    return month, day
@@ -1,5 +1,10 @@
 import os
-import requests
+import logging
+from app.utils import result_cache, metrics
+from app.utils.power_cache import fetch_power_series, snap_to_grid, PowerAPIError
+from app.utils.probability import evaluate_rules, DIRECTIONS
+
+logger = logging.getLogger(__name__)
 
 # Mapping internal keys to NASA POWER parameters
 PARAMETER_MAP = {
@@ -9,93 +14,121 @@ PARAMETER_MAP = {
     "wind_speed": "WS2M"           # Wind speed at 2m (m/s)
 }
 
-NASA_API_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+
+def fetch_and_analyze_nasa_data(user_query, lat, lon, start_date, end_date, detailed=False):
+    """
+    Probability of each user threshold being exceeded over the date range.
+    With detailed=True every entry also carries the exact fraction, sample
+    counts and a 95% Wilson confidence interval.
+
+    Results are cached per grid cell (see result_cache, namespace "analysis").
+    """
+    cell = snap_to_grid(lat, lon)
+    return result_cache.get_or_compute(
+        "analysis",
+        {"cell": cell, "query": user_query, "start": str(start_date), "end": str(end_date), "detailed": bool(detailed)},
+        lambda: _analyze(user_query, lat, lon, start_date, end_date, detailed),
+        tags=[(*cell, start_date, end_date)],
+    )
 
 
-def fetch_and_analyze_nasa_data(user_query, lat, lon, start_date, end_date):
-    print("\n[DEBUG] Incoming user_query:", user_query)
+def _analyze(user_query, lat, lon, start_date, end_date, detailed):
+    logger.debug("Incoming user_query: %s", user_query)
 
     # Select NASA parameters
     selected_params = [PARAMETER_MAP[key] for key in user_query if key in PARAMETER_MAP]
     if not selected_params:
         return {"error": "No valid parameters selected from user query."}
 
-    print("[DEBUG] NASA Parameters selected:", selected_params)
+    logger.debug("NASA parameters %s for range %s → %s", selected_params, start_date, end_date)
+    try:
+        daily_data = fetch_power_series("daily", lat, lon, selected_params, start_date, end_date)
+    except PowerAPIError as e:
+        logger.error("NASA API returned error: %s", e)
+        return {"error": str(e), "details": e.details}
 
-    params = {
-        "parameters": ",".join(selected_params),
-        "start": start_date,
-        "end": end_date,
-        "latitude": lat,
-        "longitude": lon,
-        "community": "AG",
-        "format": "JSON"
-    }
+    # Collect every (variable, threshold, direction) rule, then evaluate them in one pass.
+    rules, result = build_rules(user_query)
 
-    print("[DEBUG] Sending NASA API request with params:", params)
-    response = requests.get(NASA_API_URL, params=params)
-    print("[DEBUG] NASA API Response Status:", response.status_code)
+    with metrics.stage("compute"):
+        outcomes = evaluate_rules(daily_data, rules)
 
-    # Handle non-JSON or invalid responses
-    try:
-        data = response.json()
-    except ValueError:
-        print("[ERROR] Non-JSON response from NASA:", response.text[:200])
-        return {"error": "Non-JSON response from NASA.", "details": response.text}
+    for (key, i), outcome in outcomes.items():
+        if outcome is None:
+            logger.warning("Missing NASA data for %s", key)
+            result[key][i] = "Data unavailable"
+            continue
+        logger.debug("%s: %s/%s (missing %s)", key, outcome["count"], outcome["samples"], outcome["missing"])
+        result[key][i] = _format_outcome(outcome, detailed)
 
-    # Check for NASA POWER error messages
-    if "errors" in data or "error" in data:
-        print("[ERROR] NASA API returned error:", data)
-        return {"error": "NASA API returned an error.", "details": data}
+    # Single-threshold variables keep the original flat {"temperature": "42%"} shape
+    return {
+        key: values if isinstance(user_query[key], list) else values[0]
+        for key, values in result.items()
+    }
 
-    if "properties" not in data or "parameter" not in data["properties"]:
-        print("[ERROR] Invalid NASA API response structure:", data)
-        return {"error": "Invalid response from NASA API.", "details": data}
 
-    daily_data = data["properties"]["parameter"]
-    print("[DEBUG] Extracted daily_data keys:", list(daily_data.keys()))
+def build_rules(user_query):
+    """
+    Turn {"temperature": "30:above", "humidity": ["40:below", "80:above"], ...}
+    into evaluate_rules() rules named (variable, index).
 
+    Returns:
+        (rules, result): result has one slot per query of each known
+        variable, pre-filled with an error message where the query is invalid.
+    """
+    rules = []
     result = {}
-
-    # Compute probabilities
     for key, query in user_query.items():
         if key not in PARAMETER_MAP:
             continue
 
-        try:
-            value_str, direction = query.split(":")
-            threshold = float(value_str)
-            nasa_key = PARAMETER_MAP[key]
-            values = list(daily_data[nasa_key].values())
-
-            print(f"[DEBUG] Calculating for {key.upper()}: threshold={threshold}, direction={direction}")
-            probability = calculate_probability(values, threshold, direction)
-            print(f"[RESULT] {key}: {probability}%")
-
-            result[key] = f"{probability}%"
+        # A variable may carry a single "value:direction" string or a list of them
+        queries = query if isinstance(query, list) else [query]
+        result[key] = [None] * len(queries)
+        for i, q in enumerate(queries):
+            try:
+                value_str, direction = q.split(":")
+                threshold = float(value_str)
+            except (ValueError, AttributeError):
+                logger.warning("Invalid threshold format for %s: %s", key, q)
+                result[key][i] = "Invalid threshold format"
+                continue
+            if direction not in DIRECTIONS:
+                logger.warning("Invalid direction: %s", direction)
+                result[key][i] = "Invalid direction"
+                continue
+            rules.append(((key, i), PARAMETER_MAP[key], threshold, direction))
+    return rules, result
+
+
+def _format_outcome(outcome, detailed):
+    percent = f"{_percent(outcome['count'], outcome['samples'])}%"
+    if not detailed:
+        return percent
+    return {
+        "probability": percent,
+        "fraction": outcome["probability"],
+        "count": outcome["count"],
+        "samples": outcome["samples"],
+        "missing": outcome["missing"],
+        "ci_low": outcome["ci_low"],
+        "ci_high": outcome["ci_high"],
+    }
 
-        except ValueError:
-            print(f"[ERROR] Invalid threshold format for {key}: {query}")
-            result[key] = "Invalid threshold format"
-        except KeyError:
-            print(f"[ERROR] Missing NASA data for {key}")
-            result[key] = "Data unavailable"
 
-    return result
+def _percent(count, total):
+    return round(count * 100 / total) if total > 0 else 0
 
 
 def calculate_probability(values, threshold, direction):
-    if direction == "above":
-        count = sum(1 for v in values if v > threshold)
-    elif direction == "below":
-        count = sum(1 for v in values if v < threshold)
-    else:
-        print(f"[ERROR] Invalid direction: {direction}")
+    """Whole-number percentage of values beyond the threshold (fill values ignored)."""
+    if direction not in DIRECTIONS:
+        logger.warning("Invalid direction: %s", direction)
         return "Invalid direction"
 
-    total = len(values)
-    print(f"[DEBUG] count = {count}, total = {total}")
-    return int((count / total) * 100) if total > 0 else 0
+    outcome = evaluate_rules({"values": values}, [("values", "values", threshold, direction)])["values"]
+    return _percent(outcome["count"], outcome["samples"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,364 @@
+import os
+import atexit
+import time
+import random
+import asyncio
+import threading
+import aiohttp
+from app.utils import http_client, metrics
+from app.utils.single_flight import file_lock
+from app.utils.power_stream import PowerStreamParser, STREAM_CHUNK_SIZE
+from app.utils.power_cache import (
+    snap_to_grid,
+    flight_key,
+    get_cached_series,
+    store_series,
+    build_power_request,
+    parse_power_response,
+    region_tiles,
+    build_region_request,
+    parse_region_response,
+    PowerAPIError,
+    SINGLEFLIGHT_FILE_LOCK,
+    LOCK_DIR,
+    SERIES_TEMPORALS,
+    POWER_OFFLINE,
+    POWER_REGIONAL_MAX_PARAMETERS,
+)
+
+# Connections the background loop may hold open, overall and per host
+ASYNC_MAX_CONNECTIONS = int(os.getenv("ASYNC_MAX_CONNECTIONS", "256"))
+ASYNC_LIMIT_PER_HOST = int(os.getenv("ASYNC_LIMIT_PER_HOST", "64"))
+
+_loop = None
+_session = None
+_lock = threading.Lock()
+_inflight = {}  # flight key -> Task, only touched from the loop thread
+
+
+# -------------------------
+# Background event loop
+# -------------------------
+def get_loop():
+    """
+    Return the process-wide event loop, running in a daemon thread.
+
+    Sync code (Flask views, thread pools) hands coroutines to this loop, so
+    hundreds of NASA requests can be in flight from one process while the
+    calling threads only wait on futures.
+    """
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="power-async-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def submit(coro):
+    """Schedule a coroutine on the background loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro, timeout=None):
+    """Run a coroutine on the background loop and block until it finishes."""
+    return submit(coro).result(timeout)
+
+
+def _reset_after_fork():
+    # gunicorn forks workers; the child must not reuse the parent's loop thread
+    global _loop, _session
+    _loop = None
+    _session = None
+    _inflight.clear()
+
+
+def _shutdown():
+    # Close pooled connections cleanly on interpreter exit
+    if _loop is not None and _session is not None and not _session.closed:
+        try:
+            asyncio.run_coroutine_threadsafe(_session.close(), _loop).result(5)
+        except Exception:
+            pass
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(_shutdown)
+
+
+async def _get_session():
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=ASYNC_MAX_CONNECTIONS, limit_per_host=ASYNC_LIMIT_PER_HOST)
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            headers={"User-Agent": http_client.USER_AGENT},
+        )
+    return _session
+
+
+# -------------------------
+# Async fetch layer
+# -------------------------
+async def fetch_power_series_async(temporal, lat, lon, parameters, start, end, community="AG", url=None, timeout=30):
+    """
+    Async twin of power_cache.fetch_power_series: same cache, same grid
+    snapping, same PowerAPIError semantics, but the HTTP call is non-blocking.
+    """
+    if isinstance(parameters, str):
+        parameters = parameters.split(",")
+    parameters = list(parameters)
+    community = community.upper()
+    start, end = str(start), str(end)
+    cell_lat, cell_lon = snap_to_grid(lat, lon)
+    loop = asyncio.get_running_loop()
+
+    # SQLite work is quick but blocking; keep it off the event loop
+    cached = await loop.run_in_executor(
+        None, get_cached_series, temporal, community, cell_lat, cell_lon, parameters, start, end
+    )
+    if cached is not None:
+        metrics.cache_lookup("power", "hit")
+        return cached
+    metrics.cache_lookup("power", "miss")
+    return await load_power_series(temporal, cell_lat, cell_lon, parameters, start, end, community, url, timeout)
+
+
+async def load_power_series(temporal, cell_lat, cell_lon, parameters, start, end, community="AG", url=None,
+                            timeout=30):
+    """
+    Fetch and cache one grid cell's series after a cache miss.
+
+    Every miss in the process — sync fetch_power_series included — comes
+    through here, so identical requests in flight share one upstream call.
+    """
+    key = flight_key(temporal, community, cell_lat, cell_lon, parameters, start, end)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _load(key, temporal, cell_lat, cell_lon, parameters, start, end, community, url, timeout)
+        )
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one waiter being cancelled must not cancel the shared request
+    return await asyncio.shield(task)
+
+
+async def _load(key, temporal, cell_lat, cell_lon, parameters, start, end, community, url, timeout):
+    loop = asyncio.get_running_loop()
+    if not SINGLEFLIGHT_FILE_LOCK:
+        return await _fetch_and_store(temporal, cell_lat, cell_lon, parameters, start, end, community, url, timeout)
+
+    # flock blocks, so take it in a thread; the fetch itself stays on the loop
+    lock = file_lock(LOCK_DIR, key)
+    await loop.run_in_executor(None, lock.__enter__)
+    try:
+        # Another worker may have filled the cache while we waited on the lock
+        cached = await loop.run_in_executor(
+            None, get_cached_series, temporal, community, cell_lat, cell_lon, parameters, start, end
+        )
+        if cached is not None:
+            return cached
+        return await _fetch_and_store(temporal, cell_lat, cell_lon, parameters, start, end, community, url, timeout)
+    finally:
+        lock.__exit__(None, None, None)
+
+
+async def _fetch_and_store(temporal, cell_lat, cell_lon, parameters, start, end, community, url, timeout):
+    series = await request_series_async(temporal, cell_lat, cell_lon, parameters, start, end, community, url, timeout)
+    await asyncio.get_running_loop().run_in_executor(
+        None, store_series, temporal, community, cell_lat, cell_lon, series, start, end
+    )
+    return series
+
+
+async def request_series_async(temporal, cell_lat, cell_lon, parameters, start, end, community="AG", url=None,
+                               timeout=30):
+    """
+    One POWER point request straight into {parameter: PowerSeries}, bypassing
+    the cache. The body is streamed through PowerStreamParser as it arrives.
+    """
+    request_url, params = build_power_request(temporal, cell_lat, cell_lon, parameters, start, end, community, url)
+    parser = None
+    parse_seconds = 0.0
+
+    async def read(response):
+        nonlocal parser, parse_seconds
+        # A retried attempt starts over with a fresh parser
+        parser = PowerStreamParser(temporal)
+        parse_seconds = 0.0
+        # Download and parse interleave; split the time between the two stages
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            t = time.perf_counter()
+            parser.feed(chunk)
+            parse_seconds += time.perf_counter() - t
+
+    started = time.perf_counter()
+    try:
+        status, text = await get_with_retry(request_url, {k: str(v) for k, v in params.items()}, timeout, read)
+        if status != 200:
+            parse_power_response(status, text)
+        t = time.perf_counter()
+        series = parser.close()
+        parse_seconds += time.perf_counter() - t
+    except ValueError as e:
+        raise PowerAPIError(str(e), 200)
+    metrics.observe_stage("fetch", time.perf_counter() - started - parse_seconds)
+    metrics.observe_stage("parse", parse_seconds)
+    return series
+
+
+async def gather_power(requests, limit=None):
+    """
+    Fetch many series concurrently.
+
+    Args:
+        requests (list): dicts of fetch_power_series_async keyword arguments.
+        limit (int, optional): max requests in flight for this call.
+
+    Returns:
+        list: one {parameter: PowerSeries} per request, or the exception it raised.
+    """
+    semaphore = asyncio.Semaphore(limit) if limit else None
+
+    async def one(kwargs):
+        if semaphore is None:
+            return await fetch_power_series_async(**kwargs)
+        async with semaphore:
+            return await fetch_power_series_async(**kwargs)
+
+    return await asyncio.gather(*(one(kwargs) for kwargs in requests), return_exceptions=True)
+
+
+async def fetch_region_async(temporal, cells, parameters, start, end, community="AG", url=None, timeout=120,
+                             limit=None):
+    """
+    Fill the point cache for many grid cells with POWER regional requests.
+
+    Cells that already have every parameter cached are skipped; the rest are
+    grouped with region_tiles() and each tile is requested once per
+    POWER_REGIONAL_MAX_PARAMETERS parameters. Each missing cell and parameter
+    in a response is stored exactly as a point request would have stored it,
+    so later point lookups (fetch_power_series, nasa_fetch, gather_power) hit
+    the cache; entries already cached are left untouched.
+
+    Nothing is requested in offline mode or when point requests would be
+    no more numerous (scattered cells); callers then fall back to gather_power.
+
+    Returns:
+        dict: {"requests": n, "cells": cells stored, "failed": [{"bbox", "parameters", "error"}]}
+    """
+    summary = {"requests": 0, "cells": 0, "failed": []}
+    if temporal not in SERIES_TEMPORALS or POWER_OFFLINE:
+        return summary
+    if isinstance(parameters, str):
+        parameters = parameters.split(",")
+    parameters = list(parameters)
+    community = community.upper()
+    start, end = str(start), str(end)
+    loop = asyncio.get_running_loop()
+
+    missing = await loop.run_in_executor(
+        None, _missing_parameters, temporal, community, cells, parameters, start, end
+    )
+    jobs = []
+    for bbox, tile_cells in region_tiles(list(missing)):
+        needed = sorted({p for cell in tile_cells for p in missing[cell]})
+        for i in range(0, len(needed), POWER_REGIONAL_MAX_PARAMETERS):
+            jobs.append((bbox, needed[i:i + POWER_REGIONAL_MAX_PARAMETERS]))
+    if len(jobs) >= len(missing):
+        return summary
+
+    semaphore = asyncio.Semaphore(limit) if limit else None
+    stored = set()
+
+    async def one(bbox, codes):
+        request_url, params = build_region_request(temporal, bbox, codes, start, end, community, url)
+        started = time.perf_counter()
+        try:
+            status, text = await get_with_retry(request_url, {k: str(v) for k, v in params.items()}, timeout)
+            metrics.observe_stage("fetch", time.perf_counter() - started)
+            with metrics.stage("parse"):
+                # A 10° tile of multi-year daily data is tens of MB of JSON; parse off the loop
+                by_cell = await loop.run_in_executor(None, parse_region_response, status, text, temporal)
+        except PowerAPIError as e:
+            summary["failed"].append({"bbox": list(bbox), "parameters": codes, "error": str(e)})
+            return
+        written = await loop.run_in_executor(
+            None, _store_cells, temporal, community, by_cell, missing, start, end
+        )
+        summary["requests"] += 1
+        stored.update(written)
+
+    async def bounded(job):
+        if semaphore is None:
+            return await one(*job)
+        async with semaphore:
+            return await one(*job)
+
+    await asyncio.gather(*(bounded(job) for job in jobs))
+    summary["cells"] = len(stored)
+    return summary
+
+
+def _missing_parameters(temporal, community, cells, parameters, start, end):
+    """{cell: [parameters not cached for start–end]} for the cells (snapped to the grid)."""
+    missing = {}
+    for cell in {snap_to_grid(*c) for c in cells}:
+        codes = [p for p in parameters if get_cached_series(temporal, community, *cell, [p], start, end) is None]
+        if codes:
+            missing[cell] = codes
+    return missing
+
+
+def _store_cells(temporal, community, by_cell, missing, start, end):
+    """Store the missing parameters of each response cell; returns the cells written."""
+    written = []
+    for cell, series in by_cell.items():
+        fresh = {code: s for code, s in series.items() if code in missing.get(cell, ())}
+        if fresh:
+            store_series(temporal, community, cell[0], cell[1], fresh, start, end)
+            written.append(cell)
+    return written
+
+
+async def get_with_retry(url, params, timeout, read=None):
+    """
+    GET with the same retry policy as the sync http_client (429/5xx, jittered backoff).
+
+    Returns (status, text). With `read`, a 200 body is handed to that
+    coroutine as it streams in instead (text is then None); error bodies
+    are always returned as text.
+    """
+    session = await _get_session()
+    client_timeout = aiohttp.ClientTimeout(total=timeout or sum(http_client.DEFAULT_TIMEOUT))
+
+    for attempt in range(http_client.RETRY_TOTAL + 1):
+        start = time.perf_counter()
+        try:
+            async with session.get(url, params=params, timeout=client_timeout) as response:
+                status = response.status
+                retry_after = response.headers.get("Retry-After")
+                if status == 200 and read is not None:
+                    await read(response)
+                    text = None
+                else:
+                    text = await response.text()
+            metrics.observe_upstream(url, status, time.perf_counter() - start)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            metrics.observe_upstream(url, type(e).__name__, time.perf_counter() - start)
+            if attempt == http_client.RETRY_TOTAL:
+                raise PowerAPIError(f"NASA API request failed: {e}") from e
+            await asyncio.sleep(_backoff(attempt))
+            continue
+
+        if status not in http_client.RETRY_STATUSES or attempt == http_client.RETRY_TOTAL:
+            return status, text
+        delay = float(retry_after) if retry_after and retry_after.isdigit() else _backoff(attempt)
+        await asyncio.sleep(delay)
+
+
+def _backoff(attempt):
+    return http_client.RETRY_BACKOFF * (2 ** attempt) + random.uniform(0, http_client.RETRY_JITTER)
@@ -0,0 +1,89 @@
+import logging
+import os
+import asyncio
+from concurrent.futures import as_completed
+from app.utils import async_power
+from app.utils.analysis import fetch_and_analyze_nasa_data, PARAMETER_MAP
+from app.utils.power_cache import snap_to_grid, PowerAPIError
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+BATCH_MAX_LOCATIONS = int(os.getenv("BATCH_MAX_LOCATIONS", "5000"))
+
+
+def analyze_locations(locations, thresholds, start_date, end_date, detailed=False, max_concurrency=None):
+    """
+    Run fetch_and_analyze_nasa_data for many locations sharing one threshold set.
+
+    Locations in the same POWER grid cell are analyzed once. The NASA fetches for
+    all cells run concurrently on the async fetch layer (at most
+    BATCH_MAX_CONCURRENCY in flight) and results are yielded as soon as each
+    cell's data arrives, one dict per input location (in completion order):
+
+        {"index": 0, "id": ..., "latitude": ..., "longitude": ..., "cell": [lat, lon], "result": {...}}
+    """
+    cells = {}
+    for index, loc in enumerate(locations):
+        cell = snap_to_grid(loc["latitude"], loc["longitude"])
+        cells.setdefault(cell, []).append((index, loc))
+
+    logger.debug("Batch analysis: %s locations → %s grid cells", len(locations), len(cells))
+
+    parameters = [PARAMETER_MAP[key] for key in thresholds if key in PARAMETER_MAP]
+    if parameters:
+        # Clustered farms (a district) come down in a few regional requests; a no-op when scattered
+        region = async_power.run(async_power.fetch_region_async(
+            "daily", list(cells), parameters, start_date, end_date, limit=max_concurrency or BATCH_MAX_CONCURRENCY,
+        ))
+        for failure in region["failed"]:
+            logger.warning("Batch regional request failed for %s: %s", failure["bbox"], failure["error"])
+    semaphore = asyncio.Semaphore(max_concurrency or BATCH_MAX_CONCURRENCY)
+    futures = {
+        async_power.submit(_prefetch_cell(cell, parameters, start_date, end_date, semaphore)): cell
+        for cell in cells
+    }
+
+    try:
+        for future in as_completed(futures):
+            cell = futures[future]
+            error = future.result()
+            # Data is in the cache now, so the analysis itself never waits on NASA
+            result = error or _analyze_cell(thresholds, cell, start_date, end_date, detailed)
+            for index, loc in cells[cell]:
+                yield {
+                    "index": index,
+                    "id": loc.get("id"),
+                    "latitude": loc["latitude"],
+                    "longitude": loc["longitude"],
+                    "cell": list(cell),
+                    "result": result,
+                }
+    finally:
+        # Client went away: don't start NASA calls nobody will read
+        for future in futures:
+            future.cancel()
+
+
+async def _prefetch_cell(cell, parameters, start_date, end_date, semaphore):
+    """Load one cell's series into the cache; returns an error dict on failure, else None."""
+    if not parameters:
+        return None
+    async with semaphore:
+        try:
+            await async_power.fetch_power_series_async("daily", cell[0], cell[1], parameters, start_date, end_date)
+        except PowerAPIError as e:
+            logger.error("Batch fetch failed for cell %s: %s", cell, e)
+            return {"error": str(e), "details": e.details}
+        except Exception as e:
+            logger.error("Batch fetch failed for cell %s: %s", cell, e)
+            return {"error": str(e)}
+    return None
+
+
+def _analyze_cell(thresholds, cell, start_date, end_date, detailed):
+    try:
+        return fetch_and_analyze_nasa_data(dict(thresholds), cell[0], cell[1], start_date, end_date, detailed=detailed)
+    except Exception as e:
+        logger.error("Batch analysis failed for cell %s: %s", cell, e)
+        return {"error": str(e)}
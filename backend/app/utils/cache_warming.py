@@ -0,0 +1,287 @@
+import os
+import time
+import atexit
+import sqlite3
+import logging
+import datetime
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from app.utils.power_cache import CACHE_DB_PATH, LOCK_DIR, POWER_OFFLINE, snap_to_grid
+from app.utils.single_flight import file_lock
+from app.utils.rate_limit import TokenBucket
+from app.utils.nasa_power_fetcher import fetch_nasa_power_5yr
+from app.utils.weekly_forecast import get_forecast
+from app.utils.graphing import fetch_weather_trends
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Grid cells warmed per run, most queried first
+WARM_TOP_CELLS = int(os.getenv("WARM_TOP_CELLS", "50"))
+
+# Query counts older than this many days don't count towards popularity
+WARM_LOOKBACK_DAYS = int(os.getenv("WARM_LOOKBACK_DAYS", "14"))
+
+# Most popular variants (forecast lengths, graphing year ranges) warmed per cell
+WARM_VARIANTS = int(os.getenv("WARM_VARIANTS", "2"))
+
+# Warm jobs running at once, and the upstream budget they share (jobs per second)
+WARM_CONCURRENCY = int(os.getenv("WARM_CONCURRENCY", "4"))
+WARM_RATE = float(os.getenv("WARM_RATE", "2"))
+WARM_BURST = int(os.getenv("WARM_BURST", "4"))
+
+# POWER daily data trails real time by about this many days; forecast warming
+# stops at the last published day instead of storing -999 placeholders
+WARM_PUBLISH_LAG_DAYS = int(os.getenv("WARM_PUBLISH_LAG_DAYS", "2"))
+
+# Off-peak time of day (server local "HH:MM") for the background scheduler
+WARM_AT = os.getenv("WARM_AT", "02:00")
+
+# Query counts are buffered in memory and written out at most this often (seconds)
+WARM_FLUSH_SECONDS = float(os.getenv("WARM_FLUSH_SECONDS", "30"))
+
+_local = threading.local()
+_pending = Counter()
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+# -------------------------
+# Query tracking
+# -------------------------
+def record_query(kind, lat, lon, variant=""):
+    """
+    Count one query for the grid cell containing (lat, lon).
+
+    variant: what the query asked for beyond the location, e.g. the number of
+    forecast days or a graphing "start-end:layout". Counts are buffered and
+    flushed to SQLite every WARM_FLUSH_SECONDS, so this is cheap per request.
+    """
+    global _last_flush
+    try:
+        cell = snap_to_grid(lat, lon)
+    except (TypeError, ValueError):
+        return
+    with _pending_lock:
+        _pending[(kind, *cell, str(variant))] += 1
+        due = time.monotonic() - _last_flush >= WARM_FLUSH_SECONDS
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        flush()
+
+
+def flush():
+    """Write buffered query counts to the database."""
+    with _pending_lock:
+        counts = dict(_pending)
+        _pending.clear()
+    if not counts:
+        return
+    day = datetime.date.today().isoformat()
+    conn = _connection()
+    with conn:
+        conn.executemany(
+            """INSERT INTO cell_queries VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (kind, cell_lat, cell_lon, variant, day) DO UPDATE SET hits = hits + excluded.hits""",
+            [(kind, lat, lon, variant, day, hits) for (kind, lat, lon, variant), hits in counts.items()],
+        )
+
+
+atexit.register(flush)
+
+
+def top_cells(n=None, lookback_days=None):
+    """[(cell, hits)] of the n most queried grid cells over the lookback window."""
+    since = (datetime.date.today() - datetime.timedelta(days=lookback_days or WARM_LOOKBACK_DAYS)).isoformat()
+    rows = _connection().execute(
+        """SELECT cell_lat, cell_lon, SUM(hits) AS total FROM cell_queries WHERE day >= ?
+           GROUP BY cell_lat, cell_lon ORDER BY total DESC LIMIT ?""",
+        (since, n or WARM_TOP_CELLS),
+    ).fetchall()
+    return [((lat, lon), total) for lat, lon, total in rows]
+
+
+def top_variants(kind, cell, n=None, lookback_days=None):
+    """The n variants of `kind` most queried for this cell."""
+    since = (datetime.date.today() - datetime.timedelta(days=lookback_days or WARM_LOOKBACK_DAYS)).isoformat()
+    rows = _connection().execute(
+        """SELECT variant, SUM(hits) AS total FROM cell_queries
+           WHERE kind = ? AND cell_lat = ? AND cell_lon = ? AND day >= ?
+           GROUP BY variant ORDER BY total DESC LIMIT ?""",
+        (kind, cell[0], cell[1], since, n or WARM_VARIANTS),
+    ).fetchall()
+    return [variant for variant, _ in rows]
+
+
+# -------------------------
+# Warming
+# -------------------------
+def plan(top=None):
+    """
+    Warm jobs for the most queried cells: (kind, cell, variant) tuples.
+
+    Every popular cell gets the /dashboard/data day-of-year (raw rows and
+    the computed averages); forecasts and graphing series are warmed for the
+    variants users actually asked for at that cell.
+    """
+    flush()
+    jobs = []
+    for cell, _ in top_cells(top):
+        jobs.append(("data", cell, ""))
+        for kind in ("forecast", "trends"):
+            jobs.extend((kind, cell, variant) for variant in top_variants(kind, cell))
+    return jobs
+
+
+def warm(target=None, top=None, concurrency=None, rate=None, dry_run=False):
+    """
+    Run the warm jobs through the same code paths the routes use, so both the
+    POWER cache and the result caches are filled for `target`
+    (default: the coming morning, see target_date).
+
+    At most `concurrency` jobs run at once and they start no faster than
+    `rate` per second; every job makes at most one NASA request, so that is
+    also the upstream budget.
+
+    Returns:
+        dict: {"target", "jobs", "warmed", "failed": [{"kind", "cell", "variant", "error"}], "seconds"}
+    """
+    target = target or target_date()
+    jobs = plan(top)
+    summary = {"target": target.isoformat(), "jobs": len(jobs), "warmed": 0, "failed": [], "seconds": 0.0}
+    if dry_run or not jobs:
+        summary["plan"] = [{"kind": k, "cell": list(c), "variant": v} for k, c, v in jobs]
+        return summary
+    if POWER_OFFLINE:
+        logger.info("Offline mode: skipping cache warming")
+        return summary
+
+    started = time.perf_counter()
+    bucket = TokenBucket(rate or WARM_RATE, WARM_BURST)
+
+    def run(job):
+        bucket.acquire()
+        return _warm_one(*job, target)
+
+    with ThreadPoolExecutor(max_workers=concurrency or WARM_CONCURRENCY, thread_name_prefix="cache-warm") as pool:
+        futures = {pool.submit(run, job): job for job in jobs}
+        for future in as_completed(futures):
+            kind, cell, variant = futures[future]
+            try:
+                error = future.result()
+            except Exception as e:
+                error = str(e)
+            if error:
+                logger.warning("Warming %s for %s (%s) failed: %s", kind, cell, variant, error)
+                summary["failed"].append({"kind": kind, "cell": list(cell), "variant": variant, "error": error})
+            else:
+                summary["warmed"] += 1
+
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    logger.info("Cache warming for %s: %s/%s jobs in %ss", target, summary["warmed"], len(jobs), summary["seconds"])
+    return summary
+
+
+def target_date(now=None):
+    """The date the next morning's traffic asks about: tomorrow after noon, else today."""
+    now = now or datetime.datetime.now()
+    return now.date() + datetime.timedelta(days=1 if now.hour >= 12 else 0)
+
+
+def _warm_one(kind, cell, variant, target):
+    """Run one job; returns an error message or None."""
+    if kind == "data":
+        fetch_nasa_power_5yr(cell[0], cell[1], target.month, target.day)
+        return None
+    if kind == "forecast":
+        # Stop at the last published day (the window ends the day before `today`)
+        last_published = datetime.date.today() - datetime.timedelta(days=WARM_PUBLISH_LAG_DAYS)
+        result = get_forecast(
+            cell[0], cell[1], int(variant or 7), today=min(target, last_published + datetime.timedelta(days=1))
+        )
+    elif kind == "trends":
+        years, _, layout = variant.partition(":")
+        start, _, end = years.partition("-")
+        result = fetch_weather_trends(cell[0], cell[1], start, end, layout=layout or "nested")
+    else:
+        return f"Unknown kind '{kind}'"
+    return result.get("error") if isinstance(result, dict) else None
+
+
+# -------------------------
+# Scheduler
+# -------------------------
+def start_scheduler(at=None):
+    """
+    Warm the cache once a day at `at` (server local "HH:MM", WARM_AT) in a
+    daemon thread. With several worker processes, only the first to take
+    the lock runs each day's warm.
+    """
+    hour, minute = (int(v) for v in (at or WARM_AT).split(":"))
+    thread = threading.Thread(target=_schedule_loop, args=(hour, minute), name="cache-warm-scheduler", daemon=True)
+    thread.start()
+    return thread
+
+
+def _schedule_loop(hour, minute):
+    while True:
+        now = datetime.datetime.now()
+        next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += datetime.timedelta(days=1)
+        time.sleep((next_run - now).total_seconds())
+        flush()
+        try:
+            run_once()
+        except Exception:
+            logger.exception("Scheduled cache warming failed")
+
+
+def run_once(**kwargs):
+    """warm() unless another process already warmed for the same target; returns its summary or None."""
+    target = kwargs.pop("target", None) or target_date()
+    with file_lock(LOCK_DIR, ("cache-warm",)):
+        conn = _connection()
+        if conn.execute("SELECT 1 FROM warm_runs WHERE target = ?", (target.isoformat(),)).fetchone():
+            return None
+        summary = warm(target, **kwargs)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO warm_runs VALUES (?, ?, ?, ?)",
+                (target.isoformat(), time.time(), summary["warmed"], len(summary["failed"])),
+            )
+    return summary
+
+
+def _connection():
+    """One SQLite connection per thread (shares the POWER cache database file)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(CACHE_DB_PATH), exist_ok=True)
+        conn = sqlite3.connect(CACHE_DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS cell_queries (
+                kind TEXT NOT NULL,
+                cell_lat REAL NOT NULL,
+                cell_lon REAL NOT NULL,
+                variant TEXT NOT NULL,
+                day TEXT NOT NULL,
+                hits INTEGER NOT NULL,
+                PRIMARY KEY (kind, cell_lat, cell_lon, variant, day)
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS warm_runs (
+                target TEXT PRIMARY KEY,
+                finished_at REAL NOT NULL,
+                warmed INTEGER NOT NULL,
+                failed INTEGER NOT NULL
+            )"""
+        )
+        _local.conn = conn
+    return conn
@@ -0,0 +1,224 @@
+import logging
+import os
+import json
+import warnings
+import datetime
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from app.utils.power_cache import fetch_power_series, snap_to_grid
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+_basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+CLIMATOLOGY_DIR = os.getenv("CLIMATOLOGY_DIR", os.path.join(_basedir, "instances", "climatology"))
+
+# Years of daily history behind each table (ending with last complete year)
+CLIMATOLOGY_YEARS = int(os.getenv("CLIMATOLOGY_YEARS", "30"))
+
+# Grid cells to precompute, e.g. CLIMATOLOGY_CELLS="-1.29,36.82;0.52,35.27"
+CLIMATOLOGY_CELLS = os.getenv("CLIMATOLOGY_CELLS", "")
+
+CLIMATOLOGY_PARAMETERS = ["T2M", "PRECTOTCORR", "WS2M", "RH2M"]
+
+# Days counted as exceedances per parameter (value > threshold)
+EXCEEDANCE_THRESHOLDS = {
+    "T2M": 30.0,          # hot day (°C)
+    "PRECTOTCORR": 10.0,  # heavy rain day (mm/day)
+    "WS2M": 8.0,          # windy day (m/s)
+    "RH2M": 80.0,         # humid day (%)
+}
+
+PERCENTILES = [10, 25, 50, 75, 90]
+STAT_NAMES = ["mean", "std"] + [f"p{p}" for p in PERCENTILES]
+
+# Day-of-year slots follow a leap-year calendar so Feb 29 always has its own slot
+DAYS_IN_YEAR = 366
+_MONTH_OFFSETS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def doy_slot(month, day):
+    """0-based slot of a calendar day in the 366-day table."""
+    return int(_MONTH_OFFSETS[month - 1]) + day - 1
+
+
+class ClimatologyIndex:
+    """
+    Per-day-of-year climatology for one grid cell.
+
+    values : float64 (years, 366, parameters) raw daily values, NaN where missing
+    stats  : float32 (366, parameters, len(STAT_NAMES))
+    exceed : int16   (366, parameters) days above EXCEEDANCE_THRESHOLDS
+    samples: int16   (366, parameters) non-missing days per slot
+    """
+
+    def __init__(self, cell, years, parameters, values, stats, exceed, samples, built_at):
+        self.cell = cell
+        self.years = years
+        self.parameters = list(parameters)
+        self.values = values
+        self.stats = stats
+        self.exceed = exceed
+        self.samples = samples
+        self.built_at = built_at
+
+    def day_stats(self, month, day):
+        """{parameter: {mean, std, p10.., exceed_count, samples, threshold}} for one calendar day."""
+        slot = doy_slot(month, day)
+        out = {}
+        for i, code in enumerate(self.parameters):
+            entry = {name: _clean(self.stats[slot, i, j]) for j, name in enumerate(STAT_NAMES)}
+            entry["threshold"] = EXCEEDANCE_THRESHOLDS.get(code)
+            entry["exceed_count"] = int(self.exceed[slot, i])
+            entry["samples"] = int(self.samples[slot, i])
+            out[code] = entry
+        return out
+
+    def covers_years(self, years):
+        return len(years) > 0 and years[0] >= self.years[0] and years[-1] <= self.years[-1]
+
+    def values_for_day(self, month, day, years):
+        """{parameter: [value per year]} for one calendar day, skipping missing years."""
+        slot = doy_slot(month, day)
+        rows = self.values[np.asarray(years) - self.years[0], slot, :]
+        return {
+            code: [float(v) for v in rows[:, i] if not np.isnan(v)]
+            for i, code in enumerate(self.parameters)
+        }
+
+
+def build_index(lat, lon, years=None, end_year=None):
+    """Fetch the daily history for one cell and compute its climatology table."""
+    cell = snap_to_grid(lat, lon)
+    end_year = end_year or datetime.date.today().year - 1
+    start_year = end_year - (years or CLIMATOLOGY_YEARS) + 1
+    year_list = np.arange(start_year, end_year + 1)
+
+    logger.info("Building climatology for cell %s: %s–%s", cell, start_year, end_year)
+    series = fetch_power_series(
+        "daily", cell[0], cell[1], CLIMATOLOGY_PARAMETERS, f"{start_year}0101", f"{end_year}1231", timeout=120
+    )
+
+    values = np.full((len(year_list), DAYS_IN_YEAR, len(CLIMATOLOGY_PARAMETERS)), np.nan)
+    for i, code in enumerate(CLIMATOLOGY_PARAMETERS):
+        s = series.get(code)
+        if s is None or not len(s):
+            continue
+        data = s.masked()
+        year_idx = s.years() - start_year
+        slots = _MONTH_OFFSETS[s.months() - 1] + s.days() - 1
+        keep = (year_idx >= 0) & (year_idx < len(year_list))
+        values[year_idx[keep], slots[keep], i] = data[keep]
+
+    samples = np.sum(~np.isnan(values), axis=0).astype(np.int16)
+    thresholds = np.array([EXCEEDANCE_THRESHOLDS[c] for c in CLIMATOLOGY_PARAMETERS])
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        # All-NaN slots (e.g. Feb 29 with no data) just yield NaN stats
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        exceed = np.sum(values > thresholds, axis=0).astype(np.int16)
+        stats = np.stack(
+            [np.nanmean(values, axis=0), np.nanstd(values, axis=0)]
+            + [np.nanpercentile(values, p, axis=0) for p in PERCENTILES],
+            axis=-1,
+        ).astype(np.float32)
+
+    return ClimatologyIndex(
+        cell, year_list, CLIMATOLOGY_PARAMETERS, values, stats, exceed, samples,
+        datetime.datetime.utcnow().isoformat(),
+    )
+
+
+def save_index(index):
+    os.makedirs(CLIMATOLOGY_DIR, exist_ok=True)
+    path = _path_for(index.cell)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(
+        tmp,
+        years=index.years,
+        values=index.values,
+        stats=index.stats,
+        exceed=index.exceed,
+        samples=index.samples,
+        meta=np.array(json.dumps({"parameters": index.parameters, "built_at": index.built_at})),
+    )
+    os.replace(tmp, path)
+    with _cache_lock:
+        _cache.pop(index.cell, None)
+    return path
+
+
+def get_index(lat, lon):
+    """Return the precomputed ClimatologyIndex for the point's grid cell, or None."""
+    cell = snap_to_grid(lat, lon)
+    path = _path_for(cell)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    with _cache_lock:
+        hit = _cache.get(cell)
+        if hit and hit[0] == mtime:
+            return hit[1]
+
+    with np.load(path) as npz:
+        meta = json.loads(str(npz["meta"]))
+        index = ClimatologyIndex(
+            cell, npz["years"], meta["parameters"], npz["values"], npz["stats"],
+            npz["exceed"], npz["samples"], meta["built_at"],
+        )
+    with _cache_lock:
+        _cache[cell] = (mtime, index)
+    return index
+
+
+def configured_cells():
+    """Grid cells listed in CLIMATOLOGY_CELLS (deduplicated)."""
+    cells = []
+    for pair in filter(None, CLIMATOLOGY_CELLS.split(";")):
+        lat, lon = pair.split(",")
+        cell = snap_to_grid(lat, lon)
+        if cell not in cells:
+            cells.append(cell)
+    return cells
+
+
+def build_configured(cells=None, years=None, force=False):
+    """Build (or rebuild) the index for every configured cell; returns built cells."""
+    end_year = datetime.date.today().year - 1
+    built = []
+    for cell in cells or configured_cells():
+        existing = get_index(*cell)
+        if existing is not None and not force and int(existing.years[-1]) >= end_year:
+            continue
+        try:
+            save_index(build_index(cell[0], cell[1], years=years, end_year=end_year))
+            built.append(cell)
+        except Exception as e:
+            logger.error("Climatology build failed for %s: %s", cell, e)
+    return built
+
+
+def start_background_build():
+    """Build missing/stale configured cells in a daemon thread."""
+    thread = threading.Thread(target=build_configured, name="climatology-build", daemon=True)
+    thread.start()
+    return thread
+
+
+def _path_for(cell):
+    return os.path.join(CLIMATOLOGY_DIR, f"{cell[0]:.4f}_{cell[1]:.4f}.npz")
+
+
+def _clean(value):
+    value = float(value)
+    return None if np.isnan(value) else round(value, 2)
+
+
+if __name__ == "__main__":
+    print("Built:", build_configured())
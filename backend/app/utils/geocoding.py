@@ -0,0 +1,233 @@
+import logging
+import os
+import re
+import csv
+import time
+import bisect
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from dotenv import load_dotenv
+from app.utils import http_client, metrics
+from app.utils.rate_limit import SharedRateLimiter
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+
+_basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+GEOCODE_CACHE_DB = os.getenv("GEOCODE_CACHE_DB", os.path.join(_basedir, "instances", "geocode_cache.db"))
+GEOCODE_LRU_SIZE = int(os.getenv("GEOCODE_LRU_SIZE", "10000"))
+
+# Nominatim usage policy: at most 1 request per second. The budget is shared
+# by every worker process through GEOCODE_RATE_FILE.
+GEOCODE_RATE = float(os.getenv("GEOCODE_RATE", "1.0"))
+GEOCODE_RATE_FILE = os.getenv("GEOCODE_RATE_FILE", os.path.join(_basedir, "instances", "locks", "nominatim.rate"))
+
+# Places per /geocode request; each uncached one can cost a rate-limited second
+GEOCODE_MAX_PLACES = int(os.getenv("GEOCODE_MAX_PLACES", "20"))
+
+# Upper bound on ?limit= for autocomplete
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+# "Not found" answers are remembered for this long before asking again
+GEOCODE_NEGATIVE_TTL = int(os.getenv("GEOCODE_NEGATIVE_TTL", str(24 * 3600)))
+
+# Optional offline gazetteer: CSV with name,latitude,longitude[,population] columns
+GEOCODE_GAZETTEER = os.getenv("GEOCODE_GAZETTEER")
+
+_NOT_FOUND = object()
+
+_lru = OrderedDict()
+_lru_lock = threading.Lock()
+_local = threading.local()
+_limiter = SharedRateLimiter(GEOCODE_RATE_FILE, GEOCODE_RATE)
+_flights = SingleFlight()
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def normalize_place(name):
+    """Canonical cache key: NFKC, case-folded, single-spaced, no stray punctuation."""
+    name = unicodedata.normalize("NFKC", str(name)).casefold()
+    name = re.sub(r"[^\w\s,'-]", " ", name)
+    name = re.sub(r"\s*,\s*", ", ", name)
+    return re.sub(r"\s+", " ", name).strip(" ,")
+
+
+def geocode(place_name):
+    """
+    Return (lat, lon) for a place name.
+
+    Lookup order: in-memory LRU → SQLite cache → gazetteer → Nominatim
+    (rate limited to GEOCODE_RATE requests/s). Raises ValueError if the place
+    cannot be found.
+    """
+    key = normalize_place(place_name)
+    if not key:
+        raise ValueError("Location not found.")
+
+    result = _lookup_cached(key)
+    metrics.cache_lookup("geocode", "miss" if result is None else "hit")
+    if result is None:
+        # Concurrent lookups of the same name wait for a single upstream call
+        result = _flights.do(key, lambda: _resolve_miss(key, place_name))
+
+    if result is _NOT_FOUND:
+        raise ValueError("Location not found.")
+    return result
+
+
+def geocode_many(place_names):
+    """
+    Resolve a list of place names, deduplicating by normalized name.
+    Returns {original name: (lat, lon) or None}, preserving input order.
+    """
+    resolved = {}
+    by_key = {}
+    for name in place_names:
+        by_key.setdefault(normalize_place(name), []).append(name)
+
+    for key, names in by_key.items():
+        try:
+            coords = geocode(names[0])
+        except ValueError:
+            coords = None
+        except Exception as e:
+            logger.error("Geocoding failed for %r: %s", names[0], e)
+            coords = None
+        for name in names:
+            resolved[name] = coords
+    return {name: resolved[name] for name in place_names}
+
+
+def autocomplete(prefix, limit=10):
+    """Gazetteer entries whose name starts with prefix, most populous first."""
+    entries = _load_gazetteer()
+    key = normalize_place(prefix)
+    if not entries or not key:
+        return []
+
+    names = entries["keys"]
+    lo = bisect.bisect_left(names, key)
+    hi = bisect.bisect_left(names, key + "\uffff")
+    rows = sorted(entries["rows"][lo:hi], key=lambda r: -r[3])[:limit]
+    return [{"name": r[0], "latitude": r[1], "longitude": r[2]} for r in rows]
+
+
+def _lookup_cached(key):
+    with _lru_lock:
+        if key in _lru:
+            _lru.move_to_end(key)
+            return _lru[key]
+
+    row = _connection().execute(
+        "SELECT latitude, longitude, found, created_at FROM geocode_cache WHERE name=?", (key,)
+    ).fetchone()
+    if row is not None:
+        lat, lon, found, created_at = row
+        if found:
+            return _remember(key, (lat, lon))
+        if time.time() - created_at < GEOCODE_NEGATIVE_TTL:
+            return _remember(key, _NOT_FOUND)
+
+    hit = _gazetteer_exact(key)
+    if hit is not None:
+        return _remember(key, hit)
+    return None
+
+
+def _resolve_miss(key, place_name):
+    # Another thread may have resolved it while we queued
+    cached = _lookup_cached(key)
+    if cached is not None:
+        return cached
+
+    _limiter.acquire()
+    params = {"q": place_name, "format": "json", "limit": 1}
+    response = http_client.get(NOMINATIM_URL, params=params, timeout=10)
+    response.raise_for_status()
+    data = response.json()
+
+    if data:
+        result = (float(data[0]["lat"]), float(data[0]["lon"]))
+    else:
+        result = _NOT_FOUND
+
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO geocode_cache VALUES (?, ?, ?, ?, ?)",
+            (key, *(result if result is not _NOT_FOUND else (None, None)),
+             int(result is not _NOT_FOUND), time.time()),
+        )
+    return _remember(key, result)
+
+
+def _remember(key, value):
+    with _lru_lock:
+        _lru[key] = value
+        _lru.move_to_end(key)
+        while len(_lru) > GEOCODE_LRU_SIZE:
+            _lru.popitem(last=False)
+    return value
+
+
+def _gazetteer_exact(key):
+    entries = _load_gazetteer()
+    if not entries:
+        return None
+    i = bisect.bisect_left(entries["keys"], key)
+    if i < len(entries["keys"]) and entries["keys"][i] == key:
+        row = entries["rows"][i]
+        return row[1], row[2]
+    return None
+
+
+def _load_gazetteer():
+    """Load the gazetteer once into a sorted (prefix-searchable) index."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                rows = []
+                if GEOCODE_GAZETTEER and os.path.exists(GEOCODE_GAZETTEER):
+                    with open(GEOCODE_GAZETTEER, newline="", encoding="utf-8") as f:
+                        for rec in csv.DictReader(f):
+                            rows.append((
+                                normalize_place(rec["name"]),
+                                rec["name"],
+                                float(rec["latitude"]),
+                                float(rec["longitude"]),
+                                int(rec.get("population") or 0),
+                            ))
+                # Most populous first among identical names, so exact lookups pick it
+                rows.sort(key=lambda r: (r[0], -r[4]))
+                _gazetteer = {
+                    "keys": [r[0] for r in rows],
+                    "rows": [(r[1], r[2], r[3], r[4]) for r in rows],
+                }
+    return _gazetteer
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(GEOCODE_CACHE_DB), exist_ok=True)
+        conn = sqlite3.connect(GEOCODE_CACHE_DB, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS geocode_cache (
+                name TEXT PRIMARY KEY,
+                latitude REAL,
+                longitude REAL,
+                found INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        _local.conn = conn
+    return conn
@@ -1,18 +1,13 @@
-import requests
 from dotenv import load_dotenv
 import os
+from app.utils.geocoding import geocode
 
 load_dotenv()
 GEOCODE_API = os.getenv("GEOCODE_API")  # Optional custom API key
 
 def get_coordinates_from_place(place_name):
-    """Return latitude & longitude for a given place name."""
-    url = f"https://nominatim.openstreetmap.org/search?q={place_name}&format=json&limit=1"
-    response = requests.get(url, headers={"User-Agent": "NASA-WeatherApp"})
-    data = response.json()
-    if not data:
-        raise ValueError("Location not found.")
-    return float(data[0]["lat"]), float(data[0]["lon"])
+    """Return latitude & longitude for a given place name (cached, rate limited)."""
+    return geocode(place_name)
 
 def validate_coordinates(lat, lon):
     """Ensure latitude and longitude are within valid range."""
@@ -0,0 +1,113 @@
+import os
+import hashlib
+import datetime
+from functools import wraps
+from urllib.parse import urlencode
+from flask import request, redirect, make_response
+from dotenv import load_dotenv
+from app.utils.power_cache import RECENT_DAYS
+
+load_dotenv()
+
+# Bump to invalidate every ETag (e.g. after changing how results are computed)
+DATA_VERSION = os.getenv("DATA_VERSION", "1")
+
+# Fully historical ranges never change; recent ones may be revised by NASA
+HTTP_CACHE_HISTORICAL_MAX_AGE = int(os.getenv("HTTP_CACHE_HISTORICAL_MAX_AGE", str(365 * 24 * 3600)))
+HTTP_CACHE_RECENT_MAX_AGE = int(os.getenv("HTTP_CACHE_RECENT_MAX_AGE", "3600"))
+
+
+def canonical_query(args):
+    """
+    Stable query string for a request: keys sorted, repeated values sorted,
+    numbers normalized ("05" → "5", "-1.2860" → "-1.286").
+    """
+    pairs = []
+    for key in sorted(args.keys()):
+        for value in sorted(_canonical_value(v) for v in args.getlist(key)):
+            pairs.append((key, value))
+    return urlencode(pairs, safe=":,")
+
+
+def etag_for(path, canonical, salt=""):
+    """Strong ETag from the endpoint, canonical request and data version."""
+    digest = hashlib.sha256(f"{DATA_VERSION}|{path}|{canonical}|{salt}".encode()).hexdigest()
+    return digest[:32]
+
+
+def range_policy(end_date):
+    """(max_age, immutable) for data ending at end_date."""
+    if end_date < datetime.date.today() - datetime.timedelta(days=RECENT_DAYS):
+        return HTTP_CACHE_HISTORICAL_MAX_AGE, True
+    return HTTP_CACHE_RECENT_MAX_AGE, False
+
+
+def cacheable(policy, vary=()):
+    """
+    Make the GET variant of a view HTTP-cacheable.
+
+    policy(args) -> (max_age, immutable, salt) describes how long the answer
+    for these arguments stays valid; salt is mixed into the ETag for inputs
+    that are implicit in the request (e.g. "the last five years", or the
+    representation negotiated from a header listed in `vary`).
+
+    Non-canonical query strings are redirected to their canonical form so
+    caches in front of Flask see one URL per distinct request, and
+    If-None-Match hits are answered with 304 before the view runs.
+    POST requests pass straight through.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET":
+                return view(*args, **kwargs)
+
+            canonical = canonical_query(request.args)
+            if request.query_string.decode() != canonical:
+                response = redirect(f"{request.path}?{canonical}", code=308)
+                response.headers["Cache-Control"] = f"public, max-age={HTTP_CACHE_HISTORICAL_MAX_AGE}"
+                return response
+
+            try:
+                max_age, immutable, salt = policy(request.args)
+            except (KeyError, TypeError, ValueError):
+                # Let the view produce its usual validation error
+                return view(*args, **kwargs)
+
+            etag = etag_for(request.path, canonical, salt)
+            cache_control = f"public, max-age={max_age}" + (", immutable" if immutable else "")
+
+            # Compressed variants carry a suffixed ETag (see compress_response); echo the one that matched
+            matched = next(
+                (tag for tag in (etag, f"{etag}-gzip", f"{etag}-br") if request.if_none_match.contains(tag)), None
+            )
+            if matched is not None:
+                response = make_response("", 304)
+                response.set_etag(matched)
+                response.headers["Cache-Control"] = cache_control
+                response.vary.add("Accept-Encoding")
+                response.vary.update(vary)
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            response.vary.update(vary)
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers["Cache-Control"] = cache_control
+            else:
+                response.headers["Cache-Control"] = "no-store"
+            return response
+        return wrapper
+    return decorator
+
+
+def _canonical_value(value):
+    value = value.strip()
+    try:
+        return str(int(value))
+    except ValueError:
+        pass
+    try:
+        return repr(float(value))
+    except ValueError:
+        return value
@@ -0,0 +1,95 @@
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from app.utils import metrics
+
+load_dotenv()
+
+# (connect, read) seconds used when a caller doesn't pass its own timeout
+DEFAULT_TIMEOUT = (
+    float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+    float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+)
+
+# Retries on throttling / upstream failures, exponential backoff with jitter
+RETRY_TOTAL = int(os.getenv("HTTP_RETRY_TOTAL", "3"))
+RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+RETRY_JITTER = float(os.getenv("HTTP_RETRY_JITTER", "0.5"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Keep-alive connections kept per host; unlisted hosts get DEFAULT_POOL_SIZE
+DEFAULT_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HOST_POOL_SIZES = {
+    "power.larc.nasa.gov": 32,
+    "nominatim.openstreetmap.org": 2,
+}
+# Extra/overriding sizes, e.g. HTTP_POOL_SIZES="localhost:8080=64,power.larc.nasa.gov=16"
+for _entry in filter(None, os.getenv("HTTP_POOL_SIZES", "").split(",")):
+    _host, _size = _entry.rsplit("=", 1)
+    HOST_POOL_SIZES[_host.strip()] = int(_size)
+
+USER_AGENT = os.getenv("HTTP_USER_AGENT", "NASA-WeatherApp")
+
+_session = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide pooled Session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get(url, params=None, timeout=None, **kwargs):
+    """GET through the shared session, always with a timeout."""
+    start = time.perf_counter()
+    try:
+        response = get_session().get(url, params=params, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+    except requests.RequestException as e:
+        metrics.observe_upstream(url, type(e).__name__, time.perf_counter() - start)
+        raise
+    metrics.observe_upstream(url, response.status_code, time.perf_counter() - start)
+    return response
+
+
+def reset_session():
+    """Drop the shared session (e.g. after fork or when settings change)."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _build_session():
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+
+    session.mount("http://", _adapter(DEFAULT_POOL_SIZE))
+    session.mount("https://", _adapter(DEFAULT_POOL_SIZE))
+    for host, size in HOST_POOL_SIZES.items():
+        # Longest prefix wins in requests, so these override the defaults above
+        session.mount(f"https://{host}/", _adapter(size))
+        session.mount(f"http://{host}/", _adapter(size))
+    return session
+
+
+def _adapter(pool_size):
+    retry = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF,
+        backoff_jitter=RETRY_JITTER,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the last response back so callers can report it
+    )
+    return HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
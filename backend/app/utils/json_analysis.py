@@ -1,5 +1,182 @@
-import json
-from statistics import mean
+import warnings
+import numpy as np
+from app.utils.timeseries import MONTHLY_SLOTS, FILL_VALUE, series_from_parameters
+
+# NASA POWER codes → (internal key, readable label) for the 4 monthly parameters we fetch
+KEY_MAP = {
+    "T2M": ("temperature", "Average Air Temperature (°C)"),
+    "PRECTOTCORR": ("precipitation", "Precipitation (mm/month)"),
+    "WS2M": ("wind_speed", "Wind Speed (m/s)"),
+    "QV2M": ("humidity", "Specific Humidity (g/kg)"),
+}
+
+ROLLING_WINDOW = 12
+
+
+class MonthlyEngine:
+    """
+    Monthly POWER parameters as one (parameter, year, month) array.
+
+    The year/month index is derived once from the series layout (13 slots
+    per year, slot 13 being NASA's annual value, which is dropped), and
+    every statistic below is computed across all parameters at once.
+    Missing (-999) months are NaN and ignored by the means.
+    """
+
+    def __init__(self, series_by_param):
+        self.codes = [code for code in KEY_MAP if code in series_by_param and len(series_by_param[code])]
+        first_year = min((series_by_param[c].start.year for c in self.codes), default=0)
+        last_year = max((series_by_param[c].end.year for c in self.codes), default=-1)
+        self.years = np.arange(first_year, last_year + 1)
+
+        self.values = np.full((len(self.codes), len(self.years), 12), np.nan)
+        for i, code in enumerate(self.codes):
+            s = series_by_param[code]
+            raw = np.asarray(s.values, dtype=np.float64)
+            # Pad a trailing partial year so the array reshapes to whole years
+            raw = np.concatenate([raw, np.full(-len(raw) % MONTHLY_SLOTS, FILL_VALUE)])
+            months = raw.reshape(-1, MONTHLY_SLOTS)[:, :12]
+            offset = s.start.year - first_year
+            self.values[i, offset:offset + len(months)] = np.where(months == FILL_VALUE, np.nan, months)
+
+    @classmethod
+    def from_parameters(cls, parameters):
+        """Build from POWER's {code: {"YYYYMM": value}} monthly parameter dict."""
+        return cls(series_from_parameters(parameters, "monthly"))
+
+    # -------------------------
+    # Vectorized statistics
+    # -------------------------
+    def yearly_means(self):
+        """(parameter, year) mean of the valid months."""
+        return _nanmean(self.values, axis=2)
+
+    def climatology(self):
+        """(parameter, month) full-period mean per calendar month."""
+        return _nanmean(self.values, axis=1)
+
+    def anomalies(self):
+        """(parameter, year, month) departure from the monthly climatology."""
+        return self.values - self.climatology()[:, None, :]
+
+    def trend(self):
+        """(parameter,) least-squares slope of the yearly means, in units per year."""
+        y = self.yearly_means()
+        valid = ~np.isnan(y)
+        n = valid.sum(axis=1)
+        x = np.where(valid, self.years[None, :], 0.0)
+        y0 = np.where(valid, y, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            x_mean = x.sum(axis=1) / n
+            y_mean = y0.sum(axis=1) / n
+            dx = np.where(valid, self.years[None, :] - x_mean[:, None], 0.0)
+            slope = (dx * (y0 - y_mean[:, None])).sum(axis=1) / (dx ** 2).sum(axis=1)
+        return np.where(n >= 2, slope, np.nan)
+
+    def rolling_means(self, window=ROLLING_WINDOW):
+        """(parameter, months) trailing `window`-month means; NaN until a full valid window."""
+        flat = self.values.reshape(len(self.codes), -1)
+        valid = ~np.isnan(flat)
+        zero = np.zeros((len(self.codes), 1))
+        sums = np.concatenate([zero, np.cumsum(np.where(valid, flat, 0.0), axis=1)], axis=1)
+        counts = np.concatenate([zero, np.cumsum(valid, axis=1)], axis=1)
+        window_sums = sums[:, window:] - sums[:, :-window]
+        window_counts = counts[:, window:] - counts[:, :-window]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(window_counts == window, window_sums / window, np.nan)
+
+    # -------------------------
+    # Payloads
+    # -------------------------
+    def per_year(self):
+        """Legacy analyze_weather_json shape: {year: {key: {label, monthly, mean}}}."""
+        rounded = np.round(self.values, 2)
+        means = _nanmean(rounded, axis=2)
+        results = {}
+        for y, year in enumerate(self.years.tolist()):
+            entry = {key: {"label": label, "monthly": [], "mean": None} for key, label in KEY_MAP.values()}
+            for i, code in enumerate(self.codes):
+                row = rounded[i, y]
+                keep = np.flatnonzero(~np.isnan(row))
+                entry[KEY_MAP[code][0]] = {
+                    "label": KEY_MAP[code][1],
+                    "monthly": [{"month": f"{m + 1:02d}", "value": v} for m, v in zip(keep.tolist(), row[keep].tolist())],
+                    "mean": _clean(means[i, y]),
+                }
+            results[str(year)] = entry
+        return results
+
+    def columnar(self, binary=False):
+        """
+        Parallel-array layout: one shared monthly time axis plus one array per parameter.
+
+        With binary=True the arrays are little-endian float32 bytes (NaN where
+        missing) for the MessagePack variant; otherwise JSON lists with nulls.
+        """
+        pack = _pack_float32 if binary else _as_list
+        time = [f"{year}-{month:02d}" for year in self.years.tolist() for month in range(1, 13)]
+        rolling = self.rolling_means()
+        pad = np.full((len(self.codes), ROLLING_WINDOW - 1), np.nan)
+        rolling = np.concatenate([pad, rolling], axis=1) if len(time) else rolling[:, :0]
+        yearly = self.yearly_means()
+        slope = self.trend()
+        clim = self.climatology()
+
+        out = {
+            "time": time,
+            "years": self.years.tolist(),
+            "parameters": {},
+        }
+        if binary:
+            out["dtype"] = "<f4"
+        for i, code in enumerate(self.codes):
+            key, label = KEY_MAP[code]
+            out["parameters"][key] = {
+                "label": label,
+                "parameter": code,
+                "values": pack(self.values[i].reshape(-1)),
+                "rolling_12_month_mean": pack(rolling[i]),
+                "yearly_mean": pack(yearly[i]),
+                "climatology": pack(clim[i]),
+                "trend_per_decade": _clean(slope[i] * 10, 3),
+            }
+        return out
+
+    def statistics(self):
+        """Derived statistics per parameter key (climatology, anomalies, trend, rolling means)."""
+        yearly = self.yearly_means()
+        clim = self.climatology()
+        yearly_anomaly = yearly - _nanmean(yearly, axis=1)[:, None]
+        monthly_anomaly = self.anomalies()
+        slope = self.trend()
+        rolling = self.rolling_means()
+        rolling_labels = [
+            f"{year}-{month:02d}" for year in self.years.tolist() for month in range(1, 13)
+        ][ROLLING_WINDOW - 1:]
+
+        out = {}
+        for i, code in enumerate(self.codes):
+            key, label = KEY_MAP[code]
+            out[key] = {
+                "label": label,
+                "parameter": code,
+                "climatology": [_clean(v) for v in clim[i]],
+                "yearly": [
+                    {"year": year, "mean": _clean(yearly[i, y]), "anomaly": _clean(yearly_anomaly[i, y])}
+                    for y, year in enumerate(self.years.tolist())
+                ],
+                "monthly_anomalies": {
+                    str(year): [_clean(v) for v in monthly_anomaly[i, y]]
+                    for y, year in enumerate(self.years.tolist())
+                },
+                "trend_per_year": _clean(slope[i], 4),
+                "trend_per_decade": _clean(slope[i] * 10, 3),
+                "rolling_12_month_mean": [
+                    {"month": m, "value": _clean(v)} for m, v in zip(rolling_labels, rolling[i]) if not np.isnan(v)
+                ],
+            }
+        return out
+
 
 def analyze_weather_json(data):
     """
@@ -28,52 +205,24 @@ def analyze_weather_json(data):
     if not params:
         return {"error": "Invalid NASA JSON format", "keys": list(data.keys())}
 
-    # Map NASA POWER codes → descriptive readable names
-    key_map = {
-        "T2M": ("temperature", "Average Air Temperature (°C)"),
-        "PRECTOTCORR": ("precipitation", "Precipitation (mm/month)"),
-        "WS2M": ("wind_speed", "Wind Speed (m/s)"),
-        "QV2M": ("humidity", "Specific Humidity (g/kg)"),
-    }
-
-    results = {}
-
-    # Step 1: Process monthly values
-    for param_code, values in params.items():
-        if param_code not in key_map:
-            continue  # ignore unused NASA params if present
-
-        internal_key, readable_label = key_map[param_code]
-
-        for date_str, val in values.items():
-            # Skip NASA’s annual summary entries (month 13)
-            if date_str.endswith("13"):
-                continue
-
-            year = date_str[:4]
-            month = date_str[-2:]
-
-            if year not in results:
-                # Initialize only 4 parameters
-                results[year] = {
-                    "temperature": {"label": "Average Air Temperature (°C)", "monthly": [], "mean": None},
-                    "precipitation": {"label": "Precipitation (mm/month)", "monthly": [], "mean": None},
-                    "wind_speed": {"label": "Wind Speed (m/s)", "monthly": [], "mean": None},
-                    "humidity": {"label": "Specific Humidity (g/kg)", "monthly": [], "mean": None},
-                }
+    return MonthlyEngine.from_parameters({code: params[code] for code in KEY_MAP if code in params}).per_year()
+
+
+def _nanmean(values, axis):
+    # All-missing rows (e.g. a year with no data yet) just give NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmean(values, axis=axis)
+
+
+def _as_list(values, digits=2):
+    return [None if np.isnan(v) else round(v, digits) for v in values.tolist()]
 
-            results[year][internal_key]["monthly"].append({
-                "month": month,
-                "value": round(val, 2)
-            })
 
-    # Step 2: Compute yearly means
-    for year, vars_dict in results.items():
-        for var, data_obj in vars_dict.items():
-            if data_obj["monthly"]:
-                data_obj["mean"] = round(
-                    mean([m["value"] for m in data_obj["monthly"]]), 2
-                )
+def _pack_float32(values):
+    return np.asarray(values, dtype="<f4").tobytes()
 
-    return results
 
+def _clean(value, digits=2):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
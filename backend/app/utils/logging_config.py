@@ -0,0 +1,47 @@
+import os
+import json
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# DEBUG while developing; WARNING (or ERROR) in production silences the chatter
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# "text" for humans, "json" for log shippers
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields become top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RESERVED})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level=None, fmt=None):
+    """Set up the root "app" logger once (idempotent)."""
+    logger = logging.getLogger("app")
+    logger.setLevel(level or LOG_LEVEL)
+    if logger.handlers:
+        return logger
+
+    handler = logging.StreamHandler()
+    if (fmt or LOG_FORMAT) == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.propagate = False
+    return logger
@@ -0,0 +1,227 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from flask import request, g, Response
+from flask.json.provider import DefaultJSONProvider
+
+# Prometheus-style metrics, rendered in the text exposition format at /metrics.
+# Values are per process; with several gunicorn workers, scrape each worker or
+# aggregate in Prometheus.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+_collectors = []
+_registry_lock = threading.Lock()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._labels(k), v) for k, v in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def totals(self):
+        """{label values: (sum, count)}, e.g. for diffing around a block of work."""
+        with self._lock:
+            return {key: (state[-2], state[-1]) for key, state in self._values.items()}
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                out.append((f"{self.name}_bucket", self._labels(key, [("le", _fmt(bound))]), cumulative))
+            out.append((f"{self.name}_bucket", self._labels(key, [("le", "+Inf")]), state[-1]))
+            out.append((f"{self.name}_sum", self._labels(key), state[-2]))
+            out.append((f"{self.name}_count", self._labels(key), state[-1]))
+        return out
+
+
+def register_collector(fn):
+    """fn() -> iterable of (name, kind, documentation, [(labels dict, value), ...]) read at scrape time."""
+    _collectors.append(fn)
+    return fn
+
+
+# -------------------------
+# Shared metrics
+# -------------------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "weather_http_request_duration_seconds", "Latency of Flask requests.", ("method", "route", "status")
+)
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "weather_upstream_request_duration_seconds", "Latency of outbound HTTP calls.", ("service", "status")
+)
+UPSTREAM_ERRORS = Counter(
+    "weather_upstream_errors_total", "Outbound HTTP calls that failed or returned a non-2xx status.",
+    ("service", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "weather_stage_duration_seconds", "Time spent per processing stage.", ("stage",)
+)
+CACHE_LOOKUPS = Counter(
+    "weather_cache_lookups_total", "Cache lookups by cache and outcome.", ("cache", "result")
+)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as one processing stage (fetch, parse, compute, serialize, ...)."""
+    with STAGE_SECONDS.time(stage=name):
+        yield
+
+
+def observe_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def cache_lookup(cache, result):
+    CACHE_LOOKUPS.inc(cache=cache, result=result)
+
+
+def observe_upstream(url, status, seconds):
+    """Record one outbound call; status is the HTTP status or an exception class name."""
+    service = upstream_service(url)
+    UPSTREAM_REQUEST_SECONDS.observe(seconds, service=service, status=status)
+    if not (isinstance(status, int) and 200 <= status < 300):
+        UPSTREAM_ERRORS.inc(service=service, status=status)
+
+
+def upstream_service(url):
+    if "power.larc.nasa.gov" in url or "/temporal/" in url:
+        return "nasa_power"
+    if "nominatim" in url or "/search" in url:
+        return "nominatim"
+    return "other"
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in list(_registry):
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name}{labels} {_fmt(value)}" for name, labels, value in metric.samples())
+
+    for collect in list(_collectors):
+        for name, kind, documentation, samples in collect():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_str = "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}" if labels else ""
+                lines.append(f"{name}{label_str} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """Time every request and expose GET /metrics."""
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None and request.endpoint != "metrics":
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start, method=request.method, route=route, status=response.status_code
+            )
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    app.json = _TimedJSONProvider(app)
+
+
+class _TimedJSONProvider(DefaultJSONProvider):
+    """jsonify() with its encoding time recorded as the "serialize" stage."""
+
+    def dumps(self, obj, **kwargs):
+        with stage("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+def _fmt(value):
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -1,27 +1,16 @@
-import requests
 import datetime
+from app.utils.power_cache import fetch_power
+from app.utils.timeseries import series_from_parameters
 
 def fetch_nasa_power_data(lat, lon, start_date, end_date, parameters):
-    """Fetch data from NASA POWER API."""
-    base_url = "https://power.larc.nasa.gov/api/temporal/daily/point"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "start": start_date.strftime("%Y%m%d"),
-        "end": end_date.strftime("%Y%m%d"),
-        "parameters": ",".join(parameters),
-        "community": "AG",
-        "format": "JSON"
-    }
-    r = requests.get(base_url, params=params)
-    r.raise_for_status()
-    return r.json()
+    """Fetch data from NASA POWER API (served from the local cache when possible)."""
+    return fetch_power(
+        "daily", lat, lon, parameters,
+        start_date.strftime("%Y%m%d"), end_date.strftime("%Y%m%d"),
+        community="AG",
+    )
 
 def extract_mean_values(nasa_json):
-    """Compute mean value for each parameter."""
+    """Compute mean value for each parameter, ignoring NASA's -999 fill values."""
     data = nasa_json.get("properties", {}).get("parameter", {})
-    means = {}
-    for param, values in data.items():
-        vals = list(values.values())
-        means[param] = sum(vals) / len(vals) if vals else None
-    return means
+    return {param: series.mean() for param, series in series_from_parameters(data).items()}
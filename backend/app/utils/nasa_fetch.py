@@ -1,7 +1,12 @@
-import requests
+import asyncio
+import logging
 from datetime import datetime
+from app.utils.power_cache import fetch_power, PowerAPIError, POWER_BASE_URL
 
-NASA_API_URL = "https://power.larc.nasa.gov/api/temporal/{temporal}/point"
+logger = logging.getLogger(__name__)
+
+# Follows POWER_BASE_URL so a local mock (loadtest/mock_power.py) covers this path too
+NASA_API_URL = POWER_BASE_URL + "/{temporal}/point"
 
 # ✅ NASA POWER parameter mapping (internal readable → NASA variable code)
 PARAMETER_MAP = {
@@ -30,45 +35,28 @@ def fetch_nasa_power_data(lat, lon, start_date, end_date, temporal="daily"):
     if temporal not in ["daily", "monthly", "annual"]:
         raise ValueError(f"Invalid temporal argument '{temporal}'. Must be 'daily', 'monthly', or 'annual'.")
 
-    # Build API URL
-    url = NASA_API_URL.format(temporal=temporal)
-
-    # Define parameters for API request
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "start": start_date,
-        "end": end_date,
-        "community": "AG",
-        "parameters": ",".join(PARAMETER_MAP.values()),
-        "format": "JSON"
-    }
-
-    print(f"[DEBUG] Fetching NASA POWER {temporal} data for ({lat}, {lon})")
-    print(f"[DEBUG] Request parameters: {params}")
+    logger.debug("Fetching NASA POWER %s data for (%s, %s), %s → %s", temporal, lat, lon, start_date, end_date)
 
     try:
-        response = requests.get(url, params=params, timeout=30)
-        print(f"[DEBUG] Response status: {response.status_code}")
-
-        if response.status_code != 200:
-            return {"error": f"NASA API returned {response.status_code}", "details": response.text}
-
-        data = response.json()
-
-        # Validate structure
-        if "properties" not in data or "parameter" not in data["properties"]:
-            print("[ERROR] Invalid NASA response structure")
-            return {"error": "Invalid NASA API response structure", "data": data}
-
-        return data
-
-    except requests.exceptions.Timeout:
-        print("[ERROR] NASA API request timed out")
+        # Served from the local cache when the grid cell / range was fetched before
+        return fetch_power(
+            temporal, lat, lon, list(PARAMETER_MAP.values()), start_date, end_date,
+            community="AG", url=NASA_API_URL.format(temporal=temporal), timeout=30,
+        )
+
+    except PowerAPIError as e:
+        # Transport failures arrive as PowerAPIError chained to the aiohttp/asyncio error
+        if isinstance(e.__cause__, asyncio.TimeoutError):
+            logger.error("NASA API request timed out")
+            return {"error": "NASA API request timed out"}
+        if e.__cause__ is not None:
+            logger.error("NASA API request failed: %s", e.__cause__)
+            return {"error": "NASA API request failed", "details": str(e.__cause__)}
+        logger.error("NASA POWER error: %s", e)
+        return {"error": str(e), "details": e.details}
+    except asyncio.TimeoutError:
+        logger.error("NASA API request timed out")
         return {"error": "NASA API request timed out"}
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] NASA API request failed: {e}")
-        return {"error": "NASA API request failed", "details": str(e)}
     except Exception as e:
-        print(f"[ERROR] Unexpected error: {e}")
+        logger.exception("Unexpected error while fetching NASA POWER data")
         return {"error": "Unexpected error while fetching NASA POWER data", "details": str(e)}
@@ -1,9 +1,16 @@
-import requests
+import logging
+import calendar
 from datetime import datetime
 import statistics
 import os
 import json
 from dotenv import load_dotenv
+from app.utils.power_cache import fetch_power_series, snap_to_grid
+from app.utils import async_power, result_cache
+from app.utils.climatology import get_index
+from app.utils.timeseries import FILL_VALUE
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
@@ -37,35 +44,46 @@ def fetch_nasa_power_5yr(lat, lon, month, day, year=None, parameters=None):
 
     current_year = datetime.now().year
     start_year = current_year - 5
-    all_values = {param: [] for param in parameters}
-
-    print(f"\n🌍 Fetching NASA POWER data for lat={lat}, lon={lon}")
-    print(f"📅 Target date each year: {month:02d}-{day:02d}")
-    print(f"📆 Range: {start_year} → {current_year - 1}\n")
-
-    for yr in range(start_year, current_year):
-        date_str = f"{yr}{month:02d}{day:02d}"
-        url = (
-            f"{BASE_URL}?parameters={','.join(parameters)}"
-            f"&community=ag&longitude={lon}&latitude={lat}"
-            f"&start={date_str}&end={date_str}&format=JSON"
-        )
-
-        print(f"🔹 Fetching data for {yr}-{month:02d}-{day:02d}...")
+    years = list(range(start_year, current_year))
+
+    logger.debug(
+        "Five-year data for lat=%s lon=%s, %02d-%02d, %s → %s", lat, lon, month, day, start_year, current_year - 1
+    )
+
+    # Averages depend only on the grid cell and calendar day, so nearby points share them
+    cell = snap_to_grid(lat, lon)
+    key = result_cache.make_key(
+        "five_year", {"cell": cell, "month": month, "day": day, "years": years, "parameters": parameters}
+    )
+    found, result = result_cache.results.get("five_year", key)
+    if not found:
+        result, complete = _five_year_averages(lat, lon, month, day, years, parameters)
+        # Averages missing a failed year would otherwise be served until they expire
+        if complete:
+            result_cache.results.set("five_year", key, result, tags=[(*cell, *_window(years, month))])
 
+    # ✅ Return JSON with readable labels
+    return json.dumps({"latitude": lat, "longitude": lon, **result}, indent=4)
+
+
+def _five_year_averages(lat, lon, month, day, years, parameters):
+    """({"averages", ["climatology"]}, whether every year's values were fetched)."""
+    complete = True
+    # Precomputed climatology answers without touching NASA when it has the cell
+    index = get_index(lat, lon)
+    if index is not None and index.covers_years(years) and set(parameters) <= set(index.parameters):
+        logger.debug("Serving from precomputed climatology index")
+        day_values = index.values_for_day(month, day, years)
+        all_values = {param: day_values[param] for param in parameters}
+    else:
+        index = None
+        # One daily request covering the whole window, sliced locally.
+        # Falls back to concurrent per-year requests if the bulk call fails.
         try:
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            json_data = response.json()
-            data = json_data["properties"]["parameter"]
-
-            for param in parameters:
-                if param in data and date_str in data[param]:
-                    value = data[param][date_str]
-                    all_values[param].append(value)
-
+            all_values = _fetch_window(lat, lon, month, day, years, parameters)
         except Exception as e:
-            print(f"[WARN] Failed for {yr}-{month:02d}-{day:02d}: {e}")
+            logger.warning("Bulk window fetch failed (%s), falling back to per-year requests", e)
+            all_values, complete = _fetch_per_year(lat, lon, month, day, years, parameters)
 
     # Compute averages (rounded)
     means = {
@@ -74,18 +92,72 @@ def fetch_nasa_power_5yr(lat, lon, month, day, year=None, parameters=None):
         for param, values in all_values.items()
     }
 
-    print("\n📊 5-Year Averages:")
-    for name, avg in means.items():
-        print(f"  {name}: {avg}")
+    logger.debug("5-year averages: %s", means)
 
-    # ✅ Return JSON with readable labels
-    result = {
-        "latitude": lat,
-        "longitude": lon,
-        "averages": means,
+    result = {"averages": means}
+    if index is not None:
+        # Long-term stats for the same calendar day, keyed by readable names
+        result["climatology"] = {
+            PARAMETER_MAP.get(code, code): stats
+            for code, stats in index.day_stats(month, day).items()
+        }
+    return result, complete
+
+
+def _fetch_window(lat, lon, month, day, years, parameters):
+    """
+    Fetch the target month for every year in ONE request and pick out
+    the requested day of each year. The window runs from the 1st of the
+    month in the first year to the end of that month in the last year.
+    """
+    start_str, end_str = _window(years, month)
+
+    series = fetch_power_series(
+        "daily", lat, lon, parameters, start_str, end_str,
+        community="AG", url=BASE_URL, timeout=15,
+    )
+
+    # Values come back in year order; years without that date (Feb 29) or with
+    # a -999 fill value are skipped, as in the climatology index
+    return {
+        param: [v for v in series[param].select_month_day(month, day).tolist() if v != FILL_VALUE]
+        if param in series else []
+        for param in parameters
     }
 
-    return json.dumps(result, indent=4)
+
+def _window(years, month):
+    """("YYYYMMDD", "YYYYMMDD") from the 1st of the month in the first year to its end in the last."""
+    last = years[-1]
+    return f"{years[0]}{month:02d}01", f"{last}{month:02d}{calendar.monthrange(last, month)[1]:02d}"
+
+
+def _fetch_per_year(lat, lon, month, day, years, parameters):
+    """
+    Fetch one day per year; the per-year requests run concurrently on the async fetch layer.
+    Returns (values per parameter, whether every year succeeded).
+    """
+    date_strs = [f"{yr}{month:02d}{day:02d}" for yr in years]
+    logger.debug("Fetching %s single days concurrently", len(date_strs))
+
+    responses = async_power.run(async_power.gather_power([
+        dict(temporal="daily", lat=lat, lon=lon, parameters=parameters,
+             start=date_str, end=date_str, community="AG", url=BASE_URL, timeout=15)
+        for date_str in date_strs
+    ]))
+
+    # Keep year order so the averages match the sequential version exactly
+    all_values = {param: [] for param in parameters}
+    complete = True
+    for yr, series in zip(years, responses):
+        if isinstance(series, Exception):
+            logger.warning("Failed for %s-%02d-%02d: %s", yr, month, day, series)
+            complete = False
+            continue
+        for param in parameters:
+            if param in series and len(series[param]) and series[param].values[0] != FILL_VALUE:
+                all_values[param].append(float(series[param].values[0]))
+    return all_values, complete
 
 
 # Example usage:
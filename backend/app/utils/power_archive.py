@@ -0,0 +1,180 @@
+import logging
+import os
+import json
+import struct
+import datetime
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from app.utils.timeseries import PowerSeries, FILL_VALUE
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Offline archive served instead of HTTP when it has the cell, e.g. for field offices
+POWER_ARCHIVE_PATH = os.getenv("POWER_ARCHIVE_PATH")
+
+MAGIC = b"PWRARCH1"
+DTYPE = np.dtype("<f4")
+ALIGNMENT = 64
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+class PowerArchive:
+    """
+    Read-only view of a bulk POWER archive.
+
+    File layout:
+        8 bytes   magic "PWRARCH1"
+        4 bytes   little-endian header length
+        N bytes   JSON header (start date, day count, parameters, cells), padded to 64 bytes
+        data      float32 cube [cell, parameter, day] with -999 for missing values
+
+    Days are the innermost axis, so one parameter's date range for one cell
+    is a contiguous, zero-copy slice of the memory map. Nothing is read
+    from disk until a slice is actually touched.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a POWER archive")
+            (header_len,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_len))
+
+        self.temporal = header.get("temporal", "daily")
+        self.community = header.get("community", "AG")
+        self.start = datetime.date.fromisoformat(header["start"])
+        self.days = header["days"]
+        self.parameters = header["parameters"]
+        self.cells = [tuple(c) for c in header["cells"]]
+        self._cell_index = {cell: i for i, cell in enumerate(self.cells)}
+        self._param_index = {code: i for i, code in enumerate(self.parameters)}
+        self.cube = np.memmap(
+            path, dtype=DTYPE, mode="r", offset=header["data_offset"],
+            shape=(len(self.cells), len(self.parameters), self.days),
+        )
+
+    @property
+    def end(self):
+        return self.start + datetime.timedelta(days=self.days - 1)
+
+    def has_cell(self, cell):
+        return cell in self._cell_index
+
+    def get_series(self, cell, parameters, start, end, community="AG"):
+        """
+        {parameter: PowerSeries} backed by the memory map for [start, end],
+        or None if the archive doesn't hold this cell, parameter set or range.
+        """
+        if community.upper() != self.community or cell not in self._cell_index:
+            return None
+        if any(p not in self._param_index for p in parameters):
+            return None
+
+        if not _covers(self.start, self.end, start, end):
+            return None
+
+        c = self._cell_index[cell]
+        return {
+            code: PowerSeries("daily", self.start, self.cube[c, self._param_index[code]]).slice(start, end)
+            for code in parameters
+        }
+
+
+def get_archive():
+    """The archive configured by POWER_ARCHIVE_PATH, opened once per process (or None)."""
+    global _archive
+    if not POWER_ARCHIVE_PATH or not os.path.exists(POWER_ARCHIVE_PATH):
+        return None
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = PowerArchive(POWER_ARCHIVE_PATH)
+    return _archive
+
+
+def write_archive(path, cells, parameters, start, end, fetch, community="AG"):
+    """
+    Write a bulk archive for the given grid cells.
+
+    Args:
+        fetch (callable): fetch(cells) -> iterable of (cell, {parameter: PowerSeries} or Exception)
+            in any order; typically a concurrent fetch through the POWER cache.
+
+    Returns:
+        dict: {"cells": n, "failed": [cells], "bytes": file size}
+    """
+    global _archive
+    start = _to_date(start)
+    end = _to_date(end)
+    days = (end - start).days + 1
+
+    header = {
+        "version": 1,
+        "temporal": "daily",
+        "community": community.upper(),
+        "start": start.isoformat(),
+        "days": days,
+        "parameters": list(parameters),
+        "cells": [list(c) for c in cells],
+        "dtype": DTYPE.str,
+        "fill": FILL_VALUE,
+    }
+    # data_offset depends on the header size, which depends on data_offset's digits
+    header["data_offset"] = 0
+    for _ in range(2):
+        raw = json.dumps(header).encode()
+        prefix = len(MAGIC) + 4 + len(raw)
+        header["data_offset"] = prefix + (-prefix) % ALIGNMENT
+    raw = json.dumps(header).encode()
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(raw)))
+        f.write(raw)
+        f.write(b"\0" * (header["data_offset"] - f.tell()))
+
+    cube = np.memmap(
+        tmp, dtype=DTYPE, mode="r+", offset=header["data_offset"],
+        shape=(len(cells), len(parameters), days),
+    )
+    cube[:] = FILL_VALUE
+    cell_index = {tuple(c): i for i, c in enumerate(cells)}
+
+    failed = []
+    for cell, result in fetch(cells):
+        if isinstance(result, Exception):
+            logger.warning("Archive fetch failed for %s: %s", cell, result)
+            failed.append(cell)
+            continue
+        for p, code in enumerate(parameters):
+            series = result.get(code)
+            if series is None or not len(series):
+                continue
+            lo = (series.start - start).days
+            vals = series.values[max(0, -lo): days - lo]
+            cube[cell_index[tuple(cell)], p, max(lo, 0): max(lo, 0) + len(vals)] = vals
+    cube.flush()
+    del cube
+    os.replace(tmp, path)
+
+    with _archive_lock:
+        _archive = None  # reopen on next use
+    return {"cells": len(cells), "failed": failed, "bytes": os.path.getsize(path)}
+
+
+def _covers(first, last, start, end):
+    return first <= _to_date(start) and _to_date(end) <= last
+
+
+def _to_date(value):
+    if isinstance(value, datetime.date):
+        return value
+    value = str(value)
+    return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:8]))
@@ -0,0 +1,404 @@
+import os
+import json
+import time
+import sqlite3
+import datetime
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from app.utils import metrics
+from app.utils.power_archive import get_archive
+from app.utils.timeseries import PowerSeries, series_to_parameters
+
+load_dotenv()
+
+# Base of the POWER temporal API; "/{temporal}/point" is appended per request
+POWER_BASE_URL = os.getenv("POWER_BASE_URL", "https://power.larc.nasa.gov/api/temporal")
+
+_basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+CACHE_DB_PATH = os.getenv("POWER_CACHE_DB", os.path.join(_basedir, "instances", "power_cache.db"))
+
+# Dates newer than this many days may still be revised by NASA,
+# so entries that reach into that window expire after RECENT_TTL seconds.
+RECENT_DAYS = int(os.getenv("POWER_CACHE_RECENT_DAYS", "90"))
+RECENT_TTL = int(os.getenv("POWER_CACHE_RECENT_TTL", str(6 * 3600)))
+
+# POWER meteorology comes from MERRA-2 on a 0.5° (lat) x 0.625° (lon) grid
+GRID_LAT_STEP = 0.5
+GRID_LON_STEP = 0.625
+
+# Offline mode: serve only from the archive / cache, never call NASA
+POWER_OFFLINE = os.getenv("POWER_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+# Resolutions stored as PowerSeries arrays; anything else bypasses the cache
+SERIES_TEMPORALS = ("daily", "monthly")
+
+# Limits of the POWER regional endpoint: each side of the box between MIN and
+# MAX degrees, and at most MAX_PARAMETERS parameters per request
+POWER_REGIONAL_MAX_SPAN = float(os.getenv("POWER_REGIONAL_MAX_SPAN", "10"))
+POWER_REGIONAL_MIN_SPAN = float(os.getenv("POWER_REGIONAL_MIN_SPAN", "2"))
+POWER_REGIONAL_MAX_PARAMETERS = int(os.getenv("POWER_REGIONAL_MAX_PARAMETERS", "1"))
+
+# Coalesce identical in-flight requests; optionally across worker processes too
+SINGLEFLIGHT_FILE_LOCK = os.getenv("POWER_SINGLEFLIGHT_FILELOCK", "0").lower() in ("1", "true", "yes")
+LOCK_DIR = os.getenv("POWER_LOCK_DIR", os.path.join(_basedir, "instances", "locks"))
+
+_local = threading.local()
+_refresh_listeners = []
+
+
+class PowerAPIError(Exception):
+    """Raised when NASA POWER answers with an error or an unusable body."""
+
+    def __init__(self, message, status_code=None, details=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+
+def snap_to_grid(lat, lon):
+    """Return the (lat, lon) centre of the POWER grid cell containing the point."""
+    lat = min(max(float(lat), -90.0), 90.0)
+    lon = min(max(float(lon), -180.0), 180.0)
+    cell_lat = round(round(lat / GRID_LAT_STEP) * GRID_LAT_STEP, 4)
+    cell_lon = round(round(lon / GRID_LON_STEP) * GRID_LON_STEP, 4)
+    return cell_lat, cell_lon
+
+
+def cells_in_bbox(lat_min, lon_min, lat_max, lon_max):
+    """All POWER grid cell centres inside the bounding box, south-west first."""
+    lat_lo, lon_lo = snap_to_grid(lat_min, lon_min)
+    lat_hi, lon_hi = snap_to_grid(lat_max, lon_max)
+    lats = np.round(np.arange(lat_lo, lat_hi + GRID_LAT_STEP / 2, GRID_LAT_STEP), 4)
+    lons = np.round(np.arange(lon_lo, lon_hi + GRID_LON_STEP / 2, GRID_LON_STEP), 4)
+    return [(float(la), float(lo)) for la in lats for lo in lons]
+
+
+def fetch_power(temporal, lat, lon, parameters, start, end, community="AG", url=None, timeout=30):
+    """
+    Fetch NASA POWER point data through the local cache.
+
+    Coordinates are snapped to the POWER grid cell, so nearby locations share
+    one cache entry. Returns a POWER-shaped dict whose
+    ["properties"]["parameter"] holds one {date: value} series per parameter.
+
+    Raises:
+        PowerAPIError: NASA answered with an error status or an invalid body,
+            or the request itself failed.
+    """
+    if temporal not in SERIES_TEMPORALS:
+        # Annual/climatology responses are not indexed; pass them straight through
+        cell_lat, cell_lon = snap_to_grid(lat, lon)
+        return _request(temporal, cell_lat, cell_lon, _as_list(parameters), start, end, community, url, timeout)
+
+    series = fetch_power_series(temporal, lat, lon, parameters, start, end, community, url, timeout)
+    cell_lat, cell_lon = snap_to_grid(lat, lon)
+    return _as_power_json(cell_lat, cell_lon, series_to_parameters(series))
+
+
+def fetch_power_series(temporal, lat, lon, parameters, start, end, community="AG", url=None, timeout=30):
+    """
+    Same as fetch_power but returns {parameter: PowerSeries} without
+    building per-date dicts. Cached series covering a wider range are
+    sliced down to [start, end].
+    """
+    parameters = _as_list(parameters)
+    community = community.upper()
+    start, end = str(start), str(end)
+    cell_lat, cell_lon = snap_to_grid(lat, lon)
+
+    archive = get_archive()
+    if archive is not None and temporal == "daily":
+        archived = archive.get_series((cell_lat, cell_lon), parameters, start, end, community)
+        if archived is not None:
+            metrics.cache_lookup("power_archive", "hit")
+            return archived
+
+    cached = get_cached_series(temporal, community, cell_lat, cell_lon, parameters, start, end)
+    if cached is not None:
+        metrics.cache_lookup("power", "hit")
+        return cached
+    metrics.cache_lookup("power", "miss")
+    if POWER_OFFLINE:
+        raise PowerAPIError(f"Offline mode: no archived or cached data for cell ({cell_lat}, {cell_lon})")
+
+    # async_power imports this module, so import it on first use
+    from app.utils import async_power
+
+    # Misses go through the shared event loop: identical requests from any
+    # thread or coroutine share one upstream call, and the socket wait costs
+    # no thread of its own
+    return async_power.run(async_power.load_power_series(
+        temporal, cell_lat, cell_lon, parameters, start, end, community, url, timeout
+    ))
+
+
+def flight_key(temporal, community, cell_lat, cell_lon, parameters, start, end):
+    """Key identifying one upstream POWER request, shared by sync and async callers."""
+    return (temporal, community, cell_lat, cell_lon, tuple(sorted(parameters)), start, end)
+
+
+def get_cached_series(temporal, community, cell_lat, cell_lon, parameters, start, end):
+    """
+    Return {parameter: PowerSeries} if every parameter is cached and fresh
+    for a range containing [start, end], else None.
+    """
+    conn = _connection()
+    placeholders = ",".join("?" for _ in parameters)
+    rows = conn.execute(
+        f"""SELECT parameter, start, end, series_start, payload, fetched_at, provisional FROM power_arrays
+            WHERE temporal=? AND community=? AND cell_lat=? AND cell_lon=?
+              AND start<=? AND end>=? AND parameter IN ({placeholders})
+            ORDER BY fetched_at DESC""",
+        (temporal, community, cell_lat, cell_lon, start, end, *parameters),
+    ).fetchall()
+
+    now = time.time()
+    series = {}
+    for parameter, row_start, row_end, series_start, payload, fetched_at, provisional in rows:
+        if parameter in series or (provisional and now - fetched_at > RECENT_TTL):
+            continue
+        full = PowerSeries(
+            temporal,
+            datetime.date.fromisoformat(series_start),
+            np.frombuffer(payload, dtype=np.float64),
+        )
+        # A wider entry only answers if NASA actually returned the whole span
+        if (row_start, row_end) != (start, end) and not full.covers(start, end):
+            continue
+        series[parameter] = full.slice(start, end)
+
+    if any(p not in series for p in parameters):
+        return None
+    return {p: series[p] for p in parameters}
+
+
+def store_series(temporal, community, cell_lat, cell_lon, series_by_param, start, end):
+    """
+    Store {parameter: PowerSeries} for one grid cell and requested date range.
+
+    on_series_refreshed listeners run only when this replaces data already
+    held for the cell: the same range fetched again (a provisional entry
+    past RECENT_TTL) or an overlapping provisional range. First-time
+    fetches, regional fan-out included, leave results built on other
+    ranges alone.
+    """
+    provisional = int(_is_provisional(end))
+    now = time.time()
+    conn = _connection()
+    placeholders = ",".join("?" for _ in series_by_param)
+    with conn:
+        refreshed = conn.execute(
+            f"""SELECT 1 FROM power_arrays
+                WHERE temporal=? AND community=? AND cell_lat=? AND cell_lon=? AND parameter IN ({placeholders})
+                  AND ((start=? AND end=?) OR (provisional=1 AND start<=? AND end>=?))
+                LIMIT 1""",
+            (temporal, community, cell_lat, cell_lon, *series_by_param, start, end, end, start),
+        ).fetchone() is not None
+        conn.executemany(
+            "INSERT OR REPLACE INTO power_arrays VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (temporal, community, cell_lat, cell_lon, parameter, start, end,
+                 series.start.isoformat(), now, provisional,
+                 np.ascontiguousarray(series.values, dtype=np.float64).tobytes())
+                for parameter, series in series_by_param.items()
+            ],
+        )
+    if refreshed:
+        for listener in _refresh_listeners:
+            listener(temporal, community, cell_lat, cell_lon, start, end)
+
+
+def on_series_refreshed(listener):
+    """Call listener(temporal, community, cell_lat, cell_lon, start, end) when cached data is replaced."""
+    _refresh_listeners.append(listener)
+
+
+def build_power_request(temporal, cell_lat, cell_lon, parameters, start, end, community="AG", url=None):
+    """Return (url, query params) for a POWER point request."""
+    params = {
+        "parameters": ",".join(parameters),
+        "community": community.upper(),
+        "latitude": cell_lat,
+        "longitude": cell_lon,
+        "start": str(start),
+        "end": str(end),
+        "format": "JSON",
+    }
+    return url or f"{POWER_BASE_URL}/{temporal}/point", params
+
+
+def parse_power_response(status_code, text):
+    """Decode a POWER response body, raising PowerAPIError if it is unusable."""
+    if status_code != 200:
+        raise PowerAPIError(f"NASA API returned {status_code}", status_code=status_code, details=text)
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        raise PowerAPIError("Non-JSON response from NASA.", status_code, text)
+
+    if "properties" not in data or "parameter" not in data["properties"]:
+        raise PowerAPIError("Invalid NASA API response structure", status_code, data)
+    return data
+
+
+def region_tiles(cells):
+    """
+    Split the grid cells into POWER regional requests.
+
+    Returns:
+        list: (bbox, cells) pairs, bbox being (lat_min, lon_min, lat_max, lon_max)
+        no wider than POWER_REGIONAL_MAX_SPAN and widened to at least
+        POWER_REGIONAL_MIN_SPAN. Only tiles containing one of the cells are returned.
+    """
+    if not cells:
+        return []
+    lat_cells = int(POWER_REGIONAL_MAX_SPAN / GRID_LAT_STEP) + 1
+    lon_cells = int(POWER_REGIONAL_MAX_SPAN / GRID_LON_STEP) + 1
+    lat_origin = min(c[0] for c in cells)
+    lon_origin = min(c[1] for c in cells)
+
+    tiles = {}
+    for cell in cells:
+        i = int(round((cell[0] - lat_origin) / GRID_LAT_STEP)) // lat_cells
+        j = int(round((cell[1] - lon_origin) / GRID_LON_STEP)) // lon_cells
+        tiles.setdefault((i, j), []).append(cell)
+
+    out = []
+    for tile_cells in tiles.values():
+        lat_min, lat_max = _widen(min(c[0] for c in tile_cells), max(c[0] for c in tile_cells), 90.0)
+        lon_min, lon_max = _widen(min(c[1] for c in tile_cells), max(c[1] for c in tile_cells), 180.0)
+        out.append(((lat_min, lon_min, lat_max, lon_max), tile_cells))
+    return out
+
+
+def build_region_request(temporal, bbox, parameters, start, end, community="AG", url=None):
+    """Return (url, query params) for a POWER regional request."""
+    lat_min, lon_min, lat_max, lon_max = bbox
+    params = {
+        "parameters": ",".join(parameters),
+        "community": community.upper(),
+        "latitude-min": lat_min,
+        "latitude-max": lat_max,
+        "longitude-min": lon_min,
+        "longitude-max": lon_max,
+        "start": str(start),
+        "end": str(end),
+        "format": "JSON",
+    }
+    return url or f"{POWER_BASE_URL}/{temporal}/regional", params
+
+
+def parse_region_response(status_code, text, temporal):
+    """
+    Decode a POWER regional response into {cell: {parameter: PowerSeries}},
+    cells snapped to the grid. Raises PowerAPIError if the body is unusable.
+    """
+    if status_code != 200:
+        raise PowerAPIError(f"NASA API returned {status_code}", status_code=status_code, details=text)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        raise PowerAPIError("Non-JSON response from NASA.", status_code, text)
+    if "features" not in data:
+        raise PowerAPIError("Invalid NASA API regional response structure", status_code, data)
+
+    cells = {}
+    for feature in data["features"]:
+        try:
+            lon, lat = feature["geometry"]["coordinates"][:2]
+            parameters = feature["properties"]["parameter"]
+        except (KeyError, TypeError, ValueError):
+            raise PowerAPIError("Invalid NASA API regional response structure", status_code, feature)
+        cells[snap_to_grid(lat, lon)] = {
+            code: PowerSeries.from_dict(values, temporal) for code, values in parameters.items()
+        }
+    return cells
+
+
+def request_series(temporal, cell_lat, cell_lon, parameters, start, end, community="AG", url=None, timeout=30):
+    """
+    Fetch one POWER point request straight into {parameter: PowerSeries}.
+
+    The body is streamed and parsed incrementally, so multi-decade daily
+    requests never hold the full JSON text or a per-date dict in memory.
+    """
+    from app.utils import async_power
+
+    return async_power.run(async_power.request_series_async(
+        temporal, cell_lat, cell_lon, parameters, start, end, community, url, timeout
+    ))
+
+
+def _request(temporal, cell_lat, cell_lon, parameters, start, end, community, url, timeout):
+    from app.utils import async_power
+
+    url, params = build_power_request(temporal, cell_lat, cell_lon, parameters, start, end, community, url)
+    status, text = async_power.run(async_power.get_with_retry(url, {k: str(v) for k, v in params.items()}, timeout))
+    return parse_power_response(status, text)
+
+
+def _as_list(parameters):
+    if isinstance(parameters, str):
+        return parameters.split(",")
+    return list(parameters)
+
+
+def _is_provisional(end):
+    """True if the range reaches into the window NASA may still revise."""
+    try:
+        if len(end) >= 8:
+            end_date = datetime.datetime.strptime(end[:8], "%Y%m%d").date()
+        else:
+            end_date = datetime.date(int(end[:4]), 12, 31)
+    except ValueError:
+        return True
+    return end_date >= datetime.date.today() - datetime.timedelta(days=RECENT_DAYS)
+
+
+def _widen(lo, hi, limit):
+    """Grow [lo, hi] symmetrically to POWER_REGIONAL_MIN_SPAN, staying inside ±limit."""
+    missing = POWER_REGIONAL_MIN_SPAN - (hi - lo)
+    if missing > 0:
+        lo, hi = lo - missing / 2, hi + missing / 2
+        if lo < -limit:
+            lo, hi = -limit, -limit + POWER_REGIONAL_MIN_SPAN
+        elif hi > limit:
+            lo, hi = limit - POWER_REGIONAL_MIN_SPAN, limit
+    return round(lo, 4), round(hi, 4)
+
+
+def _as_power_json(cell_lat, cell_lon, series_by_param):
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [cell_lon, cell_lat]},
+        "properties": {"parameter": series_by_param},
+    }
+
+
+def _connection():
+    """One SQLite connection per thread."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(CACHE_DB_PATH), exist_ok=True)
+        conn = sqlite3.connect(CACHE_DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS power_arrays (
+                temporal TEXT NOT NULL,
+                community TEXT NOT NULL,
+                cell_lat REAL NOT NULL,
+                cell_lon REAL NOT NULL,
+                parameter TEXT NOT NULL,
+                start TEXT NOT NULL,
+                end TEXT NOT NULL,
+                series_start TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                provisional INTEGER NOT NULL,
+                payload BLOB NOT NULL,
+                PRIMARY KEY (temporal, community, cell_lat, cell_lon, parameter, start, end)
+            )"""
+        )
+        _local.conn = conn
+    return conn
@@ -0,0 +1,136 @@
+import re
+import numpy as np
+from app.utils.timeseries import PowerSeries, FILL_VALUE, _parse_key, _offset, _MonthSlot
+
+# Bytes read from the socket per step; peak memory is a few of these plus the arrays
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_PARAMETER_OPEN = re.compile(rb'"parameter"\s*:\s*\{')
+_CODE_OPEN = re.compile(rb'\s*,?\s*"([^"]+)"\s*:\s*\{')
+_OBJECT_CLOSE = re.compile(rb'\s*,?\s*\}')
+# '"19810101": 12.3, "19810102": -999' → '19810101,12.3,19810102,-999'
+_FLATTEN = bytes.maketrans(b":", b",")
+_STRIP = b'" \t\r\n'
+
+_SEEK, _CODES, _VALUES, _DONE = range(4)
+
+
+class PowerStreamParser:
+    """
+    Incremental parser for POWER point responses.
+
+    Only properties.parameter is decoded: each {"YYYYMMDD": value} object is
+    scanned a chunk at a time and its values are converted in bulk into
+    float64 arrays, so no per-date dicts or Python floats are ever built and
+    the rest of the body (header, messages, units) is skipped.
+
+        parser = PowerStreamParser("daily")
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            parser.feed(chunk)
+        series = parser.close()   # {parameter: PowerSeries}
+
+    Raises ValueError if the body is not a POWER response.
+    """
+
+    def __init__(self, temporal="daily"):
+        self.temporal = temporal
+        self._buf = b""
+        self._state = _SEEK
+        self._code = None
+        self._parts = {}
+
+    def feed(self, chunk):
+        if self._state == _DONE:
+            return
+        buf = self._buf + chunk
+        pos = 0
+
+        while True:
+            if self._state == _SEEK:
+                m = _PARAMETER_OPEN.search(buf, pos)
+                if m is None:
+                    # Keep enough of the tail to match a key split across chunks
+                    pos = max(pos, len(buf) - 32)
+                    break
+                pos = m.end()
+                self._state = _CODES
+
+            elif self._state == _CODES:
+                m = _OBJECT_CLOSE.match(buf, pos)
+                if m is not None:
+                    self._state = _DONE
+                    buf, pos = b"", 0
+                    break
+                m = _CODE_OPEN.match(buf, pos)
+                if m is None:
+                    if re.search(rb"[{}]", buf[pos:]):
+                        raise ValueError("Malformed parameter object in POWER response")
+                    break
+                self._code = m.group(1).decode()
+                self._parts.setdefault(self._code, ([], []))
+                pos = m.end()
+                self._state = _VALUES
+
+            else:  # _VALUES: the per-date object has no nesting, so "}" ends it
+                close = buf.find(b"}", pos)
+                if close == -1:
+                    cut = buf.rfind(b",", pos)
+                    if cut == -1:
+                        break
+                    self._add(buf[pos:cut])
+                    pos = cut + 1
+                    break
+                self._add(buf[pos:close])
+                pos = close + 1
+                self._state = _CODES
+
+        self._buf = buf[pos:]
+
+    def close(self):
+        """Finish parsing and return {parameter: PowerSeries}."""
+        if self._state == _SEEK:
+            raise ValueError("Invalid NASA API response structure")
+        if self._state != _DONE:
+            raise ValueError("Truncated POWER response")
+        return {code: self._build(keys, values) for code, (keys, values) in self._parts.items()}
+
+    def _add(self, segment):
+        # segment is a run of complete '"YYYYMMDD": value' entries separated by commas
+        entries = segment.count(b":")
+        if not entries:
+            return
+        flat = segment.replace(b"null", b"-999").translate(_FLATTEN, _STRIP).decode("ascii")
+        pairs = np.fromstring(flat, sep=",")
+        if len(pairs) != 2 * entries:
+            raise ValueError("Malformed value in POWER response")
+        pairs = pairs.reshape(-1, 2)
+        parts = self._parts[self._code]
+        parts[0].append(pairs[:, 0].astype(np.int64))
+        parts[1].append(pairs[:, 1].copy())
+
+    def _build(self, key_parts, value_parts):
+        if not key_parts:
+            return PowerSeries.from_dict({}, self.temporal)
+        keys = np.concatenate(key_parts)
+        values = np.concatenate(value_parts)
+
+        start = _parse_key(str(keys[0]), self.temporal)
+        if self.temporal == "monthly":
+            start = _MonthSlot(start.year, 1)
+        size = _offset(start, _parse_key(str(keys[-1]), self.temporal), self.temporal) + 1
+        if size == len(values) and (self.temporal == "daily" or keys[0] % 100 == 1):
+            # POWER sends contiguous, ordered dates: the values already sit at their offsets
+            return PowerSeries(self.temporal, start, values)
+
+        out = np.full(size, FILL_VALUE)
+        for key, value in zip(keys.tolist(), values.tolist()):
+            out[_offset(start, _parse_key(str(key), self.temporal), self.temporal)] = value
+        return PowerSeries(self.temporal, start, out)
+
+
+def parse_power_stream(chunks, temporal="daily"):
+    """Parse an iterable of byte chunks (e.g. response.iter_content()) into {parameter: PowerSeries}."""
+    parser = PowerStreamParser(temporal)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
@@ -0,0 +1,197 @@
+import os
+import logging
+import datetime
+import numpy as np
+from dotenv import load_dotenv
+from app.utils import result_cache, metrics
+from app.utils.power_cache import fetch_power_series, snap_to_grid, PowerAPIError
+from app.utils.probability import wilson_interval, DIRECTIONS
+from app.utils.timeseries import FILL_VALUE
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Past years the calendar window is taken from (most recent complete ones)
+PREDICTION_YEARS = int(os.getenv("PREDICTION_YEARS", "10"))
+
+# Days either side of the target date that count as "the same time of year"
+PREDICTION_WINDOW_DAYS = int(os.getenv("PREDICTION_WINDOW_DAYS", "7"))
+
+PREDICTION_MAX_YEARS = 40
+
+# Widest ± window accepted; must stay under half a year so windows don't overlap
+PREDICTION_MAX_WINDOW_DAYS = 60
+
+# Frontend variable id → (NASA POWER parameter, unit)
+VARIABLES = {
+    "temperature": ("T2M", "°C"),
+    "precipitation": ("PRECTOTCORR", "mm"),
+    "humidity": ("RH2M", "%"),
+    "wind": ("WS2M", "m/s"),
+    "wind_speed": ("WS2M", "m/s"),
+}
+
+DEFAULT_THRESHOLD = {"value": 30, "operator": "above"}
+
+
+def predict(lat, lon, month, day, variables, thresholds=None, years=None, window=None, today=None):
+    """
+    Empirical probability of each variable crossing its threshold around a
+    calendar day, from the same ±window days in each of the past `years` years.
+
+    Args:
+        variables (list): frontend ids, e.g. ["temperature", "precipitation"].
+        thresholds (list): [{"variable", "value", "operator": "above"|"below"}];
+            variables without one use DEFAULT_THRESHOLD.
+
+    Returns:
+        dict: {"date", "years", "windowDays", "results": [...]} with, per variable,
+        probability (whole percent), exact fraction and Wilson 95% interval,
+        window mean, and the value on the target day in every past year.
+        An {"error": ...} dict if the input or the NASA request is invalid.
+    """
+    years = min(int(years or PREDICTION_YEARS), PREDICTION_MAX_YEARS)
+    window = int(PREDICTION_WINDOW_DAYS if window is None else window)
+    today = today or datetime.date.today()
+
+    unknown = [v for v in variables if v not in VARIABLES]
+    if unknown:
+        return {"error": f"Unknown variable(s): {', '.join(unknown)}"}
+    if not variables:
+        return {"error": "No variables selected"}
+    if not 0 <= window <= PREDICTION_MAX_WINDOW_DAYS:
+        return {"error": f"windowDays must be between 0 and {PREDICTION_MAX_WINDOW_DAYS}"}
+    try:
+        rules = _rules(variables, thresholds or [])
+        centres = _window_centres(month, day, years, window, today)
+        start = centres[0] - datetime.timedelta(days=window)
+        end = centres[-1] + datetime.timedelta(days=window)
+    except (ValueError, OverflowError) as e:
+        return {"error": str(e)}
+
+    cell = snap_to_grid(lat, lon)
+    return result_cache.get_or_compute(
+        "prediction",
+        {"cell": cell, "month": month, "day": day, "rules": rules, "years": years, "window": window,
+         "start": start.isoformat(), "end": end.isoformat()},
+        lambda: _predict(lat, lon, month, day, rules, centres, window, start, end),
+        tags=[(*cell, start.strftime("%Y%m%d"), end.strftime("%Y%m%d"))],
+    )
+
+
+def _predict(lat, lon, month, day, rules, centres, window, start, end):
+    codes = sorted({VARIABLES[variable][0] for variable, _, _ in rules})
+    try:
+        # One request for every year's window (and every variable); shared with the dashboard cache
+        series = fetch_power_series(
+            "daily", lat, lon, codes, start.strftime("%Y%m%d"), end.strftime("%Y%m%d"), community="AG"
+        )
+    except PowerAPIError as e:
+        logger.error("Prediction fetch failed: %s", e)
+        return {"error": str(e), "details": e.details}
+
+    with metrics.stage("compute"):
+        windows = _window_values(series, codes, centres, window, start)  # (parameter, year, day)
+        results = _evaluate(rules, codes, windows, centres, window)
+
+    return {
+        "date": f"{month:02d}-{day:02d}",
+        "years": [c.year for c in centres],
+        "windowDays": window,
+        "results": results,
+    }
+
+
+def _rules(variables, thresholds):
+    """[(variable, threshold, operator)] in the order the variables were selected."""
+    by_variable = {t.get("variable"): t for t in thresholds if isinstance(t, dict)}
+    rules = []
+    for variable in variables:
+        threshold = by_variable.get(variable, DEFAULT_THRESHOLD)
+        operator = threshold.get("operator", "above")
+        if operator not in DIRECTIONS:
+            raise ValueError(f"Invalid operator for {variable}: {operator}")
+        try:
+            value = float(threshold.get("value", DEFAULT_THRESHOLD["value"]))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid threshold for {variable}: {threshold.get('value')}")
+        rules.append((variable, value, operator))
+    return rules
+
+
+def _window_centres(month, day, years, window, today):
+    """The target day in each of the last `years` years whose whole window is in the past."""
+    datetime.date(2000, month, day)  # validates month/day (leap year, so Feb 29 passes)
+    last_year = today.year
+    while _on(last_year, month, day) + datetime.timedelta(days=window) >= today:
+        last_year -= 1
+    return [_on(y, month, day) for y in range(last_year - years + 1, last_year + 1)]
+
+
+def _on(year, month, day):
+    """date(year, month, day), with Feb 29 falling back to Feb 28 in common years."""
+    if month == 2 and day == 29 and not (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)):
+        day = 28
+    return datetime.date(year, month, day)
+
+
+def _window_values(series, codes, centres, window, start):
+    """
+    Gather every year's ±window days for every parameter into one
+    (parameter, year, 2*window+1) array with NaN for missing values.
+    """
+    offsets = np.array([(c - start).days for c in centres])[:, None] + np.arange(-window, window + 1)
+    span = int(offsets.max()) + 1
+
+    stacked = np.full((len(codes), span), np.nan)
+    for i, code in enumerate(codes):
+        s = series.get(code)
+        if s is None:
+            continue
+        lo = (s.start - start).days
+        values = np.asarray(s.values, dtype=np.float64)
+        hi = min(span, lo + len(values))
+        if hi > max(lo, 0):
+            stacked[i, max(lo, 0):hi] = values[max(-lo, 0):hi - lo]
+
+    stacked[stacked == FILL_VALUE] = np.nan
+    return stacked[:, offsets]
+
+
+def _evaluate(rules, codes, windows, centres, window):
+    rows = np.array([codes.index(VARIABLES[variable][0]) for variable, _, _ in rules])
+    thresholds = np.array([value for _, value, _ in rules])[:, None, None]
+    above = np.array([operator == "above" for _, _, operator in rules])[:, None, None]
+
+    values = windows[rows]                      # (rule, year, day)
+    valid = ~np.isnan(values)
+    with np.errstate(invalid="ignore"):
+        hits = np.where(above, values > thresholds, values < thresholds) & valid
+    samples = valid.sum(axis=(1, 2))
+    counts = hits.sum(axis=(1, 2))
+    sums = np.where(valid, values, 0.0).sum(axis=(1, 2))
+    on_day = values[:, :, window]               # the target day itself, per year
+
+    results = []
+    for i, (variable, threshold, operator) in enumerate(rules):
+        n, count = int(samples[i]), int(counts[i])
+        low, high = wilson_interval(count, n)
+        results.append({
+            "variable": variable,
+            "probability": round(count * 100 / n) if n else None,
+            "fraction": count / n if n else None,
+            "ci_low": low,
+            "ci_high": high,
+            "samples": n,
+            "mean": round(float(sums[i] / n), 1) if n else None,
+            "threshold": threshold,
+            "operator": operator,
+            "unit": VARIABLES[variable][1],
+            "historicalData": [
+                {"year": centre.year, "date": centre.isoformat(),
+                 "value": None if np.isnan(v) else round(float(v), 1)}
+                for centre, v in zip(centres, on_day[i])
+            ],
+        })
+    return results
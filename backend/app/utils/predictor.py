@@ -1,51 +1,145 @@
+import numpy as np
+
+# Inputs every likelihood is computed from, in this order
+INPUTS = ("temp", "precip", "wind", "humidity")
+
+# likelihood = clip((coefficients · inputs + offset) / scale, 0, 1)
+LIKELIHOOD_RULES = {
+    "very_hot": ({"temp": 1}, -30, 20),
+    "very_cold": ({"temp": -1}, 15, 15),
+    "very_windy": ({"wind": 1}, -8, 10),
+    "very_wet": ({"precip": 1}, 0, 20),
+    # discomfort index: temperature + a tenth of the humidity
+    "very_uncomfortable": ({"temp": 1, "humidity": 0.1}, -35, 10),
+}
+
+# A day counts as "very_hot" etc. in the season summary above this likelihood
+LIKELY_THRESHOLD = 0.5
+
+# Agricultural advice, evaluated as masks. A rule fires when its likelihood is
+# strictly above "above" and at most "at_most" (either bound optional), and,
+# if given, the location is in the southern hemisphere during "months".
+# Rules sharing a "group" are mutually exclusive bands of one likelihood.
+ADVICE_RULES = [
+    {"id": "rain_high", "group": "rain", "likelihood": "very_wet", "above": 0.6,
+     "text": "High chance of rainfall — consider reducing irrigation and check drainage in low-lying fields."},
+    {"id": "rain_moderate", "group": "rain", "likelihood": "very_wet", "above": 0.3, "at_most": 0.6,
+     "text": "Moderate rainfall likely — useful for newly planted crops but monitor soil moisture."},
+    {"id": "rain_low", "group": "rain", "likelihood": "very_wet", "at_most": 0.3,
+     "text": "Low rainfall expected — plan for irrigation if planting or during flowering stages."},
+    {"id": "heat_high", "group": "heat", "likelihood": "very_hot", "above": 0.6,
+     "text": "High heat expected — irrigate early mornings or evenings to reduce evaporation."},
+    {"id": "heat_warm", "group": "heat", "likelihood": "very_hot", "above": 0.3, "at_most": 0.6,
+     "text": "Warm conditions — suitable for crops like maize and beans if water is sufficient."},
+    {"id": "heat_cool", "group": "heat", "likelihood": "very_hot", "at_most": 0.3,
+     "text": "Cool temperatures — good for vegetables or cereal crops in early stages."},
+    {"id": "cold", "likelihood": "very_cold", "above": 0.5,
+     "text": "Cold conditions could slow crop growth — consider mulching or crop covers for young plants."},
+    {"id": "wind", "likelihood": "very_windy", "above": 0.5,
+     "text": "Windy conditions expected — support weak-stem crops and avoid pesticide spraying."},
+    {"id": "humid", "likelihood": "very_uncomfortable", "above": 0.5,
+     "text": "High humidity — increased risk of fungal diseases; apply preventive fungicide if necessary."},
+    # Regionally contextual (optional, could expand later)
+    {"id": "rainy_season", "southern": True, "months": (3, 4, 11, 12),
+     "text": "This period is part of the rainy season in many East African regions — plan fieldwork accordingly."},
+]
+
+_COEFFICIENTS = np.array([[c.get(name, 0.0) for name in INPUTS] for c, _, _ in LIKELIHOOD_RULES.values()])
+_OFFSETS = np.array([offset for _, offset, _ in LIKELIHOOD_RULES.values()], dtype=np.float64)[:, None]
+_SCALES = np.array([scale for _, _, scale in LIKELIHOOD_RULES.values()], dtype=np.float64)[:, None]
+_NAMES = list(LIKELIHOOD_RULES)
+
+
 def classify_weather(temp, precip, wind, humidity, lat, lon, month, day):
     """
     Classify weather likelihoods for farming guidance.
     Returns both numeric likelihoods and agricultural recommendations.
     """
+    # Python's round() (not numpy's half-to-even) keeps single-day results exactly as before
+    likelihoods = {
+        name: np.array([round(float(values[0]), 2)])
+        for name, values in score_days([temp], [precip], [wind], [humidity], decimals=None).items()
+    }
+    fired = advice_masks(likelihoods, lat, [month])
+    return {
+        "likelihoods": {name: round(float(values[0]) * 100, 1) for name, values in likelihoods.items()},
+        "advice": [rule["text"] for rule in ADVICE_RULES if fired[rule["id"]][0]],
+    }
 
-    likelihoods = {}
 
-    # Base probabilities (0–1 scale)
-    likelihoods["very_hot"] = min(round(max(0, (temp - 30) / 20), 2), 1)
-    likelihoods["very_cold"] = min(round(max(0, (15 - temp) / 15), 2), 1)
-    likelihoods["very_windy"] = min(round(max(0, (wind - 8) / 10), 2), 1)
-    likelihoods["very_wet"] = min(round(max(0, precip / 20), 2), 1)
-    discomfort_index = temp + (0.1 * humidity)
-    likelihoods["very_uncomfortable"] = min(round(max(0, (discomfort_index - 35) / 10), 2), 1)
+def score_days(temp, precip, wind, humidity, decimals=2):
+    """
+    Likelihoods (0–1, rounded to `decimals` places) for many days at once.
+    Each argument is an array of daily values; NaN in any input gives NaN.
 
-    # 🌾 AGRICULTURAL INTERPRETATION
-    insights = []
+    Returns:
+        dict: {likelihood name: float array}
+    """
+    inputs = np.vstack([np.asarray(v, dtype=np.float64) for v in (temp, precip, wind, humidity)])
+    scores = np.clip((_COEFFICIENTS @ inputs + _OFFSETS) / _SCALES, 0, 1)
+    if decimals is not None:
+        scores = scores.round(decimals)
+    return dict(zip(_NAMES, scores))
 
-    if likelihoods["very_wet"] > 0.6:
-        insights.append("High chance of rainfall — consider reducing irrigation and check drainage in low-lying fields.")
-    elif 0.3 < likelihoods["very_wet"] <= 0.6:
-        insights.append("Moderate rainfall likely — useful for newly planted crops but monitor soil moisture.")
-    else:
-        insights.append("Low rainfall expected — plan for irrigation if planting or during flowering stages.")
 
-    if likelihoods["very_hot"] > 0.6:
-        insights.append("High heat expected — irrigate early mornings or evenings to reduce evaporation.")
-    elif 0.3 < likelihoods["very_hot"] <= 0.6:
-        insights.append("Warm conditions — suitable for crops like maize and beans if water is sufficient.")
-    else:
-        insights.append("Cool temperatures — good for vegetables or cereal crops in early stages.")
+def advice_masks(likelihoods, lat, months):
+    """{advice id: bool array} — which days each ADVICE_RULES entry applies to."""
+    months = np.asarray(months)
+    masks = {}
+    for rule in ADVICE_RULES:
+        mask = np.ones(months.shape, dtype=bool)
+        if "likelihood" in rule:
+            values = likelihoods[rule["likelihood"]]
+            mask = ~np.isnan(values)
+            if "above" in rule:
+                mask &= values > rule["above"]
+            if "at_most" in rule:
+                mask &= values <= rule["at_most"]
+        if rule.get("southern") and lat >= 0:
+            mask = np.zeros(months.shape, dtype=bool)
+        if "months" in rule:
+            mask &= np.isin(months, rule["months"])
+        masks[rule["id"]] = mask
+    return masks
 
-    if likelihoods["very_cold"] > 0.5:
-        insights.append("Cold conditions could slow crop growth — consider mulching or crop covers for young plants.")
 
-    if likelihoods["very_windy"] > 0.5:
-        insights.append("Windy conditions expected — support weak-stem crops and avoid pesticide spraying.")
+def classify_season(temp, precip, wind, humidity, lat, months):
+    """
+    Score a whole season / year of days for one location.
 
-    if likelihoods["very_uncomfortable"] > 0.5:
-        insights.append("High humidity — increased risk of fungal diseases; apply preventive fungicide if necessary.")
+    Args:
+        temp, precip, wind, humidity: daily arrays (NaN for missing days).
+        months: month number of each day.
 
-    # Regionally contextual (optional, could expand later)
-    if lat < 0 and month in [3, 4, 11, 12]:
-        insights.append("This period is part of the rainy season in many East African regions — plan fieldwork accordingly.")
+    Returns:
+        dict: per-day "likelihoods" arrays (percent, NaN where data is missing),
+        "frequencies" (percent of scored days each likelihood exceeds
+        LIKELY_THRESHOLD) and "advice" (each rule with the share of days it
+        applies to, most frequent first).
+    """
+    likelihoods = score_days(temp, precip, wind, humidity)
+    scored = ~np.isnan(likelihoods[_NAMES[0]])
+    for values in likelihoods.values():
+        scored &= ~np.isnan(values)
+    n = int(scored.sum())
+
+    fired = advice_masks(likelihoods, lat, months)
+    advice = []
+    for rule in ADVICE_RULES:
+        days = int((fired[rule["id"]] & scored).sum())
+        if days:
+            advice.append({"id": rule["id"], "text": rule["text"], "days": days, "percent": _percent(days, n)})
+    advice.sort(key=lambda a: -a["days"])
 
     return {
-        "likelihoods": {k: round(v * 100, 1) for k, v in likelihoods.items()},
-        "advice": insights
+        "days": n,
+        "likelihoods": {name: values * 100 for name, values in likelihoods.items()},
+        "frequencies": {
+            name: _percent(int((values[scored] > LIKELY_THRESHOLD).sum()), n) for name, values in likelihoods.items()
+        },
+        "advice": advice,
     }
 
+
+def _percent(count, total):
+    return round(count / total * 100, 1) if total else None
@@ -0,0 +1,88 @@
+import math
+from statistics import NormalDist
+import numpy as np
+from app.utils.timeseries import FILL_VALUE
+
+DIRECTIONS = ("above", "below")
+
+
+def evaluate_rules(series_by_param, rules, confidence=0.95):
+    """
+    Evaluate many threshold rules against POWER series in one pass per parameter.
+
+    Args:
+        series_by_param (dict): {parameter code: PowerSeries or array-like}.
+        rules (list): (name, parameter code, threshold, direction) tuples,
+            direction being "above" (value > threshold) or "below" (value < threshold).
+        confidence (float): Confidence level of the Wilson interval.
+
+    Returns:
+        dict: {name: {"probability", "count", "samples", "missing", "ci_low", "ci_high"}}
+        with probability as an exact fraction (0–1). Rules whose parameter is
+        absent from the data map to None.
+
+    Raises:
+        ValueError: a rule has an unknown direction.
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    by_param = {}
+    for rule in rules:
+        if rule[3] not in DIRECTIONS:
+            raise ValueError(f"Invalid direction: {rule[3]}")
+        by_param.setdefault(rule[1], []).append(rule)
+
+    results = {}
+    for code, param_rules in by_param.items():
+        if code not in series_by_param:
+            for name, *_ in param_rules:
+                results[name] = None
+            continue
+
+        values, missing = _valid_values(series_by_param[code])
+        thresholds = np.array([r[2] for r in param_rules], dtype=np.float64)
+        above, below = exceedance_counts(values, thresholds)
+        n = len(values)
+
+        for i, (name, _, _, direction) in enumerate(param_rules):
+            count = int(above[i] if direction == "above" else below[i])
+            low, high = wilson_interval(count, n, z)
+            results[name] = {
+                "probability": count / n if n else None,
+                "count": count,
+                "samples": n,
+                "missing": missing,
+                "ci_low": low,
+                "ci_high": high,
+            }
+    return results
+
+
+def exceedance_counts(values, thresholds):
+    """
+    Count values strictly above / strictly below each threshold.
+    Sorts the data once and answers every threshold with a binary search.
+    """
+    ordered = np.sort(values)
+    above = len(ordered) - np.searchsorted(ordered, thresholds, side="right")
+    below = np.searchsorted(ordered, thresholds, side="left")
+    return above, below
+
+
+def wilson_interval(count, n, z=1.959963984540054):
+    """Wilson score interval for a binomial proportion; (None, None) when n == 0."""
+    if n == 0:
+        return None, None
+    p = count / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def _valid_values(series):
+    """Return (non-fill values, number of fill values) for a PowerSeries or array."""
+    values = getattr(series, "values", series)
+    values = np.asarray(values, dtype=np.float64)
+    mask = (values == FILL_VALUE) | np.isnan(values)
+    return values[~mask], int(mask.sum())
@@ -0,0 +1,92 @@
+import os
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process limit, fall back to per-process
+    fcntl = None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    `rate` tokens are added per second up to `capacity`; acquire() takes one
+    token, waiting for it by default. Callers queue up on the lock, so a
+    burst of misses drains at exactly `rate` requests per second.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1, blocking=True, timeout=None):
+        """Take `tokens`; returns False if not blocking (or timed out) and none are available."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+                if not blocking or (deadline is not None and time.monotonic() + wait > deadline):
+                    return False
+                # Holding the lock while sleeping keeps waiters in FIFO-ish order
+                time.sleep(wait)
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class SharedRateLimiter:
+    """
+    At most `rate` acquisitions per second across every process on the box
+    (e.g. gunicorn workers), for upstreams whose limit is per client.
+
+    The next free time slot lives in `path`; acquire() reserves a slot under
+    an flock and sleeps until it outside the lock, so waiters across
+    processes are served in order. Where fcntl is unavailable this is a
+    per-process TokenBucket.
+    """
+
+    def __init__(self, path, rate):
+        self.path = path
+        self.rate = float(rate)
+        self._fallback = TokenBucket(rate, capacity=1) if fcntl is None else None
+
+    def acquire(self):
+        if self._fallback is not None:
+            return self._fallback.acquire()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a+") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                handle.seek(0)
+                try:
+                    next_slot = float(handle.read() or 0)
+                except ValueError:
+                    next_slot = 0.0
+                # Wall clock, since monotonic clocks aren't comparable between processes
+                slot = max(time.time(), next_slot)
+                handle.seek(0)
+                handle.truncate()
+                handle.write(repr(slot + 1 / self.rate))
+                handle.flush()
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+        wait = slot - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        return True
@@ -0,0 +1,158 @@
+import logging
+import os
+import time
+import sqlite3
+import datetime
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from app.utils.single_flight import SingleFlight
+from app.utils.timeseries import PowerSeries, FILL_VALUE
+from app.utils.power_cache import (
+    CACHE_DB_PATH, POWER_OFFLINE, PowerAPIError, snap_to_grid, fetch_power_series,
+    request_series,
+)
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Rolling per-cell store of the most recent daily values (one row per day)
+RECENT_WINDOW_PARAMETERS = ["T2M", "PRECTOTCORR"]
+RECENT_WINDOW_DAYS = int(os.getenv("RECENT_WINDOW_DAYS", "60"))
+
+# Days NASA still reports as -999 are asked for again at most this often (seconds)
+RECENT_WINDOW_RECHECK = int(os.getenv("RECENT_WINDOW_RECHECK", str(3 * 3600)))
+
+_local = threading.local()
+_flights = SingleFlight()
+
+
+def get_recent_window(lat, lon, days, end=None, parameters=None, community="AG", url=None, timeout=30):
+    """
+    {parameter: PowerSeries} for the `days` days ending at `end` (default: yesterday).
+
+    Served from the rolling store; only days after the last stored date, and
+    trailing days NASA still has as -999, are fetched upstream. Requests longer
+    than RECENT_WINDOW_DAYS go through the regular POWER cache instead.
+    """
+    parameters = list(parameters or RECENT_WINDOW_PARAMETERS)
+    community = community.upper()
+    end = end or datetime.date.today() - datetime.timedelta(days=1)
+    start = end - datetime.timedelta(days=days - 1)
+    cell = snap_to_grid(lat, lon)
+
+    if days > RECENT_WINDOW_DAYS:
+        return fetch_power_series(
+            "daily", cell[0], cell[1], parameters, _fmt(start), _fmt(end), community, url, timeout
+        )
+
+    values, checked = _load(cell, community, parameters, start, days)
+    runs = _stale_runs(values, checked)
+    if runs:
+        if POWER_OFFLINE:
+            return fetch_power_series(
+                "daily", cell[0], cell[1], parameters, _fmt(start), _fmt(end), community, url, timeout
+            )
+        for first, last in runs:
+            lo = start + datetime.timedelta(days=first)
+            hi = start + datetime.timedelta(days=last)
+            key = (cell, community, tuple(sorted(parameters)), _fmt(lo), _fmt(hi))
+            _flights.do(key, lambda: _refresh(cell, community, parameters, lo, hi, url, timeout))
+        values, checked = _load(cell, community, parameters, start, days)
+
+    return {code: PowerSeries("daily", start, values[i]) for i, code in enumerate(parameters)}
+
+
+def _stale_runs(values, checked):
+    """
+    Contiguous (first, last) day-index runs that are missing, or still -999
+    and due for a recheck. Normally just the newest day or two.
+    """
+    now = time.time()
+    missing = np.isnan(checked)
+    recheck = (values == FILL_VALUE).any(axis=0) & (now - np.nan_to_num(checked, nan=now) >= RECENT_WINDOW_RECHECK)
+    stale = np.flatnonzero(missing | recheck)
+    if not len(stale):
+        return []
+    breaks = np.flatnonzero(np.diff(stale) > 1)
+    firsts = np.concatenate(([stale[0]], stale[breaks + 1]))
+    lasts = np.concatenate((stale[breaks], [stale[-1]]))
+    return [(int(a), int(b)) for a, b in zip(firsts, lasts)]
+
+
+def _load(cell, community, parameters, start, days):
+    """(values[param, day], checked_at[day]) for the window; checked_at is NaN where any parameter is missing."""
+    values = np.full((len(parameters), days), FILL_VALUE)
+    seen = np.zeros((len(parameters), days), dtype=bool)
+    checked = np.full(days, np.inf)
+    index = {code: i for i, code in enumerate(parameters)}
+
+    rows = _connection().execute(
+        f"""SELECT parameter, date, value, checked_at FROM recent_daily
+            WHERE community=? AND cell_lat=? AND cell_lon=? AND date BETWEEN ? AND ?
+            AND parameter IN ({",".join("?" * len(parameters))})""",
+        (community, cell[0], cell[1], _fmt(start), _fmt(start + datetime.timedelta(days=days - 1)), *parameters),
+    ).fetchall()
+    for code, date, value, checked_at in rows:
+        i = index[code]
+        d = (_parse(date) - start).days
+        values[i, d] = value
+        seen[i, d] = True
+        checked[d] = min(checked[d], checked_at)
+
+    checked[~seen.all(axis=0)] = np.nan
+    return values, checked
+
+
+def _refresh(cell, community, parameters, start, end, url, timeout):
+    """Fetch [start, end] for the cell and upsert it as one row per parameter per day."""
+    logger.debug("Recent window delta for cell %s: %s–%s", cell, _fmt(start), _fmt(end))
+    series = request_series("daily", cell[0], cell[1], parameters, _fmt(start), _fmt(end), community, url, timeout)
+
+    now = time.time()
+    rows = []
+    for code in parameters:
+        s = series.get(code)
+        if s is None:
+            raise PowerAPIError(f"Parameter {code} missing from POWER response")
+        s = s.slice(_fmt(start), _fmt(end))
+        for date, value in zip(s.dates().astype(object), s.values.tolist()):
+            rows.append((community, cell[0], cell[1], code, _fmt(date), value, now))
+
+    cutoff = datetime.date.today() - datetime.timedelta(days=RECENT_WINDOW_DAYS + 1)
+    conn = _connection()
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO recent_daily VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("DELETE FROM recent_daily WHERE date < ?", (_fmt(cutoff),))
+
+
+def _fmt(date):
+    return date.strftime("%Y%m%d")
+
+
+def _parse(value):
+    return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+def _connection():
+    """One SQLite connection per thread (shares the POWER cache database file)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(CACHE_DB_PATH), exist_ok=True)
+        conn = sqlite3.connect(CACHE_DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS recent_daily (
+                community TEXT NOT NULL,
+                cell_lat REAL NOT NULL,
+                cell_lon REAL NOT NULL,
+                parameter TEXT NOT NULL,
+                date TEXT NOT NULL,
+                value REAL NOT NULL,
+                checked_at REAL NOT NULL,
+                PRIMARY KEY (community, cell_lat, cell_lon, parameter, date)
+            )"""
+        )
+        _local.conn = conn
+    return conn
@@ -0,0 +1,250 @@
+import os
+import logging
+import atexit
+import datetime
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from app.utils import async_power, result_cache, metrics
+from app.utils.analysis import build_rules
+from app.utils.power_cache import (
+    GRID_LAT_STEP, GRID_LON_STEP, PowerAPIError, cells_in_bbox, fetch_power_series,
+)
+from app.utils.power_archive import get_archive
+from app.utils.probability import evaluate_rules
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Worker processes for the per-cell probabilities (0 = one per CPU core)
+REGIONAL_WORKERS = int(os.getenv("REGIONAL_WORKERS", "0")) or os.cpu_count() or 1
+
+# Below this many cells the pool's overhead isn't worth it; compute in-process
+REGIONAL_PARALLEL_MIN_CELLS = int(os.getenv("REGIONAL_PARALLEL_MIN_CELLS", "32"))
+
+# NASA requests in flight while filling the cache for a region
+REGIONAL_MAX_CONCURRENCY = int(os.getenv("REGIONAL_MAX_CONCURRENCY", "16"))
+
+REGIONAL_MAX_CELLS = int(os.getenv("REGIONAL_MAX_CELLS", "1000"))
+
+# "spawn" is safe in threaded servers; "fork" starts faster where that's not a concern
+REGIONAL_MP_START = os.getenv("REGIONAL_MP_START", "spawn")
+
+MAP_FORMATS = ("geojson", "grid")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def regional_probability_map(bbox, user_query, start_date, end_date, resolution=None, fmt="geojson"):
+    """
+    Threshold probabilities (see fetch_and_analyze_nasa_data) for every POWER
+    grid cell in a bounding box, for heatmap layers.
+
+    Args:
+        bbox (tuple): (lat_min, lon_min, lat_max, lon_max).
+        start_date, end_date (str): "YYYYMMDD".
+        user_query (dict): {"temperature": "30:above", ...}; one map layer per threshold.
+        resolution (float): degrees between sampled cells; None or anything
+            finer than the POWER grid (0.5° × 0.625°) means every cell.
+        fmt (str): "geojson" (FeatureCollection of cell polygons) or "grid"
+            (lat/lon axes plus one 2-D array per layer).
+
+    Cells are fetched through the cache, with POWER regional requests where
+    they save requests and at most REGIONAL_MAX_CONCURRENCY NASA requests in
+    flight, and their probabilities computed across REGIONAL_WORKERS processes.
+    """
+    if fmt not in MAP_FORMATS:
+        return {"error": f"Unknown format '{fmt}' (use one of {', '.join(MAP_FORMATS)})"}
+    try:
+        first = datetime.datetime.strptime(str(start_date), "%Y%m%d").date()
+        last = datetime.datetime.strptime(str(end_date), "%Y%m%d").date()
+    except ValueError:
+        return {"error": "start_date and end_date must be YYYYMMDD"}
+    if last < first:
+        return {"error": "end_date is before start_date"}
+
+    lat_min, lon_min, lat_max, lon_max = (float(v) for v in bbox)
+    if lat_min > lat_max or lon_min > lon_max:
+        return {"error": "bbox must be lat_min,lon_min,lat_max,lon_max"}
+
+    lats, lons, lat_step, lon_step = grid_axes(lat_min, lon_min, lat_max, lon_max, resolution)
+    if len(lats) * len(lons) > REGIONAL_MAX_CELLS:
+        return {"error": f"Too many grid cells ({len(lats) * len(lons)}, max {REGIONAL_MAX_CELLS}); "
+                         "use a smaller box or a coarser resolution"}
+
+    rules, parsed = build_rules(user_query)
+    invalid = {key: msg for key, slots in parsed.items() for msg in slots if msg}
+    if invalid:
+        return {"error": "Invalid thresholds", "details": invalid}
+    if not rules:
+        return {"error": "No valid parameters selected from user query."}
+
+    cells = [(float(la), float(lo)) for la in lats for lo in lons]
+    return result_cache.get_or_compute(
+        "regional",
+        {"lats": lats.tolist(), "lons": lons.tolist(), "query": user_query,
+         "start": str(start_date), "end": str(end_date), "format": fmt},
+        lambda: _build_map(cells, lats, lons, lat_step, lon_step, rules, str(start_date), str(end_date), fmt),
+        tags=[(*cell, str(start_date), str(end_date)) for cell in cells],
+    )
+
+
+def grid_axes(lat_min, lon_min, lat_max, lon_max, resolution=None):
+    """(lats, lons, lat_step, lon_step) of the cells sampled at the given resolution."""
+    cells = np.array(cells_in_bbox(lat_min, lon_min, lat_max, lon_max))
+    lats, lons = np.unique(cells[:, 0]), np.unique(cells[:, 1])
+    lat_stride = max(1, int(round((resolution or 0) / GRID_LAT_STEP)))
+    lon_stride = max(1, int(round((resolution or 0) / GRID_LON_STEP)))
+    return lats[::lat_stride], lons[::lon_stride], GRID_LAT_STEP * lat_stride, GRID_LON_STEP * lon_stride
+
+
+def _build_map(cells, lats, lons, lat_step, lon_step, rules, start, end, fmt):
+    parameters = sorted({rule[1] for rule in rules})
+
+    with metrics.stage("fetch"):
+        errors = _prefetch(cells, parameters, start, end)
+
+    pending = [cell for cell in cells if cell not in errors]
+    with metrics.stage("compute"):
+        outcomes = _compute(pending, parameters, rules, start, end)
+    outcomes.update(errors)
+
+    layers = [_layer_name(rule) for rule in rules]
+    if fmt == "grid":
+        return _as_grid(lats, lons, rules, layers, outcomes, start, end)
+    return _as_geojson(cells, lat_step, lon_step, rules, layers, outcomes, start, end)
+
+
+def _prefetch(cells, parameters, start, end):
+    """Fill the POWER cache for every cell; returns {cell: error message} for failures."""
+    if get_archive() is not None:
+        return {}
+    # Contiguous boxes: a few regional requests fill most cells; stragglers go point by point
+    region = async_power.run(async_power.fetch_region_async(
+        "daily", cells, parameters, start, end, limit=REGIONAL_MAX_CONCURRENCY,
+    ))
+    for failure in region["failed"]:
+        logger.warning("Regional request failed for %s: %s", failure["bbox"], failure["error"])
+    results = async_power.run(async_power.gather_power(
+        [dict(temporal="daily", lat=c[0], lon=c[1], parameters=parameters, start=start, end=end) for c in cells],
+        limit=REGIONAL_MAX_CONCURRENCY,
+    ))
+    errors = {}
+    for cell, result in zip(cells, results):
+        if isinstance(result, Exception):
+            logger.error("Regional fetch failed for cell %s: %s", cell, result)
+            errors[cell] = str(result)
+    return errors
+
+
+def _compute(cells, parameters, rules, start, end):
+    """{cell: outcomes or error message}, in a process pool for large regions."""
+    if len(cells) < REGIONAL_PARALLEL_MIN_CELLS or REGIONAL_WORKERS < 2:
+        return dict(_cells_worker((cells, parameters, rules, start, end)))
+
+    # A few chunks per worker keeps them all busy without per-cell IPC
+    chunk = max(1, -(-len(cells) // (REGIONAL_WORKERS * 4)))
+    tasks = [(cells[i:i + chunk], parameters, rules, start, end) for i in range(0, len(cells), chunk)]
+    out = {}
+    for part in _get_pool().map(_cells_worker, tasks):
+        out.update(part)
+    return out
+
+
+def _cells_worker(task):
+    """Runs in a worker process: read each cell from the cache and evaluate the rules."""
+    cells, parameters, rules, start, end = task
+    out = []
+    for cell in cells:
+        try:
+            series = fetch_power_series("daily", cell[0], cell[1], parameters, start, end)
+        except PowerAPIError as e:
+            out.append((cell, str(e)))
+            continue
+        out.append((cell, evaluate_rules(series, rules)))
+    return out
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context(REGIONAL_MP_START)
+            _pool = ProcessPoolExecutor(max_workers=REGIONAL_WORKERS, mp_context=context)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+# -------------------------
+# Output shapes
+# -------------------------
+def _layer_name(rule):
+    """e.g. "temperature_above_30" — one heatmap layer per threshold."""
+    (key, _), _, threshold, direction = rule
+    return f"{key}_{direction}_{threshold:g}"
+
+
+def _cell_values(outcome, rules):
+    """([percent or None per rule], samples, error)"""
+    if isinstance(outcome, str) or outcome is None:
+        return [None] * len(rules), 0, outcome or "No data"
+    values, samples = [], 0
+    for rule in rules:
+        o = outcome.get(rule[0])
+        if o is None or o["probability"] is None:
+            values.append(None)
+            continue
+        values.append(round(o["probability"] * 100, 1))
+        samples = max(samples, o["samples"])
+    return values, samples, None
+
+
+def _as_geojson(cells, lat_step, lon_step, rules, layers, outcomes, start, end):
+    features = []
+    for cell in cells:
+        values, samples, error = _cell_values(outcomes.get(cell), rules)
+        lat, lon = cell
+        s, n = lat - lat_step / 2, lat + lat_step / 2
+        w, e = lon - lon_step / 2, lon + lon_step / 2
+        properties = {"cell": [lat, lon], "samples": samples, **dict(zip(layers, values))}
+        if error:
+            properties["error"] = error
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [[[w, s], [e, s], [e, n], [w, n], [w, s]]]},
+            "properties": properties,
+        })
+    return {
+        "type": "FeatureCollection",
+        "layers": layers,
+        "start_date": start,
+        "end_date": end,
+        "features": features,
+    }
+
+
+def _as_grid(lats, lons, rules, layers, outcomes, start, end):
+    grids = {layer: [[None] * len(lons) for _ in lats] for layer in layers}
+    samples = [[0] * len(lons) for _ in lats]
+    errors = []
+    for i, lat in enumerate(lats):
+        for j, lon in enumerate(lons):
+            cell = (float(lat), float(lon))
+            values, samples[i][j], error = _cell_values(outcomes.get(cell), rules)
+            for layer, value in zip(layers, values):
+                grids[layer][i][j] = value
+            if error:
+                errors.append({"cell": list(cell), "error": error})
+    return {
+        "lats": [float(v) for v in lats],
+        "lons": [float(v) for v in lons],
+        "layers": grids,
+        "samples": samples,
+        "errors": errors,
+        "start_date": start,
+        "end_date": end,
+    }
@@ -0,0 +1,74 @@
+import os
+import gzip
+from flask import request
+from app.utils import metrics
+
+try:
+    import msgpack
+except ImportError:  # binary responses are unavailable without it
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # fall back to gzip
+    brotli = None
+
+MSGPACK_MIMETYPE = "application/msgpack"
+
+# Bodies smaller than this are sent as-is; compression overhead isn't worth it
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+_COMPRESSIBLE = ("application/json", "application/msgpack", "text/")
+
+
+def msgpack_available():
+    return msgpack is not None
+
+
+def pack_msgpack(payload):
+    """Serialize a payload to MessagePack bytes (raises RuntimeError if msgpack isn't installed)."""
+    if msgpack is None:
+        raise RuntimeError("MessagePack support requires the 'msgpack' package")
+    with metrics.stage("serialize"):
+        return msgpack.packb(payload, use_bin_type=True)
+
+
+def compress_response(response):
+    """
+    after_request hook: brotli- or gzip-encode the body if the client accepts it.
+
+    Streamed responses (e.g. the NDJSON batch endpoint), small bodies and
+    already-encoded responses are left untouched.
+    """
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code >= 300
+        or "Content-Encoding" in response.headers
+        or not (response.mimetype or "").startswith(_COMPRESSIBLE)
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    # Highest q-value wins (q=0 refuses an encoding); brotli on a tie
+    encoding = request.accept_encodings.best_match(["br", "gzip"] if brotli is not None else ["gzip"])
+    if encoding == "br":
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+    elif encoding == "gzip":
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    else:
+        return response
+
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # A strong ETag names exact bytes, so each encoding gets its own
+        response.set_etag(f"{etag}-{encoding}")
+    return response
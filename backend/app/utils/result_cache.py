@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from app.utils import power_cache, metrics
+
+load_dotenv()
+
+# In-process LRU bound (entries)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "2048"))
+
+# "memory" (per process) or "sqlite" (shared by every worker on the host)
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory").lower()
+_basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", os.path.join(_basedir, "instances", "result_cache.db"))
+
+# With a shared backend, local copies are only trusted this long (seconds)
+# so invalidations made by other workers are picked up quickly
+RESULT_CACHE_LOCAL_TTL = int(os.getenv("RESULT_CACHE_LOCAL_TTL", "30"))
+
+# Per-endpoint TTLs (seconds), overridable as RESULT_CACHE_TTLS="analysis=600,trends=86400"
+DEFAULT_TTLS = {
+    "analysis": 6 * 3600,
+    "trends": 24 * 3600,
+    "likelihood": 24 * 3600,
+    "prediction": 24 * 3600,
+    "season": 24 * 3600,
+    "regional": 24 * 3600,
+    "five_year": 24 * 3600,
+}
+DEFAULT_TTL = 3600
+
+
+def _parse_ttls(raw):
+    ttls = dict(DEFAULT_TTLS)
+    for item in filter(None, raw.split(",")):
+        name, _, seconds = item.partition("=")
+        ttls[name.strip()] = int(seconds)
+    return ttls
+
+
+RESULT_CACHE_TTLS = _parse_ttls(os.getenv("RESULT_CACHE_TTLS", ""))
+
+_COUNTERS = ("hits", "misses", "evictions", "expirations", "invalidations", "stores")
+
+
+class ResultCache:
+    """
+    Cache for computed analytics, keyed by namespace + canonical request.
+
+    Every entry is tagged with the POWER grid cells and date spans it was
+    computed from; when power_cache stores fresh raw data for an
+    overlapping cell/span, those entries are dropped. Results that are
+    error dicts are never cached.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, backend=RESULT_CACHE_BACKEND, ttls=None):
+        self.max_entries = max_entries
+        self.backend = backend
+        self.ttls = ttls or RESULT_CACHE_TTLS
+        self._lru = OrderedDict()   # key -> (namespace, expires_at, tags, value)
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._counts = {}
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def get_or_compute(self, namespace, request, compute, tags=()):
+        """
+        Return the cached result for (namespace, request) or compute and store it.
+
+        Args:
+            request (dict): JSON-serialisable description of the request.
+            compute (callable): produces the result on a miss.
+            tags (iterable): (cell_lat, cell_lon, start, end) the result depends on.
+        """
+        key = make_key(namespace, request)
+        found, value = self.get(namespace, key)
+        if found:
+            return value
+
+        value = compute()
+        if not (isinstance(value, dict) and "error" in value):
+            self.set(namespace, key, value, tags)
+        return value
+
+    def get(self, namespace, key):
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._lru.move_to_end(key)
+                    self._count(namespace, "hits")
+                    return True, entry[3]
+                del self._lru[key]
+                self._count(namespace, "expirations")
+
+        if self.backend == "sqlite":
+            row = self._connection().execute(
+                "SELECT expires_at, tags, value FROM results WHERE key=?", (key,)
+            ).fetchone()
+            if row is not None and row[0] > now:
+                value = pickle.loads(row[2])
+                self._remember(namespace, key, min(row[0], now + RESULT_CACHE_LOCAL_TTL), json.loads(row[1]), value)
+                self._count(namespace, "hits")
+                return True, value
+
+        self._count(namespace, "misses")
+        return False, None
+
+    def set(self, namespace, key, value, tags=()):
+        expires_at = time.time() + self.ttls.get(namespace, DEFAULT_TTL)
+        tags = [list(_span_tag(*tag)) for tag in tags]
+        local_expiry = expires_at
+        if self.backend == "sqlite":
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM result_tags WHERE key=?", (key,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key, namespace, expires_at, json.dumps(tags), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+                )
+                conn.executemany("INSERT INTO result_tags VALUES (?, ?, ?, ?, ?)", [(key, *tag) for tag in tags])
+            local_expiry = min(expires_at, time.time() + RESULT_CACHE_LOCAL_TTL)
+        self._remember(namespace, key, local_expiry, tags, value)
+        self._count(namespace, "stores")
+
+    def invalidate_cell(self, cell_lat, cell_lon, start=None, end=None):
+        """Drop every entry computed from this cell (and, if given, an overlapping date span)."""
+        lat, lon, lo, hi = _span_tag(cell_lat, cell_lon, start, end)
+        with self._lock:
+            stale = [
+                (key, entry[0]) for key, entry in self._lru.items()
+                if any(_overlaps(tag, lat, lon, lo, hi) for tag in entry[2])
+            ]
+            for key, namespace in stale:
+                del self._lru[key]
+                self._count(namespace, "invalidations")
+
+        if self.backend == "sqlite":
+            conn = self._connection()
+            with conn:
+                keys = [r[0] for r in conn.execute(
+                    "SELECT DISTINCT key FROM result_tags WHERE cell_lat=? AND cell_lon=? AND start<=? AND end>=?",
+                    (lat, lon, hi, lo),
+                )]
+                for key in keys:
+                    conn.execute("DELETE FROM results WHERE key=?", (key,))
+                    conn.execute("DELETE FROM result_tags WHERE key=?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+        if self.backend == "sqlite":
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM results")
+                conn.execute("DELETE FROM result_tags")
+
+    def stats(self):
+        """Counters per namespace plus totals, for monitoring."""
+        with self._stats_lock:
+            namespaces = {ns: dict(counts) for ns, counts in self._counts.items()}
+        size = len(self._lru)
+        totals = {name: sum(c.get(name, 0) for c in namespaces.values()) for name in _COUNTERS}
+        lookups = totals["hits"] + totals["misses"]
+        totals["hit_ratio"] = round(totals["hits"] / lookups, 4) if lookups else None
+        return {
+            "backend": self.backend,
+            "entries": size,
+            "max_entries": self.max_entries,
+            "ttls": self.ttls,
+            "totals": totals,
+            "namespaces": namespaces,
+        }
+
+    # -------------------------
+    # Internals
+    # -------------------------
+    def _remember(self, namespace, key, expires_at, tags, value):
+        with self._lock:
+            self._lru[key] = (namespace, expires_at, tags, value)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                _, evicted = self._lru.popitem(last=False)
+                self._count(evicted[0], "evictions")
+
+    def _count(self, namespace, name):
+        with self._stats_lock:
+            counts = self._counts.setdefault(namespace, dict.fromkeys(_COUNTERS, 0))
+            counts[name] += 1
+
+    def _connection(self):
+        """One SQLite connection per thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(RESULT_CACHE_DB), exist_ok=True)
+            conn = sqlite3.connect(RESULT_CACHE_DB, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    tags TEXT NOT NULL,
+                    value BLOB NOT NULL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS result_tags (
+                    key TEXT NOT NULL,
+                    cell_lat REAL NOT NULL,
+                    cell_lon REAL NOT NULL,
+                    start INTEGER NOT NULL,
+                    end INTEGER NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS result_tags_cell ON result_tags (cell_lat, cell_lon)")
+            self._local.conn = conn
+        return conn
+
+
+def make_key(namespace, request):
+    """Canonical key: namespace plus a hash of the sorted-key JSON request."""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{namespace}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+
+def _span_tag(cell_lat, cell_lon, start=None, end=None):
+    """(lat, lon, first, last) with dates as YYYYMMDD ints; open ends cover everything."""
+    lo = int(str(start).replace("-", "")[:8].ljust(8, "0")) if start else 0
+    hi = int(str(end).replace("-", "")[:8].ljust(8, "9")) if end else 99999999
+    return float(cell_lat), float(cell_lon), lo, hi
+
+
+def _overlaps(tag, lat, lon, lo, hi):
+    return tag[0] == lat and tag[1] == lon and tag[2] <= hi and tag[3] >= lo
+
+
+# Shared instance; refreshed raw data for a cell invalidates results built on it
+results = ResultCache()
+power_cache.on_series_refreshed(
+    lambda temporal, community, cell_lat, cell_lon, start, end: results.invalidate_cell(cell_lat, cell_lon, start, end)
+)
+
+
+def get_or_compute(namespace, request, compute, tags=()):
+    return results.get_or_compute(namespace, request, compute, tags)
+
+
+@metrics.register_collector
+def _collect():
+    snapshot = results.stats()
+    yield (
+        "weather_result_cache_events_total", "counter", "Result cache events by namespace.",
+        [({"namespace": ns, "event": event}, count)
+         for ns, counts in sorted(snapshot["namespaces"].items()) for event, count in sorted(counts.items())],
+    )
+    yield "weather_result_cache_entries", "gauge", "Entries in the in-process result LRU.", [({}, snapshot["entries"])]
+    ratio = snapshot["totals"]["hit_ratio"]
+    yield "weather_result_cache_hit_ratio", "gauge", "Result cache hits / lookups.", [({}, ratio if ratio is not None else 0.0)]
+
+
+def stats():
+    return results.stats()
@@ -1,39 +1,66 @@
-import requests
-from datetime import datetime
-from predictor import classify_weather
+import calendar
+from datetime import datetime, date
+import numpy as np
+from app.utils.predictor import classify_weather, classify_season
+from app.utils.climatology import get_index
+from app.utils import result_cache, metrics
+from app.utils.power_cache import snap_to_grid, fetch_power_series, PowerAPIError
 
-NASA_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+# Longest range get_season_likelihood scores in one call
+SEASON_MAX_DAYS = 3 * 366
+
+# classify_weather inputs → POWER daily parameters
+SEASON_PARAMETERS = {"temp": "T2M", "precip": "PRECTOTCORR", "wind": "WS2M", "humidity": "RH2M"}
 
 def get_weather_likelihood(lat, lon, month, day):
-    start = end = f"2020{month:02d}{day:02d}"
+    # Likelihoods depend only on the grid cell and calendar day, so share them across nearby points
+    cell = snap_to_grid(lat, lon)
+    # The live path reads this day of the last complete year (see _weather_likelihood); climatology is historical
+    day_key = _last_complete(int(month), int(day))
+    result = result_cache.get_or_compute(
+        "likelihood",
+        {"cell": cell, "month": int(month), "day": int(day), "live": day_key},
+        lambda: _weather_likelihood(lat, lon, int(month), int(day), day_key),
+        tags=[(*cell, day_key, day_key)],
+    )
+    return dict(result, latitude=lat, longitude=lon)
 
-    params = {
-        "start": start,
-        "end": end,
-        "latitude": lat,
-        "longitude": lon,
-        "parameters": "T2M,PRECTOT,WINDSPD,QV2M",
-        "format": "JSON",
-        "community": "RE",
-    }
 
-    resp = requests.get(NASA_URL, params=params)
-    resp.raise_for_status()
-    data = resp.json()
+def _weather_likelihood(lat, lon, month, day, day_key):
+    # Prefer the long-term day-of-year mean when the cell has been precomputed
+    index = get_index(lat, lon)
+    if index is not None:
+        stats = index.day_stats(month, day)
+        temp = stats["T2M"]["mean"]
+        precip = stats["PRECTOTCORR"]["mean"]
+        wind = stats["WS2M"]["mean"]
+        humidity = stats["RH2M"]["mean"]
+        if None not in (temp, precip, wind, humidity):
+            return _likelihood_result(lat, lon, month, day, temp, precip, wind, humidity, source="climatology")
 
-    # Extract parameter values
-    try:
-        values = data["properties"]["parameter"]
-        temp = list(values["T2M"].values())[0]
-        precip = list(values["PRECTOT"].values())[0]
-        wind = list(values["WINDSPD"].values())[0]
-        humidity = list(values["QV2M"].values())[0]
-    except KeyError:
-        raise Exception("NASA data missing expected fields.")
+    # Same parameters as the climatology, through the POWER cache
+    series = fetch_power_series("daily", lat, lon, list(SEASON_PARAMETERS.values()), day_key, day_key)
+    values = {}
+    for name, code in SEASON_PARAMETERS.items():
+        masked = series[code].masked() if code in series else np.array([])
+        if not len(masked) or np.isnan(masked[0]):
+            raise PowerAPIError(f"No {code} value for {day_key}")
+        values[name] = float(masked[0])
+
+    return _likelihood_result(lat, lon, month, day, source="live", **values)
 
+
+def _last_complete(month, day):
+    """month/day ("YYYYMMDD") in the most recent complete year that has it; Feb 29 → last leap year."""
+    year = date.today().year - 1
+    while day > calendar.monthrange(year, month)[1]:
+        year -= 1
+    return f"{year}{month:02d}{day:02d}"
+
+
+def _likelihood_result(lat, lon, month, day, temp, precip, wind, humidity, source):
     # Compute probabilities heuristically (based on historical extremes)
     result = classify_weather(temp, precip, wind, humidity, lat, lon, month, day)
-   
 
     return {
         "latitude": lat,
@@ -45,4 +72,70 @@ def get_weather_likelihood(lat, lon, month, day):
         "windspeed": wind,
         "humidity": humidity,
         "likelihoods": result,
+        "source": source,
+    }
+
+
+def get_season_likelihood(lat, lon, start_date, end_date, include_days=True):
+    """
+    Score every day of a season or year at one location in a single call.
+
+    Args:
+        start_date, end_date (str): "YYYYMMDD", at most SEASON_MAX_DAYS apart.
+        include_days (bool): also return the per-day likelihood arrays.
+
+    Returns:
+        dict: "frequencies" ({"very_hot": 23.0, ...}: percent of days each
+        condition is likely), "advice" (each recommendation with the share
+        of days it applies to) and, with include_days, "dates" plus one
+        likelihood array per condition (percent, None for missing days).
+    """
+    try:
+        first = datetime.strptime(str(start_date), "%Y%m%d").date()
+        last = datetime.strptime(str(end_date), "%Y%m%d").date()
+    except ValueError:
+        return {"error": "start_date and end_date must be YYYYMMDD"}
+    if last < first:
+        return {"error": "end_date is before start_date"}
+    if (last - first).days + 1 > SEASON_MAX_DAYS:
+        return {"error": f"Range too long (max {SEASON_MAX_DAYS} days)"}
+
+    cell = snap_to_grid(lat, lon)
+    result = result_cache.get_or_compute(
+        "season",
+        {"cell": cell, "start": str(start_date), "end": str(end_date)},
+        lambda: _season_likelihood(lat, lon, str(start_date), str(end_date)),
+        tags=[(*cell, str(start_date), str(end_date))],
+    )
+    if "error" in result:
+        return result
+    result = dict(result, latitude=lat, longitude=lon)
+    if not include_days:
+        result.pop("dates")
+        result.pop("daily")
+    return result
+
+
+def _season_likelihood(lat, lon, start_date, end_date):
+    try:
+        series = fetch_power_series("daily", lat, lon, list(SEASON_PARAMETERS.values()), start_date, end_date)
+    except PowerAPIError as e:
+        return {"error": str(e), "details": e.details}
+
+    with metrics.stage("compute"):
+        inputs = {name: series[code].masked() for name, code in SEASON_PARAMETERS.items()}
+        reference = series[SEASON_PARAMETERS["temp"]]
+        scored = classify_season(lat=lat, months=reference.months(), **inputs)
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": scored["days"],
+        "frequencies": scored["frequencies"],
+        "advice": scored["advice"],
+        "dates": [d.isoformat() for d in reference.dates().astype(object)],
+        "daily": {
+            name: [None if np.isnan(v) else round(float(v), 1) for v in values]
+            for name, values in scored["likelihoods"].items()
+        },
     }
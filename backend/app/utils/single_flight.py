@@ -0,0 +1,82 @@
+import os
+import hashlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process mode is unavailable
+    fcntl = None
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key.
+
+    The first thread to ask for a key runs the function; every thread that
+    asks for the same key while it is running waits and receives the same
+    result (or the same exception). Nothing is remembered once the call
+    finishes — caching is the caller's job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+@contextmanager
+def file_lock(lock_dir, key):
+    """
+    Exclusive advisory lock shared by every process on the box (e.g. gunicorn
+    workers). The key is hashed into a lock file under lock_dir. A no-op where
+    fcntl is unavailable.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(lock_dir, exist_ok=True)
+    name = hashlib.sha1(repr(key).encode()).hexdigest()
+    with open(os.path.join(lock_dir, f"{name}.lock"), "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
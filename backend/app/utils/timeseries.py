@@ -0,0 +1,230 @@
+import datetime
+import numpy as np
+
+# NASA POWER marks missing / not-yet-available values with -999
+FILL_VALUE = -999.0
+
+# Monthly POWER series carry 12 months plus an annual value ("YYYY13") per year
+MONTHLY_SLOTS = 13
+
+
+class PowerSeries:
+    """
+    One NASA POWER parameter stored as a float array on a regular date index.
+
+    Daily series hold one value per day starting at `start` (a date).
+    Monthly series hold 13 slots per year (months 1–12 and the annual
+    value) starting at January of `start.year`.
+
+    Values are kept exactly as NASA sent them, fill values included;
+    use masked() / valid() to drop the -999 entries.
+    """
+
+    __slots__ = ("temporal", "start", "values")
+
+    def __init__(self, temporal, start, values):
+        if temporal not in ("daily", "monthly"):
+            raise ValueError(f"Unsupported temporal resolution '{temporal}'")
+        self.temporal = temporal
+        self.start = start if temporal == "daily" else datetime.date(start.year, 1, 1)
+        values = np.asarray(values)
+        # float32 (e.g. memory-mapped archive slices) is kept as-is so views stay zero-copy
+        self.values = values if values.dtype in (np.float32, np.float64) else values.astype(np.float64)
+
+    def __len__(self):
+        return len(self.values)
+
+    # -------------------------
+    # Parsing / serialising
+    # -------------------------
+    @classmethod
+    def from_dict(cls, mapping, temporal="daily"):
+        """Build a series from POWER's {"YYYYMMDD": value} (or {"YYYYMM": value}) dict."""
+        if not mapping:
+            return cls(temporal, datetime.date(1970, 1, 1), np.empty(0))
+
+        start = _parse_key(next(iter(mapping)), temporal)
+        if temporal == "monthly":
+            start = _MonthSlot(start.year, 1)
+        last = _parse_key(next(reversed(mapping)), temporal) if len(mapping) > 1 else start
+        size = _offset(start, last, temporal) + 1
+
+        if size == len(mapping):
+            # POWER returns contiguous, ordered keys: read values straight into the array
+            values = np.fromiter(mapping.values(), dtype=np.float64, count=size)
+        else:
+            values = np.full(size, FILL_VALUE)
+            for key, val in mapping.items():
+                values[_offset(start, _parse_key(key, temporal), temporal)] = val
+        return cls(temporal, start, values)
+
+    def to_dict(self):
+        """Return the POWER-style {date_key: value} dict (for JSON responses / legacy callers)."""
+        values = self.values
+        if values.dtype != np.float64:
+            # Undo float32 artefacts (23.450000762939453 → 23.45)
+            values = values.astype(np.float64).round(4)
+        return dict(zip(self.keys(), values.tolist()))
+
+    def keys(self):
+        if self.temporal == "daily":
+            return [
+                (self.start + datetime.timedelta(days=i)).strftime("%Y%m%d")
+                for i in range(len(self.values))
+            ]
+        return [
+            f"{self.start.year + i // MONTHLY_SLOTS}{i % MONTHLY_SLOTS + 1:02d}"
+            for i in range(len(self.values))
+        ]
+
+    @property
+    def end(self):
+        """Last date covered (daily) or the last year's January 1st (monthly)."""
+        if self.temporal == "daily":
+            return self.start + datetime.timedelta(days=len(self.values) - 1)
+        return datetime.date(self.start.year + (len(self.values) - 1) // MONTHLY_SLOTS, 1, 1)
+
+    # -------------------------
+    # Slicing / selection
+    # -------------------------
+    def slice(self, start=None, end=None):
+        """
+        Return the sub-series between start and end (inclusive), as a view.
+        Accepts POWER date strings ("YYYYMMDD", "YYYYMM", "YYYY") or dates.
+        """
+        lo = 0 if start is None else max(_offset(self.start, _coerce(start, self.temporal), self.temporal), 0)
+        if end is None:
+            hi = len(self.values)
+        else:
+            end_date = _coerce(end, self.temporal, upper=True)
+            hi = min(_offset(self.start, end_date, self.temporal, upper=True) + 1, len(self.values))
+        hi = max(hi, lo)
+        if self.temporal == "monthly":
+            lo -= lo % MONTHLY_SLOTS
+        new_start = (
+            self.start + datetime.timedelta(days=lo)
+            if self.temporal == "daily"
+            else datetime.date(self.start.year + lo // MONTHLY_SLOTS, 1, 1)
+        )
+        return PowerSeries(self.temporal, new_start, self.values[lo:hi])
+
+    def covers(self, start, end):
+        """True if the series spans the whole [start, end] range."""
+        if len(self.values) == 0:
+            return False
+        first = _coerce(start, self.temporal)
+        last = _coerce(end, self.temporal, upper=True)
+        if self.temporal == "monthly":
+            return self.start.year <= first.year and last.year <= self.end.year
+        return self.start <= first and last <= self.end
+
+    def dates(self):
+        """numpy datetime64[D] array of the daily index."""
+        self._require_daily()
+        start = np.datetime64(self.start, "D")
+        return start + np.arange(len(self.values))
+
+    def months(self):
+        """Month number (1–12, 13 = annual) of each value."""
+        if self.temporal == "monthly":
+            return np.arange(len(self.values)) % MONTHLY_SLOTS + 1
+        dates = self.dates()
+        return (dates.astype("datetime64[M]").astype(int) % 12) + 1
+
+    def years(self):
+        if self.temporal == "monthly":
+            return self.start.year + np.arange(len(self.values)) // MONTHLY_SLOTS
+        return self.dates().astype("datetime64[Y]").astype(int) + 1970
+
+    def days(self):
+        """Day of month of each daily value."""
+        dates = self.dates()
+        return (dates - dates.astype("datetime64[M]")).astype(int) + 1
+
+    def day_of_year(self):
+        """Day of year (1–366) of each daily value."""
+        dates = self.dates()
+        return (dates - dates.astype("datetime64[Y]")).astype(int) + 1
+
+    def select_month_day(self, month, day):
+        """Values falling on the given calendar day, one per year."""
+        return self.values[(self.months() == month) & (self.days() == day)]
+
+    def select_months(self, months):
+        """Values whose month is in `months` (annual slots are never selected)."""
+        return self.values[np.isin(self.months(), list(months))]
+
+    # -------------------------
+    # Fill-value handling
+    # -------------------------
+    def fill_mask(self):
+        return self.values == FILL_VALUE
+
+    def masked(self):
+        """Copy of the values with NASA fill values replaced by NaN."""
+        return np.where(self.fill_mask(), np.nan, self.values)
+
+    def valid(self):
+        """Only the non-fill values."""
+        return self.values[~self.fill_mask()]
+
+    def mean(self):
+        vals = self.valid()
+        return float(vals.mean()) if len(vals) else None
+
+    def _require_daily(self):
+        if self.temporal != "daily":
+            raise ValueError("Operation only supported for daily series")
+
+
+def series_from_parameters(parameters, temporal="daily"):
+    """Convert POWER's properties.parameter dict into {code: PowerSeries}."""
+    return {code: PowerSeries.from_dict(values, temporal) for code, values in parameters.items()}
+
+
+def series_to_parameters(series_by_param):
+    """Inverse of series_from_parameters."""
+    return {code: series.to_dict() for code, series in series_by_param.items()}
+
+
+def _parse_key(key, temporal):
+    if temporal == "daily":
+        return datetime.date(int(key[:4]), int(key[4:6]), int(key[6:8]))
+    # Monthly keys are "YYYYMM" where MM runs 01–13 (13 = annual)
+    return _MonthSlot(int(key[:4]), int(key[4:6]))
+
+
+def _coerce(value, temporal, upper=False):
+    """Turn a POWER date string or date into the series' index type."""
+    if isinstance(value, _MonthSlot):
+        return value
+    if isinstance(value, datetime.date):
+        if temporal == "daily":
+            return value
+        return _MonthSlot(value.year, value.month)
+    value = str(value)
+    if temporal == "daily":
+        if len(value) == 4:
+            return datetime.date(int(value), 12, 31) if upper else datetime.date(int(value), 1, 1)
+        return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    year = int(value[:4])
+    if len(value) >= 6:
+        return _MonthSlot(year, int(value[4:6]))
+    return _MonthSlot(year, MONTHLY_SLOTS if upper else 1)
+
+
+def _offset(start, target, temporal, upper=False):
+    if temporal == "daily":
+        return (target - start).days
+    slot = target.slot if isinstance(target, _MonthSlot) else (MONTHLY_SLOTS if upper else 1)
+    return (target.year - start.year) * MONTHLY_SLOTS + slot - 1
+
+
+class _MonthSlot:
+    """(year, slot) position in a monthly series; slot 13 is the annual value."""
+
+    __slots__ = ("year", "slot")
+
+    def __init__(self, year, slot):
+        self.year = year
+        self.slot = slot
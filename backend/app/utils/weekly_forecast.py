@@ -1,39 +1,37 @@
 # app/utils/weekly_forecast.py
-import requests
 import datetime
 import os
 from dotenv import load_dotenv
+from app.utils.power_cache import PowerAPIError
+from app.utils.recent_window import get_recent_window
+from app.utils.timeseries import series_to_parameters
 
 load_dotenv()
 NASA_POWER_URL = os.getenv("NASA_API")
 
-def get_forecast(lat, lon, days=7):
-    end_date = datetime.date.today() - datetime.timedelta(days=1)
+def get_forecast(lat, lon, days=7, today=None):
+    # today: the day the forecast is for (cache warming prepares tomorrow's ahead of time)
+    end_date = (today or datetime.date.today()) - datetime.timedelta(days=1)
     start_date = end_date - datetime.timedelta(days=days - 1)
 
-    params = {
-        "parameters": "T2M,PRECTOTCORR",
-        "community": "AG",
-        "longitude": lon,
-        "latitude": lat,
-        "start": start_date.strftime("%Y%m%d"),
-        "end": end_date.strftime("%Y%m%d"),
-        "format": "JSON"
-    }
-
-    response = requests.get(NASA_POWER_URL, params=params)
-    data = response.json()
+    try:
+        # Rolling per-cell store: at most a small delta of new/provisional days is fetched
+        series = get_recent_window(
+            lat, lon, days, end=end_date, parameters=["T2M", "PRECTOTCORR"],
+            community="AG", url=NASA_POWER_URL,
+        )
+    except PowerAPIError as e:
+        return {"error": str(e), "details": e.details}
 
     try:
-        props = data["properties"]["parameter"]
-        temps = [t for t in props["T2M"].values() if t != -999]
-        rain = [r for r in props.get("PRECTOTCORR", {}).values() if r != -999]
+        temps = series["T2M"].valid()
+        rain = series["PRECTOTCORR"].valid()
 
-        if not temps or not rain:
+        if not len(temps) or not len(rain):
             raise ValueError("No valid data points in NASA response.")
 
-        avg_temp = sum(temps) / len(temps)
-        total_rain = sum(rain)
+        avg_temp = float(temps.mean())
+        total_rain = float(rain.sum())
 
         advice, confidence = farm_advisor(avg_temp, total_rain)
 
@@ -47,7 +45,7 @@ def get_forecast(lat, lon, days=7):
         }
 
     except Exception as e:
-        return {"error": str(e), "details": data}
+        return {"error": str(e), "details": series_to_parameters(series)}
 
 
 def farm_advisor(avg_temp, total_rain):
@@ -0,0 +1,296 @@
+"""
+Local stand-in for the NASA POWER point API, used by the benchmarks.
+
+Serves GET /{daily,monthly}/point and /{daily,monthly}/regional (also under
+/api/temporal/...) in the same JSON shape as power.larc.nasa.gov, plus a
+minimal Nominatim-style /search for the geocoding routes.
+
+Responses come from, in order:
+  1. a recorded fixture in fixtures_dir matching the exact request, or
+  2. a deterministic synthetic series: the same coordinate, parameter and
+     date always give the same value, whatever range was asked for.
+
+With record=True, requests without a fixture are forwarded to the real
+POWER API and the response saved, so `run.py --record` captures a fixture
+set once and later runs replay it offline.
+"""
+import os
+import json
+import hashlib
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+
+import numpy as np
+import requests
+
+UPSTREAM_URL = "https://power.larc.nasa.gov/api/temporal"
+FILL_VALUE = -999.0
+
+# Days before today that POWER hasn't filled in yet (served as fill values)
+RECENT_LAG_DAYS = 2
+
+# POWER's regional limits: box sides between 2° and 10°, one parameter
+REGIONAL_MIN_SPAN = 2.0
+REGIONAL_MAX_SPAN = 10.0
+REGIONAL_MAX_PARAMETERS = 1
+GRID_LAT_STEP = 0.5
+GRID_LON_STEP = 0.625
+
+# (mean, seasonal amplitude, noise amplitude, floor) per parameter
+PARAMETER_SHAPES = {
+    "T2M": (21.0, 4.0, 3.0, None),
+    "T2M_MAX": (27.0, 4.0, 3.0, None),
+    "T2M_MIN": (14.0, 3.0, 2.5, None),
+    "PRECTOTCORR": (1.5, 3.0, 6.0, 0.0),
+    "PRECTOT": (1.5, 3.0, 6.0, 0.0),
+    "RH2M": (65.0, 12.0, 10.0, 0.0),
+    "QV2M": (10.0, 2.0, 1.5, 0.0),
+    "WS2M": (3.0, 1.0, 1.5, 0.0),
+}
+DEFAULT_SHAPE = (10.0, 2.0, 2.0, None)
+
+
+def synthetic_values(lat, lon, parameter, dates):
+    """Deterministic values for the given dates (numpy datetime64[D] array)."""
+    mean, amplitude, noise, floor = PARAMETER_SHAPES.get(parameter, DEFAULT_SHAPE)
+    seed = int.from_bytes(hashlib.sha1(f"{lat:.3f},{lon:.3f},{parameter}".encode()).digest()[:4], "little")
+
+    days = dates.astype("int64").astype(np.float64)
+    day_of_year = (dates - dates.astype("datetime64[Y]")).astype(np.float64)
+    # Classic sin-hash: cheap, vectorised and stable per (coordinate, parameter, day)
+    hashed = np.sin(days * 12.9898 + (seed % 100000) * 78.233) * 43758.5453
+    jitter = (hashed - np.floor(hashed)) * 2 - 1
+
+    latitude_shift = -abs(lat) * 0.15 if parameter.startswith("T2M") else 0.0
+    values = mean + latitude_shift + amplitude * np.sin(2 * np.pi * (day_of_year - 80) / 365.25) + noise * jitter
+    if floor is not None:
+        values = np.maximum(values, floor)
+    return np.round(values, 2)
+
+
+def synthetic_parameters(temporal, lat, lon, parameters, start, end, today=None):
+    """{parameter: {date key: value}} as POWER would return for this request."""
+    today = today or datetime.date.today()
+    if temporal == "monthly":
+        years = np.arange(int(start[:4]), int(end[:4]) + 1)
+        mid_month = np.array(
+            [np.datetime64(f"{y}-{m:02d}-15") for y in years for m in range(1, 13)], dtype="datetime64[D]"
+        )
+        keys = [f"{y}{m:02d}" for y in years for m in range(1, 14)]
+        out = {}
+        for parameter in parameters:
+            monthly = synthetic_values(lat, lon, parameter, mid_month).reshape(len(years), 12)
+            # Slot 13 is the annual value
+            table = np.concatenate([monthly, monthly.mean(axis=1, keepdims=True).round(2)], axis=1)
+            out[parameter] = dict(zip(keys, table.ravel().tolist()))
+        return out
+
+    first = np.datetime64(datetime.datetime.strptime(start, "%Y%m%d").date(), "D")
+    last = np.datetime64(datetime.datetime.strptime(end, "%Y%m%d").date(), "D")
+    dates = np.arange(first, last + 1, dtype="datetime64[D]")
+    keys = [d.strftime("%Y%m%d") for d in dates.astype(object)]
+    unfilled = dates > np.datetime64(today - datetime.timedelta(days=RECENT_LAG_DAYS + 1), "D")
+
+    out = {}
+    for parameter in parameters:
+        values = synthetic_values(lat, lon, parameter, dates)
+        values[unfilled] = FILL_VALUE
+        out[parameter] = dict(zip(keys, values.tolist()))
+    return out
+
+
+def power_payload(lat, lon, parameters):
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat, 0.0]},
+        "properties": {"parameter": parameters},
+        "header": {"title": "NASA/POWER stand-in", "fill_value": FILL_VALUE},
+        "messages": [],
+    }
+
+
+class PowerStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "PowerStub/1.0"
+    # Headers and body go out in separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split("/") if p]
+
+        if parts and parts[-1] == "search":
+            return self.send_json(200, self.server.stub.search(query))
+        if len(parts) >= 2 and parts[-1] == "point" and parts[-2] in ("daily", "monthly"):
+            status, body = self.server.stub.point(parts[-2], query)
+            return self.send_body(status, body)
+        if len(parts) >= 2 and parts[-1] == "regional" and parts[-2] in ("daily", "monthly"):
+            status, body = self.server.stub.regional(parts[-2], query)
+            return self.send_body(status, body)
+        return self.send_json(404, {"messages": [f"Unknown path {url.path}"]})
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload).encode())
+
+    def send_body(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PowerStub:
+    """Threaded stub server; use as a context manager or call start()/stop()."""
+
+    handler_class = PowerStubHandler
+
+    def __init__(self, host="127.0.0.1", port=0, fixtures_dir=None, record=False):
+        self.fixtures_dir = fixtures_dir
+        self.record = record
+        self.requests = 0
+        self.replayed = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self.handler_class)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -------------------------
+    # Endpoints
+    # -------------------------
+    def point(self, temporal, query):
+        """(status, body bytes) for one POWER point request."""
+        with self._lock:
+            self.requests += 1
+        try:
+            lat, lon = float(query["latitude"]), float(query["longitude"])
+            parameters = query["parameters"].split(",")
+            start, end = query["start"], query["end"]
+        except (KeyError, ValueError) as e:
+            return 422, json.dumps({"messages": [f"Invalid request: {e}"]}).encode()
+
+        path = self.fixture_path(temporal, query)
+        if path and os.path.exists(path):
+            with self._lock:
+                self.replayed += 1
+            with open(path, "rb") as f:
+                return 200, f.read()
+
+        if self.record and path:
+            return self._record(temporal, query, path)
+
+        payload = power_payload(lat, lon, synthetic_parameters(temporal, lat, lon, parameters, start, end))
+        return 200, json.dumps(payload).encode()
+
+    def regional(self, temporal, query):
+        """(status, body bytes) for one POWER regional request: a FeatureCollection of grid points."""
+        with self._lock:
+            self.requests += 1
+        try:
+            lat_min, lat_max = float(query["latitude-min"]), float(query["latitude-max"])
+            lon_min, lon_max = float(query["longitude-min"]), float(query["longitude-max"])
+            parameters = query["parameters"].split(",")
+            start, end = query["start"], query["end"]
+        except (KeyError, ValueError) as e:
+            return 422, json.dumps({"messages": [f"Invalid request: {e}"]}).encode()
+        spans = (lat_max - lat_min, lon_max - lon_min)
+        if not all(REGIONAL_MIN_SPAN <= span <= REGIONAL_MAX_SPAN for span in spans):
+            return 422, json.dumps({"messages": [f"Bounding box sides must be {REGIONAL_MIN_SPAN}–"
+                                                 f"{REGIONAL_MAX_SPAN} degrees, got {spans}"]}).encode()
+        if len(parameters) > REGIONAL_MAX_PARAMETERS:
+            return 422, json.dumps({"messages": ["Too many parameters for a regional request"]}).encode()
+
+        path = self.fixture_path(f"{temporal}-regional", query)
+        if path and os.path.exists(path):
+            with self._lock:
+                self.replayed += 1
+            with open(path, "rb") as f:
+                return 200, f.read()
+        if self.record and path:
+            return self._record(temporal, query, path, endpoint="regional")
+
+        lats = np.arange(np.ceil(lat_min / GRID_LAT_STEP), np.floor(lat_max / GRID_LAT_STEP) + 1) * GRID_LAT_STEP
+        lons = np.arange(np.ceil(lon_min / GRID_LON_STEP), np.floor(lon_max / GRID_LON_STEP) + 1) * GRID_LON_STEP
+        features = [
+            power_payload(lat, lon, synthetic_parameters(temporal, lat, lon, parameters, start, end))
+            for lat in np.round(lats, 4).tolist() for lon in np.round(lons, 4).tolist()
+        ]
+        for feature in features:
+            del feature["header"], feature["messages"]
+        payload = {"type": "FeatureCollection", "features": features,
+                   "header": {"title": "NASA/POWER stand-in", "fill_value": FILL_VALUE}, "messages": []}
+        return 200, json.dumps(payload).encode()
+
+    def search(self, query):
+        """Nominatim-style lookup: every name resolves to a stable made-up coordinate."""
+        name = query.get("q", "")
+        digest = hashlib.sha1(name.lower().encode()).digest()
+        lat = round(-5 + digest[0] / 255 * 10, 4)
+        lon = round(33 + digest[1] / 255 * 10, 4)
+        return [{"lat": str(lat), "lon": str(lon), "display_name": name}]
+
+    # -------------------------
+    # Fixtures
+    # -------------------------
+    def fixture_path(self, temporal, query):
+        if not self.fixtures_dir:
+            return None
+        return os.path.join(self.fixtures_dir, fixture_name(temporal, query))
+
+    def _record(self, temporal, query, path, endpoint="point"):
+        response = requests.get(f"{UPSTREAM_URL}/{temporal}/{endpoint}", params=query, timeout=120)
+        if response.status_code == 200:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(response.content)
+        return response.status_code, response.content
+
+
+def fixture_name(temporal, query):
+    """File name for a recorded response; independent of query-string order."""
+    canonical = urlencode(sorted((k, v) for k, v in query.items() if k != "format"))
+    return f"{temporal}-{hashlib.sha1(canonical.encode()).hexdigest()[:16]}.json"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--fixtures", default=None, help="Directory of recorded responses.")
+    parser.add_argument("--record", action="store_true", help="Record missing fixtures from the real API.")
+    args = parser.parse_args()
+
+    stub = PowerStub(port=args.port, fixtures_dir=args.fixtures, record=args.record)
+    print(f"POWER stub on {stub.url} (POWER_BASE_URL={stub.url}, NASA_API={stub.url}/daily/point)")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,360 @@
+"""
+Benchmarks for the NASA POWER analysis paths.
+
+Replays POWER responses of several sizes from a local stub server (see
+power_stub.py) through the analysis functions and the dashboard routes,
+and reports per case:
+
+  time      min / median wall time per call (ms)
+  peak      peak Python heap allocated during one call (tracemalloc, KB)
+  stages    time per call in the fetch / parse / compute / serialize
+            stages, taken from the app's own stage metrics
+  upstream  POWER requests per call
+
+Functions run in three cache states: "cold" (empty POWER and result
+caches), "raw" (POWER data cached, results recomputed) and "warm"
+(result cache hit). Routes are driven through the Flask test client with
+a warm cache to give single-threaded requests/second.
+
+Usage, from backend/:
+    python -m benchmarks.run                      # synthetic series
+    python -m benchmarks.run --record             # record fixtures from NASA POWER once
+    python -m benchmarks.run --only analysis,routes --json bench.json
+
+Nothing here touches the real caches or NASA (unless --record is given):
+every cache lives in a temporary directory for the duration of the run.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import statistics
+import tempfile
+import tracemalloc
+
+from benchmarks.power_stub import PowerStub, synthetic_parameters, power_payload
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+LAT, LON = -1.2864, 36.8172
+END = datetime.date(2020, 12, 31)
+
+QUERY = {
+    "temperature": "25:above",
+    "precipitation": "5:above",
+    "humidity": "70:below",
+    "wind_speed": "4:above",
+}
+
+DAILY_SIZES = {
+    "7d": END - datetime.timedelta(days=6),
+    "1y": datetime.date(2020, 1, 1),
+    "40y": datetime.date(1981, 1, 1),
+}
+MONTHLY_YEARS = (1, 10, 40)
+FORECAST_DAYS = (7, 30)
+
+# Sample request for each dashboard route; routes missing here are reported
+ROUTE_REQUESTS = {
+    "/dashboard/data": ("POST", {"json": {"latitude": LAT, "longitude": LON, "month": 6, "day": 15, "year": 2024}}),
+    "/dashboard/farm-advice": ("POST", {"json": {"latitude": LAT, "longitude": LON, "days": 7}}),
+    "/dashboard/analysis-results": ("POST", {"json": dict(
+        QUERY, latitude=LAT, longitude=LON, start_date="20000101", end_date="20201231"
+    )}),
+    "/dashboard/analysis-results/batch": ("POST", {"json": {
+        "locations": [{"id": f"farm-{i}", "latitude": LAT + i * 0.5, "longitude": LON} for i in range(10)],
+        "start_date": "20200101", "end_date": "20201231", "thresholds": QUERY,
+    }}),
+    "/dashboard/nasa-graphing": ("POST", {"json": {
+        "latitude": LAT, "longitude": LON, "start_date": "2001", "end_date": "2020"
+    }}),
+    "/dashboard/season-likelihood": ("POST", {"json": {"latitude": LAT, "longitude": LON, "year": 2020}}),
+    "/dashboard/regional-map": ("POST", {"json": dict(
+        QUERY, bbox=f"{LAT - 1},{LON - 1},{LAT + 1},{LON + 1}", start_date="20110101", end_date="20201231"
+    )}),
+    "/dashboard/geocode": ("POST", {"json": {"places": ["Nairobi", "Eldoret", "Kisumu"]}}),
+    "/dashboard/places/autocomplete": ("GET", {"query_string": {"q": "nai"}}),
+    "/dashboard/cache/stats": ("GET", {}),
+}
+
+
+def configure_environment(stub, workdir):
+    """Point every cache and upstream at the stub / temp dir (before app imports)."""
+    os.environ.update({
+        "POWER_BASE_URL": stub.url,
+        "NASA_API": f"{stub.url}/daily/point",
+        "NOMINATIM_URL": f"{stub.url}/search",
+        "POWER_CACHE_DB": os.path.join(workdir, "power_cache.db"),
+        "RESULT_CACHE_BACKEND": "memory",
+        "GEOCODE_CACHE_DB": os.path.join(workdir, "geocode_cache.db"),
+        "GEOCODE_RATE": "1000",
+        "CLIMATOLOGY_DIR": os.path.join(workdir, "climatology"),
+        "POWER_LOCK_DIR": os.path.join(workdir, "locks"),
+        "LOG_LEVEL": "WARNING",
+    })
+    os.environ.pop("POWER_ARCHIVE_PATH", None)
+    os.environ.pop("POWER_OFFLINE", None)
+
+
+# -------------------------
+# Measurement
+# -------------------------
+class Runner:
+    def __init__(self, stub, repeat):
+        from app.utils import metrics, power_cache, recent_window, result_cache
+
+        self.stub = stub
+        self.repeat = repeat
+        self.metrics = metrics
+        self.power_cache = power_cache
+        self.recent_window = recent_window
+        self.result_cache = result_cache
+        self.results = []
+
+    def clear_raw(self):
+        for conn, table in (
+            (self.power_cache._connection(), "power_arrays"),
+            (self.recent_window._connection(), "recent_daily"),
+        ):
+            with conn:
+                conn.execute(f"DELETE FROM {table}")
+
+    def clear_results(self):
+        self.result_cache.results.clear()
+
+    def measure(self, group, case, fn, state=None):
+        """Time fn() self.repeat times (plus one tracemalloc run) in the given cache state."""
+        prepare = {
+            "cold": lambda: (self.clear_raw(), self.clear_results()),
+            "raw": self.clear_results,
+            "warm": lambda: None,
+        }.get(state, lambda: None)
+
+        if state in ("raw", "warm"):
+            _check(fn())  # populate the caches this state relies on
+
+        times, stage_totals, upstream = [], {}, 0
+        for _ in range(self.repeat):
+            prepare()
+            before_stages = self.metrics.STAGE_SECONDS.totals()
+            before_upstream = self.stub.requests
+            start = time.perf_counter()
+            _check(fn())
+            times.append(time.perf_counter() - start)
+            upstream += self.stub.requests - before_upstream
+            for key, (seconds, _) in self.metrics.STAGE_SECONDS.totals().items():
+                delta = seconds - before_stages.get(key, (0.0, 0))[0]
+                if delta > 0:
+                    stage_totals[key[0]] = stage_totals.get(key[0], 0.0) + delta
+
+        prepare()
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        row = {
+            "group": group,
+            "case": case,
+            "state": state or "-",
+            "min_ms": min(times) * 1000,
+            "median_ms": statistics.median(times) * 1000,
+            "peak_kb": peak / 1024,
+            "stages_ms": {k: v * 1000 / self.repeat for k, v in sorted(stage_totals.items())},
+            "upstream": upstream / self.repeat,
+        }
+        self.results.append(row)
+        _print_row(row)
+        return row
+
+
+def _check(result):
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(f"Benchmark call failed: {result}")
+    return result
+
+
+# -------------------------
+# Benchmark groups
+# -------------------------
+def bench_parse(runner):
+    from app.utils.power_stream import parse_power_stream, STREAM_CHUNK_SIZE
+
+    payloads = {f"daily {label}": ("daily", _daily_payload(start)) for label, start in DAILY_SIZES.items()}
+    payloads.update({f"monthly {n}y": ("monthly", _monthly_payload(n)) for n in MONTHLY_YEARS})
+    for name, (temporal, body) in payloads.items():
+        chunks = [body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE)]
+        runner.measure("parse", f"{name} ({len(body) / 1024:.0f} KB)", lambda: parse_power_stream(chunks, temporal))
+
+
+def bench_analysis(runner):
+    from app.utils.analysis import fetch_and_analyze_nasa_data
+
+    for label, start in DAILY_SIZES.items():
+        for state in ("cold", "raw", "warm"):
+            runner.measure(
+                "fetch_and_analyze_nasa_data", f"daily {label}",
+                lambda: fetch_and_analyze_nasa_data(dict(QUERY), LAT, LON, _ymd(start), _ymd(END), detailed=True),
+                state,
+            )
+
+
+def bench_json_analysis(runner):
+    from app.utils.json_analysis import analyze_weather_json
+
+    for years in MONTHLY_YEARS:
+        data = json.loads(_monthly_payload(years))
+        runner.measure("analyze_weather_json", f"monthly {years}y", lambda: analyze_weather_json(data))
+
+
+def bench_graphing(runner):
+    from app.utils.graphing import fetch_weather_trends
+
+    for years in MONTHLY_YEARS:
+        first = str(END.year - years + 1)
+        for state in ("cold", "raw", "warm"):
+            runner.measure(
+                "fetch_weather_trends", f"monthly {years}y",
+                lambda: fetch_weather_trends(LAT, LON, first, str(END.year)), state,
+            )
+
+
+def bench_forecast(runner):
+    from app.utils.weekly_forecast import get_forecast
+
+    # get_forecast reads its own rolling store rather than the result cache
+    for days in FORECAST_DAYS:
+        for state in ("cold", "warm"):
+            runner.measure("get_forecast", f"{days} days", lambda: get_forecast(LAT, LON, days), state)
+
+
+def bench_five_year(runner):
+    from app.utils.nasa_power_fetcher import fetch_nasa_power_5yr
+
+    for state in ("cold", "warm"):
+        runner.measure("fetch_nasa_power_5yr", "06-15", lambda: fetch_nasa_power_5yr(LAT, LON, 6, 15), state)
+
+
+def bench_routes(runner, requests_per_route):
+    from app import create_app
+
+    app = create_app()
+    client = app.test_client()
+    rules = sorted(
+        {rule.rule for rule in app.url_map.iter_rules() if rule.endpoint.startswith("dashboard_bp.")}
+    )
+    for path in rules:
+        if path not in ROUTE_REQUESTS:
+            print(f"  {'routes':<28} {path:<36} skipped: no sample request in ROUTE_REQUESTS")
+            continue
+        method, kwargs = ROUTE_REQUESTS[path]
+
+        def call():
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {path} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+        call()  # warm the caches
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(requests_per_route):
+            t0 = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        row = {
+            "group": "routes",
+            "case": f"{method} {path}",
+            "state": "warm",
+            "requests": requests_per_route,
+            "rps": requests_per_route / elapsed,
+            "p50_ms": latencies[len(latencies) // 2] * 1000,
+            "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        }
+        runner.results.append(row)
+        print(f"  {'routes':<28} {row['case']:<36} {row['rps']:>9.1f} req/s   "
+              f"p50 {row['p50_ms']:.2f} ms   p95 {row['p95_ms']:.2f} ms")
+
+
+GROUPS = {
+    "parse": bench_parse,
+    "analysis": bench_analysis,
+    "json_analysis": bench_json_analysis,
+    "graphing": bench_graphing,
+    "forecast": bench_forecast,
+    "five_year": bench_five_year,
+    "routes": bench_routes,
+}
+
+
+# -------------------------
+# Payloads and output
+# -------------------------
+def _ymd(day):
+    return day.strftime("%Y%m%d")
+
+
+def _daily_payload(start):
+    params = synthetic_parameters("daily", LAT, LON, ["T2M", "PRECTOTCORR", "RH2M", "WS2M"], _ymd(start), _ymd(END))
+    return json.dumps(power_payload(LAT, LON, params)).encode()
+
+
+def _monthly_payload(years):
+    params = synthetic_parameters(
+        "monthly", LAT, LON, ["T2M", "PRECTOTCORR", "WS2M", "QV2M"], str(END.year - years + 1), str(END.year)
+    )
+    return json.dumps(power_payload(LAT, LON, params)).encode()
+
+
+def _print_row(row):
+    stages = " ".join(f"{k}={v:.2f}" for k, v in row["stages_ms"].items())
+    print(
+        f"  {row['group']:<28} {row['case']:<20} {row['state']:<5} "
+        f"{row['min_ms']:>9.2f} ms  (median {row['median_ms']:>9.2f})  "
+        f"peak {row['peak_kb']:>9.1f} KB  upstream {row['upstream']:.1f}"
+        + (f"  [{stages}]" if stages else "")
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per case.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per route for throughput.")
+    parser.add_argument("--only", default="", help=f"Comma-separated groups: {','.join(GROUPS)}")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Directory of recorded POWER responses.")
+    parser.add_argument("--record", action="store_true", help="Record missing fixtures from the real POWER API.")
+    parser.add_argument("--json", dest="json_out", default=None, help="Also write results to this file.")
+    args = parser.parse_args(argv)
+
+    groups = [g for g in args.only.split(",") if g] or list(GROUPS)
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"Unknown group(s): {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="weather-bench-") as workdir, \
+            PowerStub(fixtures_dir=args.fixtures, record=args.record) as stub:
+        configure_environment(stub, workdir)
+        runner = Runner(stub, args.repeat)
+        print(f"POWER stub at {stub.url}, {args.repeat} timed call(s) per case\n")
+        for name in groups:
+            if name == "routes":
+                bench_routes(runner, args.requests)
+            else:
+                GROUPS[name](runner)
+        print(f"\n{stub.requests} upstream request(s), {stub.replayed} replayed from fixtures")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "results": runner.results}, f, indent=2)
+    return runner.results
+
+
+if __name__ == "__main__":
+    main()
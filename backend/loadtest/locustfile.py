@@ -0,0 +1,174 @@
+"""
+Locust load test covering every dashboard_bp and auth_bp route.
+
+Start the mock upstream and the app first (see mock_power.py), then from
+backend/:
+
+    pip install locust
+    locust -f loadtest/locustfile.py --host http://127.0.0.1:5000
+    # or headless:
+    locust -f loadtest/locustfile.py --host http://127.0.0.1:5000 \
+        --headless -u 200 -r 20 -t 5m --csv loadtest-results
+
+Request mix and key space are set through the environment:
+
+  LOADTEST_LOCATIONS   distinct farm locations users pick from (default 50);
+                       fewer locations → higher cache hit ratio
+  LOADTEST_SPREAD      degrees around the centre they are scattered over (default 2.0)
+  LOADTEST_CENTER      "lat,lon" centre of the scatter (default Nairobi)
+  LOADTEST_SEED        seed for the location set (default 7)
+
+Each simulated user logs in once (registering a throwaway account) and
+then mixes dashboard calls roughly the way the frontend does: a lot of
+threshold analysis and trends, fewer batch and geocoding calls.
+"""
+import os
+import uuid
+import random
+import datetime
+from urllib.parse import urlencode
+
+from locust import HttpUser, task, between
+
+LOCATIONS = int(os.getenv("LOADTEST_LOCATIONS", "50"))
+SPREAD = float(os.getenv("LOADTEST_SPREAD", "2.0"))
+CENTER = tuple(float(v) for v in os.getenv("LOADTEST_CENTER", "-1.2864,36.8172").split(","))
+SEED = int(os.getenv("LOADTEST_SEED", "7"))
+
+_rng = random.Random(SEED)
+FARMS = [
+    (round(CENTER[0] + _rng.uniform(-SPREAD, SPREAD), 4), round(CENTER[1] + _rng.uniform(-SPREAD, SPREAD), 4))
+    for _ in range(LOCATIONS)
+]
+PLACES = ["Nairobi", "Eldoret", "Kisumu", "Nakuru", "Mombasa", "Thika", "Machakos", "Nyeri"]
+THRESHOLDS = [
+    {"temperature": "30:above"},
+    {"temperature": "25:above", "precipitation": "10:above"},
+    {"humidity": "40:below", "wind_speed": "6:above"},
+]
+
+
+def _query(body):
+    """Query string in the app's canonical form, so GETs aren't 308-redirected (see http_cache)."""
+    return urlencode(sorted((k, str(v)) for k, v in body.items()), safe=":,")
+
+
+class DashboardUser(HttpUser):
+    wait_time = between(1, 5)
+
+    def on_start(self):
+        self.headers = {}
+        name = f"load-{uuid.uuid4().hex[:12]}"
+        account = {"username": name, "email": f"{name}@example.com", "password": "loadtest-password"}
+        self.client.post("/auth/register", json=account, name="/auth/register")
+        response = self.client.post(
+            "/auth/login", json={"email": account["email"], "password": account["password"]}, name="/auth/login"
+        )
+        if response.ok:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def _farm(self):
+        return random.choice(FARMS)
+
+    # -------------------------
+    # auth_bp
+    # -------------------------
+    @task(1)
+    def profile(self):
+        self.client.get("/auth/me", headers=self.headers, name="/auth/me")
+
+    @task(1)
+    def demo_login(self):
+        self.client.get("/auth/demo", name="/auth/demo")
+
+    # -------------------------
+    # dashboard_bp
+    # -------------------------
+    @task(4)
+    def five_year_data(self):
+        lat, lon = self._farm()
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        body = {"latitude": lat, "longitude": lon, "month": tomorrow.month, "day": tomorrow.day, "year": tomorrow.year}
+        if random.random() < 0.5:
+            self.client.post("/dashboard/data", json=body, name="POST /dashboard/data")
+        else:
+            self.client.get(f"/dashboard/data?{_query(body)}", name="GET /dashboard/data")
+
+    @task(3)
+    def farm_advice(self):
+        lat, lon = self._farm()
+        days = random.choice([7, 14, 30])
+        self.client.post("/dashboard/farm-advice", json={"latitude": lat, "longitude": lon, "days": days},
+                         name="/dashboard/farm-advice")
+
+    @task(6)
+    def analysis_results(self):
+        lat, lon = self._farm()
+        end_year = random.choice([2020, 2022, 2024])
+        body = dict(random.choice(THRESHOLDS), latitude=lat, longitude=lon,
+                    start_date=f"{end_year - 9}0101", end_date=f"{end_year}1231")
+        if random.random() < 0.5:
+            self.client.post("/dashboard/analysis-results", json=body, name="POST /dashboard/analysis-results")
+        else:
+            self.client.get(f"/dashboard/analysis-results?{_query(body)}", name="GET /dashboard/analysis-results")
+
+    @task(1)
+    def batch_analysis(self):
+        farms = random.sample(FARMS, min(len(FARMS), 20))
+        body = {
+            "locations": [{"id": f"farm-{i}", "latitude": lat, "longitude": lon} for i, (lat, lon) in enumerate(farms)],
+            "start_date": "20200101",
+            "end_date": "20231231",
+            "thresholds": random.choice(THRESHOLDS),
+        }
+        with self.client.post("/dashboard/analysis-results/batch", json=body, stream=True,
+                              name="/dashboard/analysis-results/batch", catch_response=True) as response:
+            lines = sum(1 for line in response.iter_lines() if line)
+            if response.ok and lines != len(farms):
+                response.failure(f"expected {len(farms)} results, got {lines}")
+
+    @task(4)
+    def nasa_graphing(self):
+        lat, lon = self._farm()
+        end_year = random.choice([2020, 2022, 2024])
+        body = {"latitude": lat, "longitude": lon, "start_date": str(end_year - random.choice([4, 9, 19])),
+                "end_date": str(end_year), "format": random.choice(["json", "columnar"])}
+        if random.random() < 0.5:
+            self.client.post("/dashboard/nasa-graphing", json=body, name="POST /dashboard/nasa-graphing")
+        else:
+            self.client.get(f"/dashboard/nasa-graphing?{_query(body)}", name="GET /dashboard/nasa-graphing")
+
+    @task(2)
+    def season_likelihood(self):
+        lat, lon = self._farm()
+        body = {"latitude": lat, "longitude": lon, "year": random.choice([2020, 2022, 2024]),
+                "include_days": random.choice(["true", "false"])}
+        if random.random() < 0.5:
+            self.client.post("/dashboard/season-likelihood", json=body, name="POST /dashboard/season-likelihood")
+        else:
+            self.client.get(f"/dashboard/season-likelihood?{_query(body)}", name="GET /dashboard/season-likelihood")
+
+    @task(1)
+    def regional_map(self):
+        lat, lon = self._farm()
+        end_year = random.choice([2020, 2022, 2024])
+        body = dict(random.choice(THRESHOLDS), bbox=f"{lat - 1},{lon - 1},{lat + 1},{lon + 1}",
+                    start_date=f"{end_year - 9}0101", end_date=f"{end_year}1231",
+                    format=random.choice(["geojson", "grid"]))
+        if random.random() < 0.5:
+            self.client.post("/dashboard/regional-map", json=body, name="POST /dashboard/regional-map")
+        else:
+            self.client.get(f"/dashboard/regional-map?{_query(body)}", name="GET /dashboard/regional-map")
+
+    @task(1)
+    def geocode(self):
+        self.client.post("/dashboard/geocode", json={"places": random.sample(PLACES, 3)}, name="/dashboard/geocode")
+
+    @task(2)
+    def autocomplete(self):
+        prefix = random.choice(PLACES)[:random.randint(1, 4)].lower()
+        self.client.get("/dashboard/places/autocomplete", params={"q": prefix}, name="/dashboard/places/autocomplete")
+
+    @task(1)
+    def cache_stats(self):
+        self.client.get("/dashboard/cache/stats", name="/dashboard/cache/stats")
@@ -0,0 +1,181 @@
+"""
+Mock NASA POWER service for load testing.
+
+Speaks the daily and monthly point and regional APIs the app calls, with deterministic
+synthetic series per coordinate (see benchmarks/power_stub.py), plus the
+misbehaviour a real upstream shows under load:
+
+  latency       fixed base delay + per-day-of-data delay + random jitter
+  errors        a fraction of requests answered 500/502/503, or a hung
+                connection that outlasts the client's read timeout
+  rate limit    token bucket per client address; excess requests get
+                429 with Retry-After, like POWER's own throttling
+
+Run it, then point the app at it (from backend/):
+
+    python -m loadtest.mock_power --port 8899 --latency-ms 300 --error-rate 0.02 --rate-limit 30
+    POWER_BASE_URL=http://127.0.0.1:8899 NOMINATIM_URL=http://127.0.0.1:8899/search \
+        gunicorn run:app --worker-class gthread --threads 256
+
+POWER_BASE_URL covers every fetch path (nasa_fetch, graphing, the cache
+and the async client); if NASA_API is set in .env, point it at
+http://127.0.0.1:8899/daily/point too or unset it. Every flag has a
+MOCK_POWER_* environment equivalent. The same --seed gives the same
+sequence of injected errors and jitter.
+"""
+import os
+import time
+import random
+import datetime
+import argparse
+import threading
+
+from benchmarks.power_stub import PowerStub, PowerStubHandler
+from app.utils.rate_limit import TokenBucket
+
+
+def _env(name, default):
+    return os.getenv(f"MOCK_POWER_{name}", default)
+
+
+class MockPowerHandler(PowerStubHandler):
+    def do_GET(self):
+        server = self.server.stub
+        if not server.admit(self.client_address[0]):
+            return self.send_throttled()
+
+        fault = server.pick_fault()
+        if fault == "hang":
+            time.sleep(server.hang_seconds)
+            return self.send_json(504, {"messages": ["Gateway timeout (injected)"]})
+        if fault:
+            return self.send_json(fault, {"messages": [f"Injected error {fault}"]})
+
+        time.sleep(server.delay_for(self.path))
+        return super().do_GET()
+
+    def send_throttled(self):
+        self.send_response(429)
+        self.send_header("Retry-After", "1")
+        self.send_header("Content-Type", "application/json")
+        body = b'{"messages": ["Rate limit exceeded (mock)"]}'
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockPower(PowerStub):
+    """PowerStub with latency, error injection and per-client rate limiting."""
+
+    handler_class = MockPowerHandler
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0.0, per_day_us=0.0, jitter_ms=0.0,
+                 error_rate=0.0, error_statuses=(500, 502, 503), hang_rate=0.0, hang_seconds=35.0,
+                 rate_limit=0.0, burst=None, seed=None, fixtures_dir=None):
+        super().__init__(host, port, fixtures_dir=fixtures_dir)
+        self.latency = latency_ms / 1000
+        self.per_day = per_day_us / 1e6
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.rate_limit = rate_limit
+        self.burst = burst or max(1.0, rate_limit)
+        self.throttled = 0
+        self.faults = 0
+        self._random = random.Random(seed)
+        self._buckets = {}
+        self._mock_lock = threading.Lock()
+
+    def admit(self, client):
+        if self.rate_limit <= 0:
+            return True
+        with self._mock_lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate_limit, self.burst)
+        if bucket.acquire(blocking=False):
+            return True
+        with self._mock_lock:
+            self.throttled += 1
+        return False
+
+    def pick_fault(self):
+        """None, "hang" or an HTTP status to fail this request with."""
+        with self._mock_lock:
+            roll = self._random.random()
+            status = self._random.choice(self.error_statuses) if self.error_statuses else 500
+            if roll < self.hang_rate:
+                self.faults += 1
+                return "hang"
+            if roll < self.hang_rate + self.error_rate:
+                self.faults += 1
+                return status
+        return None
+
+    def delay_for(self, path):
+        """Seconds to wait before answering: base + size-dependent + jitter."""
+        with self._mock_lock:
+            jitter = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.latency + self.per_day * _days_requested(path) + jitter
+
+    def summary(self):
+        return {"requests": self.requests, "throttled": self.throttled, "faults": self.faults}
+
+
+def _days_requested(path):
+    """Days of data in a point request (a monthly year counts as 365)."""
+    query = dict(part.split("=", 1) for part in path.partition("?")[2].split("&") if "=" in part)
+    start, end = query.get("start", ""), query.get("end", "")
+    try:
+        if len(start) == 8 and len(end) == 8:
+            first, last = (datetime.datetime.strptime(d, "%Y%m%d") for d in (start, end))
+            return max(0, (last - first).days + 1)
+    except ValueError:
+        return 0
+    if start[:4].isdigit() and end[:4].isdigit():
+        return (int(end[:4]) - int(start[:4]) + 1) * 365
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=_env("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(_env("PORT", "8899")))
+    parser.add_argument("--latency-ms", type=float, default=float(_env("LATENCY_MS", "0")),
+                        help="Fixed delay per request.")
+    parser.add_argument("--per-day-us", type=float, default=float(_env("PER_DAY_US", "0")),
+                        help="Extra delay per day of data requested (microseconds).")
+    parser.add_argument("--jitter-ms", type=float, default=float(_env("JITTER_MS", "0")),
+                        help="Uniform random extra delay, 0..jitter.")
+    parser.add_argument("--error-rate", type=float, default=float(_env("ERROR_RATE", "0")),
+                        help="Fraction of requests answered with an error status.")
+    parser.add_argument("--error-statuses", default=_env("ERROR_STATUSES", "500,502,503"))
+    parser.add_argument("--hang-rate", type=float, default=float(_env("HANG_RATE", "0")),
+                        help="Fraction of requests that stall for --hang-seconds.")
+    parser.add_argument("--hang-seconds", type=float, default=float(_env("HANG_SECONDS", "35")))
+    parser.add_argument("--rate-limit", type=float, default=float(_env("RATE_LIMIT", "0")),
+                        help="Requests per second per client address (0 = unlimited).")
+    parser.add_argument("--burst", type=float, default=float(_env("BURST", "0")) or None)
+    parser.add_argument("--seed", type=int, default=int(_env("SEED", "42")))
+    parser.add_argument("--fixtures", default=_env("FIXTURES", None), help="Recorded responses to replay.")
+    args = parser.parse_args(argv)
+
+    mock = MockPower(
+        args.host, args.port, latency_ms=args.latency_ms, per_day_us=args.per_day_us, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, error_statuses=[int(s) for s in args.error_statuses.split(",") if s],
+        hang_rate=args.hang_rate, hang_seconds=args.hang_seconds, rate_limit=args.rate_limit,
+        burst=args.burst, seed=args.seed, fixtures_dir=args.fixtures,
+    )
+    print(f"Mock POWER on {mock.url}  (POWER_BASE_URL={mock.url})")
+    try:
+        mock._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"\n{mock.summary()}")
+
+
+if __name__ == "__main__":
+    main()